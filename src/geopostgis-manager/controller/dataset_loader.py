@@ -15,16 +15,23 @@ import os
 import csv
 from typing import List, Optional
 import zipfile
+import time
+import asyncio
 
 # custom functions
 from config.log import  log_file
-from model.db import get_connection, create_engine
-from controller.postgismanager import shp_to_postgis, update_srid, create_index, get_srid, check_table_exists
-from controller.geoservermanager import check_geoserver_datastore, check_geoserver_workspace, create_geoserver_layer
+from model.db import get_connection, create_engine, get_pool_stats, get_pool_size
+from controller.postgismanager import prepare_table, get_index_settings, select_index_method, benchmark_index_methods, create_partition_indexes, get_partitions, create_overview_tables, get_overview_table, subdivide_table, narrow_columns, POINT_TYPES, BRIN_MIN_ROWS, PARTITION_INDEX_WORKERS, shp_to_postgis, update_srid, transform_srid, create_index, get_staging_table, swap_staging_table, get_delta_table, check_delta_table, apply_delta, check_spatial_clustering, get_tables_info
+from controller.geoservermanager import check_geoserver_resource, check_geoserver_datastore, check_geoserver_workspace, check_geoserver_generalized_datastore, publish_geoserver_datasets, create_geoserver_layer, create_geoserver_overviews, create_geoserver_layer_async, create_geoserver_overviews_async
+from controller.scheduler import lpt_schedule, log_schedule
+from controller.pipeline import Pipeline
 
 # custom classes
 from model.dataset import Dataset
+from model.ledger import Ledger, get_dataset_files
 from model.geoserver import Geoserver
+from model.catalog import get_catalog
+from model.async_geoserver import AsyncGeoserver
 
 # third-party libraries
 import shutil
@@ -58,6 +65,8 @@ class DBParams:
         username: str. The name of the user that is connected to the database.
         password: str. Password of the username.
         active: bool. DB is active, it is planned to load datasets. True/False
+        pool_size: int. Maximum number of connections of the pool shared by the loaders. Default: 5
+        pool_timeout: int. Seconds waited for a free connection of the pool before the checkout fails. Default: 300
         """
         self.endpoint = db_params['endpoint']
         self.dbname = db_params['dbname']
@@ -66,6 +75,8 @@ class DBParams:
         self.username =db_params['username']
         self.password = db_params['password']
         self.active = db_params['active']
+        self.pool_size = db_params.get('pool_size')
+        self.pool_timeout = db_params.get('pool_timeout')
 
     def set_endpoint(self, endpoint):
         self.endpoint = endpoint
@@ -88,6 +99,12 @@ class DBParams:
     def set_active(self, active):
         self.active = active
 
+    def set_pool_size(self, pool_size):
+        self.pool_size = pool_size
+
+    def set_pool_timeout(self, pool_timeout):
+        self.pool_timeout = pool_timeout
+
 class GeoserverParams:
     def __init__(self, geoserver_params: List[dict] = []):
         """
@@ -107,6 +124,14 @@ class GeoserverParams:
         password: str. Password of the username.
         declared_srid: int. Declared Geoserver CRS. https://docs.geoserver.org/stable/en/user/configuration/crshandling/configurecrs.html
         active: bool. Geoserver is active, it is planned to load datasets. True/False
+        overview_mode: str. Publication of the overview tables. 'layers' (default): a layer by overview table and a layer group that draws the table or overview table of each scale range. 'pregeneralized': the layer is published from a pre-generalized datastore that selects the overview table by scale.
+        overview_config: str. Path of the generalization info XML of the pre-generalized datastore (readable by Geoserver).
+        pool_size: int. Maximum number of keep-alive HTTP connections to the Geoserver host (persistent session). Default: 10
+        catalog: bool. Bulk load the Geoserver catalog (workspaces, datastores, coverage stores, layers, styles) once and check the existence of the resources in memory. Default: True
+        catalog_etag: bool. Keep the catalog between the publishing passes of the run and refresh it before each pass with ETags (conditional requests). Default: False
+        max_requests: int. Number of datasets published concurrently (in-flight requests to the Geoserver instance). Default: pool_size with parallelization, else 1
+        async_requests: bool. Publish the datasets with the asyncio client (AsyncGeoserver), overlapping up to max_requests requests to the Geoserver host. Default: False
+        precompute_bbox: bool. Send the bounding boxes (planner statistics of the tables) and attributes in the FeatureTypes, so Geoserver does not scan the tables. Default: True
         """
         self.endpoint = geoserver_params['endpoint']
         self.datastore = geoserver_params['datastore']
@@ -116,6 +141,14 @@ class GeoserverParams:
         self.password = geoserver_params['password']
         self.declared_srid = geoserver_params['geo_srid']
         self.active = geoserver_params['active']
+        self.overview_mode = geoserver_params.get('overview_mode') or 'layers'
+        self.overview_config = geoserver_params.get('overview_config') or None
+        self.pool_size = int(geoserver_params.get('pool_size') or 10)
+        self.catalog = geoserver_params.get('catalog', True) is not False
+        self.catalog_etag = bool(geoserver_params.get('catalog_etag', False))
+        self.max_requests = int(geoserver_params['max_requests']) if geoserver_params.get('max_requests') else None
+        self.precompute_bbox = geoserver_params.get('precompute_bbox', True) is not False
+        self.async_requests = bool(geoserver_params.get('async_requests', False))
 
     def set_dbname(self, dbname):
         self.dbname = dbname
@@ -135,6 +168,155 @@ class GeoserverParams:
     def set_active(self, active):
         self.active = active
 
+    def set_overview_mode(self, overview_mode):
+        self.overview_mode = overview_mode
+
+    def set_overview_config(self, overview_config):
+        self.overview_config = overview_config
+
+    def set_pool_size(self, pool_size):
+        self.pool_size = pool_size
+
+    def set_catalog(self, catalog):
+        self.catalog = catalog
+
+    def set_catalog_etag(self, catalog_etag):
+        self.catalog_etag = catalog_etag
+
+    def set_max_requests(self, max_requests):
+        self.max_requests = max_requests
+
+    def set_precompute_bbox(self, precompute_bbox):
+        self.precompute_bbox = precompute_bbox
+
+    def set_async_requests(self, async_requests):
+        self.async_requests = async_requests
+
+class IngestParams:
+    def __init__(self, ingest_params: dict = {}):
+        """
+        Constructor of the IngestParams class.
+
+        Parameters
+        ----------
+        ingest_params: dict, optional
+
+        Notes
+        ----------
+        load_method: str. Writer used to store the ESRI Shapefiles into PostGIS. 'copy' (COPY ... FROM STDIN) or 'to_postgis' (default).
+        batch_size: int. Number of features read and written at once (streaming mode). None/0: the whole file is read.
+        force_2d: bool. Drop the Z coordinates of the geometries. True/False
+        load_mode: str. 'replace' (default): the dataset table is replaced. 'staging': the rows are loaded into an UNLOGGED staging table that is swapped with the dataset table. 'delta': only the changed features are applied to the dataset table.
+        delta_key: str. Field that identifies the features in delta mode (changed features are UPDATEd). Default: None
+        staging_logged: bool. Set the staging table as LOGGED before the swap. Default: True
+        spatial_sort: str. 'hilbert' to load the rows sorted along a Hilbert curve instead of CLUSTER the table. Default: None
+        clustering_check: bool. Report the spatial clustering correlation of the loaded tables. True/False
+        reproject: str. 'pyproj': reproject the geometries to the Geoserver SRID while they are loaded (ST_Transform fallback). 'postgis': ST_Transform after the load. None (default): only the SRID is updated.
+        primary_key: bool. Add an identity primary key to the tables (Geoserver feature IDs and WFS paging). Default: True
+        index_method: str. Geometry index method: 'auto' (default, selected by geometry type, row count and physical correlation), 'gist', 'spgist' or 'brin'. The datasets doc field 'field_index_method' overrides it.
+        index_benchmark: bool. Compare the index methods on a sample of each loaded table (size, build time and bbox query latency). True/False
+        index_memory: int. Memory budget (MB) shared by the concurrent index builds (maintenance_work_mem and max_parallel_maintenance_workers of each session). Default: None (server settings)
+        index_concurrency: int. Number of tables indexed concurrently by the pipelined post-load (without parallelization). Default: 1
+        index_sessions: int. Number of concurrent index builds sharing index_memory, set by the loader.
+        pipeline_depth: int. Size of the queues between the pipelined load stages (read/transform/write batches and load/post-load datasets). 0: sequential stages. Default: 2
+        partition_by: str. Store the tables partitioned by 'grid' (cell of the geometry) or by a field of the files (list partitions). Not used by the delta loads. Default: None
+        partition_grid_size: float. Size of the cells of the 'grid' partitions, in the units of the stored coordinates. Default: 100000
+        precision: float. Size of the grid (units of the stored coordinates) the coordinates are snapped to (shapely set_precision). The datasets doc field 'field_precision' overrides it. Default: None (full precision)
+        narrow_types: bool. Narrow the attribute types to the observed values (smallint/integer, real, boolean). True/False
+        subdivide_vertices: int. Features with more vertices are split with ST_Subdivide (pieces keep the 'parent_fid'). Default: None (not subdivided)
+        overview_tolerances: list. Simplification tolerances (units of the table SRID) of the overview tables of the line/polygon tables. Default: [] (no overviews)
+        """
+        self.load_method = ingest_params.get('load_method') or 'to_postgis'
+        self.batch_size = ingest_params.get('batch_size') or None
+        self.force_2d = bool(ingest_params.get('force_2d'))
+        self.load_mode = ingest_params.get('load_mode') or 'replace'
+        self.staging_logged = ingest_params.get('staging_logged') is not False
+        self.delta_key = ingest_params.get('delta_key') or None
+        self.spatial_sort = ingest_params.get('spatial_sort') or None
+        self.clustering_check = bool(ingest_params.get('clustering_check'))
+        self.reproject = ingest_params.get('reproject') or None
+        self.primary_key = ingest_params.get('primary_key') is not False
+        self.index_method = ingest_params.get('index_method') or 'auto'
+        self.index_benchmark = bool(ingest_params.get('index_benchmark'))
+        self.index_memory = ingest_params.get('index_memory') or None
+        self.index_concurrency = ingest_params.get('index_concurrency') or 1
+        self.index_sessions = 1
+        self.pipeline_depth = ingest_params.get('pipeline_depth')
+        if self.pipeline_depth is None:
+            self.pipeline_depth = 2
+        self.partition_by = ingest_params.get('partition_by') or None
+        self.partition_grid_size = ingest_params.get('partition_grid_size') or 100000
+        self.precision = ingest_params.get('precision') or None
+        self.narrow_types = bool(ingest_params.get('narrow_types'))
+        self.subdivide_vertices = ingest_params.get('subdivide_vertices') or None
+        self.overview_tolerances = sorted(float(tolerance) for tolerance in ingest_params.get('overview_tolerances') or [])
+
+    def set_load_method(self, load_method):
+        self.load_method = load_method
+
+    def set_batch_size(self, batch_size):
+        self.batch_size = batch_size
+
+    def set_force_2d(self, force_2d):
+        self.force_2d = force_2d
+
+    def set_load_mode(self, load_mode):
+        self.load_mode = load_mode
+
+    def set_staging_logged(self, staging_logged):
+        self.staging_logged = staging_logged
+
+    def set_delta_key(self, delta_key):
+        self.delta_key = delta_key
+
+    def set_spatial_sort(self, spatial_sort):
+        self.spatial_sort = spatial_sort
+
+    def set_clustering_check(self, clustering_check):
+        self.clustering_check = clustering_check
+
+    def set_reproject(self, reproject):
+        self.reproject = reproject
+
+    def set_primary_key(self, primary_key):
+        self.primary_key = primary_key
+
+    def set_index_method(self, index_method):
+        self.index_method = index_method
+
+    def set_index_benchmark(self, index_benchmark):
+        self.index_benchmark = index_benchmark
+
+    def set_index_memory(self, index_memory):
+        self.index_memory = index_memory
+
+    def set_index_concurrency(self, index_concurrency):
+        self.index_concurrency = index_concurrency
+
+    def set_index_sessions(self, index_sessions):
+        self.index_sessions = index_sessions
+
+    def set_pipeline_depth(self, pipeline_depth):
+        self.pipeline_depth = pipeline_depth
+
+    def set_partition_by(self, partition_by):
+        self.partition_by = partition_by
+
+    def set_partition_grid_size(self, partition_grid_size):
+        self.partition_grid_size = partition_grid_size
+
+    def set_precision(self, precision):
+        self.precision = precision
+
+    def set_narrow_types(self, narrow_types):
+        self.narrow_types = narrow_types
+
+    def set_subdivide_vertices(self, subdivide_vertices):
+        self.subdivide_vertices = subdivide_vertices
+
+    def set_overview_tolerances(self, overview_tolerances):
+        self.overview_tolerances = overview_tolerances
+
 class OutputInfo:
     def __init__(self, bundle_id):
         """
@@ -151,6 +333,14 @@ class OutputInfo:
         self.db_records: int = 0
         self.geo_records: int = 0
         self.error_records: int = 0
+        self.unchanged_records: int = 0
+        self.makespan: dict = {}
+
+    def set_makespan(self, stage, predicted, actual):
+        self.makespan[stage] = {'predicted': predicted, 'actual': actual}
+
+    def makespan_summary(self):
+        return ", ".join(f"{stage}: predicted {m['predicted']:.1f}s / actual {m['actual']:.1f}s" for stage, m in self.makespan.items())
 
     def set_csv(self, log_folder, datasets):
         # datasets to csv
@@ -172,9 +362,10 @@ class OutputInfo:
 
     def set_output_info(self, datasets):
         self.total_records = len(datasets)
-        self.geo_records = len([x for x in datasets if x.status == 'geoserver_uploaded'])
-        self.db_records= len([x for x in datasets if x.status == 'db_uploaded'])
+        self.geo_records = len([x for x in datasets if x.status == 'geoserver_uploaded' and 'geoserver' not in x.unchanged])
+        self.db_records= len([x for x in datasets if x.status == 'db_uploaded' and 'db' not in x.unchanged])
         self.error_records = len([x for x in datasets if x.status == 'error'])
+        self.unchanged_records = len([x for x in datasets if x.unchanged])
 
         
 
@@ -189,11 +380,16 @@ class BaseLoader:
         datasets_mode: str,
         db_params = None,
         geoserver_params = None, 
+        ingest_params = None,
         parallel: bool = False,
+        parallel_backend: str = "threads",
+        workers: Optional[int] = None,
         proxies = None,
         db_conn = None,
         load_to_db: bool = False,
-        load_to_geoserver: bool = False):
+        load_to_geoserver: bool = False,
+        ledger_file: Optional[str] = None,
+        force: bool = False):
             """
             Constructor of the BaseLoader class.
 
@@ -208,25 +404,38 @@ class BaseLoader:
             datasets_table: str. schema.table or filepath, depends on datasets_mode.
             db_params: optional. DB parameters.
             geoserver_params: optional. Geoserver parameters.
+            ingest_params: optional. PostGIS ingest parameters.
             parallel: bool. Parallelization True/False.
+            parallel_backend: str. 'threads' (default) or 'processes' (process pool, a DB engine by worker).
+            workers: int, optional. Number of parallel workers. Default: CPU count - 1.
             proxies: dict. HTTP/HTTPS proxies.
             load_to_db: bool. Load to Database True/False.
             load_to_geoserver: bool. Load to Geoserver True/False.
+            ledger_file: str, optional. SQLite file with the fingerprints of the loaded datasets, the unchanged datasets are skipped. Default: None (no ledger).
+            force: bool. Load all the datasets even if they are unchanged in the ledger.
             """
             self.bundle_id = bundle_id
+            self.log_folder = log_folder
             self.logger = log_file(log_folder)
             self.db_type = db_type
             self.db_params = DBParams(db_params)
             self.geoserver_params = GeoserverParams(geoserver_params)
+            self.ingest_params = IngestParams(ingest_params or {})
             self.db_conn = db_conn
             self.datasets = self.get_datasets_from_table(datasets_doc, datasets_table, datasets_mode)
             self.parallel = parallel
+            self.parallel_backend = parallel_backend
             self.proxies = proxies
             self.load_to_db = load_to_db
             self.load_to_geoserver = load_to_geoserver
             self.output_info = OutputInfo(self.bundle_id)
+            # Catalog info of the dataset tables: {(schema, table): {'geometry_type', 'srid'}}
+            self.tables_info = None
             # Cores available to parallelization
-            self.processes = os.cpu_count() - 1
+            self.processes = workers or max(os.cpu_count() - 1, 1)
+            # Fingerprints of the datasets loaded in previous runs
+            self.ledger = Ledger(ledger_file) if ledger_file else None
+            self.force = force
 
     def get_db_conn(self):
         """
@@ -332,6 +541,27 @@ class BaseLoader:
                 except:
                     logging.info(log_module + ":" + "The dataset: " + row[datasets_doc.field_name] + " has no creator (field:[" + datasets_doc.field_creator + "]), it will be loaded.")
 
+                # Set search attributes (comma separated fields)
+                try:
+                    if getattr(datasets_doc, 'field_search_attribute', None) and isinstance(row[datasets_doc.field_search_attribute], str):
+                        dataset.set_search_attributes([a.strip() for a in row[datasets_doc.field_search_attribute].split(",") if a.strip()])
+                except:
+                    logging.info(log_module + ":" + "The dataset: " + row[datasets_doc.field_name] + " has no search attributes (field:[" + str(datasets_doc.field_search_attribute) + "]), it will be loaded.")
+
+                # Set geometry index method
+                try:
+                    if getattr(datasets_doc, 'field_index_method', None) and isinstance(row[datasets_doc.field_index_method], str):
+                        dataset.set_index_method(row[datasets_doc.field_index_method].strip().lower() or None)
+                except:
+                    logging.info(log_module + ":" + "The dataset: " + row[datasets_doc.field_name] + " has no index_method (field:[" + str(datasets_doc.field_index_method) + "]), it will be loaded.")
+
+                # Set coordinates precision
+                try:
+                    if getattr(datasets_doc, 'field_precision', None) and not pd.isna(row[datasets_doc.field_precision]) and str(row[datasets_doc.field_precision]).strip():
+                        dataset.set_precision(row[datasets_doc.field_precision])
+                except:
+                    logging.info(log_module + ":" + "The dataset: " + row[datasets_doc.field_name] + " has no precision (field:[" + str(datasets_doc.field_precision) + "]), it will be loaded.")
+
                 # Set SRID
                 if row[datasets_doc.field_srid] is not None:
                     dataset.set_file_srid(row[datasets_doc.field_srid])
@@ -423,6 +653,410 @@ class BaseLoader:
 
         return obj_datasets
 
+    def load_tables_info(self, refresh: bool = False, layout: bool = False):
+        """
+        Retrieve (once) the existence, geometry type and SRID of all the vector dataset tables with a bulk catalog query.
+
+        Parameters
+        ----------
+        - refresh: Query the catalog again, e.g. after loading the datasets into the DB.
+        - layout: Also retrieve the bounding boxes and attributes of the tables (published with the FeatureTypes).
+
+        Return
+        ----------
+        dict: {(schema, table): {'geometry_type': str, 'srid': int}}
+        """
+        if self.tables_info is None or refresh:
+            try:
+                self.tables_info = get_tables_info([d for d in self.datasets if d.carto_type == "vector"], self.db_params, overview_levels=len(self.ingest_params.overview_tolerances), layout=layout)
+            except Exception as e:
+                logging.error(f"{log_module}:The tables of the datasets could not be checked in the dbname: {self.db_params.dbname}: {e}")
+                self.tables_info = {}
+
+        return self.tables_info
+
+    def set_table_info(self, dataset):
+        """
+        Set the status, geometry type, SRID (if not documented) and overview tables of a dataset from the cached catalog info.
+
+        Parameters
+        ----------
+        - dataset: Dataset object.
+
+        Return
+        ----------
+        Dataset object
+        """
+        table_info = self.load_tables_info().get((dataset.schema, dataset.table))
+        if table_info is not None:
+            dataset.set_status('db_uploaded')
+            dataset.set_geometry_type(table_info['geometry_type'])
+            if dataset.file_srid is None:
+                dataset.set_file_srid(table_info['srid'])
+            dataset.set_bbox(table_info.get('bbox'))
+            dataset.set_attributes(table_info.get('attributes'))
+            dataset.set_overviews([dict(table=get_overview_table(dataset.table, level), tolerance=tolerance) for level, tolerance in enumerate(self.ingest_params.overview_tolerances, start=1)
+                                   if (dataset.schema, get_overview_table(dataset.table, level)) in self.tables_info])
+
+        return dataset
+
+    def get_fingerprint(self, dataset, stage: str):
+        """
+        Returns the fingerprint of a dataset for a stage: content hash of its files and the parameters that change the stage result.
+
+        Parameters
+        ----------
+        - dataset: Dataset object.
+        - stage: 'db' or 'geoserver'.
+
+        Return
+        ----------
+        Fingerprint str or None if the dataset has no files
+        """
+        if not dataset.file_path:
+            return None
+
+        paths = get_dataset_files(dataset.file_path)
+        if stage == 'db':
+            params = dict(schema=dataset.schema, table=dataset.table, srid=self.geoserver_params.declared_srid, force_2d=self.ingest_params.force_2d, reproject=self.ingest_params.reproject, spatial_sort=self.ingest_params.spatial_sort, primary_key=self.ingest_params.primary_key, partition_by=self.ingest_params.partition_by, partition_grid_size=self.ingest_params.partition_grid_size, precision=dataset.precision or self.ingest_params.precision, narrow_types=self.ingest_params.narrow_types, subdivide_vertices=self.ingest_params.subdivide_vertices, overview_tolerances=self.ingest_params.overview_tolerances, search_attributes=",".join(dataset.search_attributes), index_method=dataset.index_method or self.ingest_params.index_method, load_mode=self.ingest_params.load_mode)
+        else:
+            params = dict(workspace=dataset.ogc_workspace, datastore=self.geoserver_params.datastore, overview_mode=self.geoserver_params.overview_mode, overview_tolerances=self.ingest_params.overview_tolerances, srid=self.geoserver_params.declared_srid, name=dataset.name, description=dataset.description, metadata_url=dataset.metadata_url)
+            if dataset.sld_path and os.path.isfile(dataset.sld_path):
+                paths = paths + [dataset.sld_path]
+
+        return self.ledger.get_fingerprint(paths, params)
+
+    def skip_unchanged(self, datasets: list, stage: str, status: str, geo = None):
+        """
+        Set the fingerprint of the datasets and skip those unchanged since the last run of the stage (ledger).
+
+        Parameters
+        ----------
+        - datasets: List of Dataset objects.
+        - stage: 'db' or 'geoserver'.
+        - status: Status of the skipped datasets (e.g. 'db_uploaded').
+        - geo: Geoserver connection object, to check that the layers of the 'geoserver' stage still exist (catalog cache).
+
+        Return
+        ----------
+        List of Dataset objects to load
+        """
+        if self.ledger is None:
+            return datasets
+
+        pending = []
+        for dataset in datasets:
+            try:
+                fingerprint = self.get_fingerprint(dataset, stage)
+            except OSError as e:
+                logging.warning(f"{log_module}:The fingerprint of the dataset: '{dataset.identifier}' could not be calculated: {e}")
+                fingerprint = None
+            dataset.set_fingerprint(stage, fingerprint)
+
+            entry = self.ledger.get_entry(self.bundle_id, dataset.identifier, stage) if fingerprint else None
+            unchanged = entry is not None and entry['fingerprint'] == fingerprint and not self.force
+            # The table must still exist to skip the DB load
+            if unchanged and stage == 'db':
+                unchanged = (dataset.schema, dataset.table) in self.load_tables_info()
+            # The layer must still exist to skip the publication (e.g. deleted in Geoserver since the last run)
+            if unchanged and stage == 'geoserver' and geo is not None:
+                unchanged = check_geoserver_resource(geo, 'layer', dataset.table, self.geoserver_params.workspace)
+
+            if unchanged:
+                dataset.set_status(status)
+                dataset.set_unchanged(stage)
+                if entry['srid'] is not None:
+                    dataset.set_file_srid(entry['srid'])
+                if entry['row_count'] is not None:
+                    dataset.set_row_count(entry['row_count'])
+                dataset.set_status_info(f"Unchanged since: {entry['updated_at']} ({stage}), skipped")
+                logging.info(f"{log_module}:The dataset: '{dataset.identifier}' is unchanged since: {entry['updated_at']}, the stage: '{stage}' is skipped")
+            else:
+                pending.append(dataset)
+
+        if self.force:
+            logging.info(f"{log_module}:Force mode: {len(pending)} datasets are loaded (stage: '{stage}')")
+
+        return pending
+
+    def record_ledger(self, datasets: list, stage: str, status: str):
+        """
+        Store in the ledger the fingerprint of the datasets loaded by a stage.
+
+        Parameters
+        ----------
+        - datasets: List of Dataset objects.
+        - stage: 'db' or 'geoserver'.
+        - status: Status of the datasets successfully loaded (e.g. 'db_uploaded').
+        """
+        if self.ledger is None:
+            return
+
+        for dataset in datasets:
+            fingerprint = dataset.fingerprint.get(stage)
+            if dataset.status == status and fingerprint:
+                self.ledger.set_entry(self.bundle_id, dataset.identifier, stage, fingerprint, dataset.file_srid, dataset.row_count)
+
+def get_load_table(dataset, load_mode: str):
+    """
+    Returns the table where a dataset is loaded. Staging mode loads and indexes a copy of the table, the live table is kept until the swap.
+    Delta mode loads the rows into a staging table diffed with the live table.
+
+    Parameters
+    ----------
+    - dataset: Dataset to load into PostGIS DB.
+    - load_mode: 'replace', 'staging' or 'delta'.
+
+    Return
+    ----------
+    DB table
+    """
+    if load_mode == 'staging':
+        return get_staging_table(dataset.table)
+    elif load_mode == 'delta':
+        return get_delta_table(dataset.table)
+
+    return dataset.table
+
+def get_load_mode(dataset, db_params, ingest_params, load_mode: Optional[str] = None):
+    """
+    Returns the load mode of a dataset. The delta mode needs a dataset table with feature hashes, otherwise the table is replaced (with feature hashes).
+    The partitioned tables are not loaded in delta mode (replaced).
+
+    Parameters
+    ----------
+    - dataset: Dataset to load into PostGIS DB.
+    - db_params: Database connection details.
+    - ingest_params: PostGIS ingest parameters.
+    - load_mode: 'replace', 'staging' or 'delta'. Default: ingest_params.load_mode.
+
+    Return
+    ----------
+    Load mode str
+    """
+    load_mode = load_mode or ingest_params.load_mode
+    if load_mode == 'delta' and ingest_params.partition_by:
+        logging.warning(f"{log_module}:The partitioned table: '{dataset.schema}.{dataset.table}' does not support delta loads, it is replaced.")
+        return 'replace'
+    if load_mode == 'delta':
+        try:
+            if not check_delta_table(dataset, db_params, ingest_params.delta_key):
+                logging.info(f"{log_module}:The table: '{dataset.schema}.{dataset.table}' has no feature hashes, it is fully loaded before the delta loads.")
+                return 'replace'
+        except Exception as e:
+            logging.error(f"{log_module}:The table: '{dataset.schema}.{dataset.table}' could not be checked for a delta load: {e}")
+            return 'replace'
+
+    return load_mode
+
+def shp2pgsql_load(dataset, db_engine, ingest_params, load_mode: Optional[str] = None, target_srid: Optional[int] = None, db_params = None):
+    """
+    Upload an ESRI Shapefile dataset into its PostGIS table (or staging table).
+
+    Parameters
+    ----------
+    - dataset: Dataset to load into PostGIS DB.
+    - db_engine: SQLAlchemy database engine.
+    - ingest_params: PostGIS ingest parameters.
+    - load_mode: 'replace' or 'staging'. Default: ingest_params.load_mode.
+    - target_srid: SRID of the table, used by the reprojection (ingest_params.reproject).
+    - db_params: Database connection details, to check the table of the delta loads.
+
+    Return
+    ----------
+    Dataset object
+    """
+    load_mode = load_mode or ingest_params.load_mode
+    if load_mode == 'delta':
+        load_mode = get_load_mode(dataset, db_params, ingest_params, load_mode)
+        # The rows of the delta and the first (full) load carry the feature hashes
+        dataset.set_load_mode(load_mode)
+    table = get_load_table(dataset, load_mode)
+
+    try:
+        dataset = shp_to_postgis(dataset, db_engine, ingest_params.load_method, ingest_params.batch_size, ingest_params.force_2d, table=table, unlogged=load_mode in ('staging', 'delta'), spatial_sort=ingest_params.spatial_sort, pipeline_depth=ingest_params.pipeline_depth, target_srid=target_srid, reproject=ingest_params.reproject, feature_hash=ingest_params.load_mode == 'delta', partition_by=ingest_params.partition_by, partition_grid_size=ingest_params.partition_grid_size, precision=dataset.precision or ingest_params.precision)
+    except Exception as e:
+        logging.exception(
+            "Error found during loading ESRI Shapefile to PostGIS!"
+            f"Dataset table: {dataset.schema}.{dataset.table}, "
+            f"exception: {e}"
+        )
+
+    return dataset
+
+def shp2pgsql_post_load(dataset, db_params, geo_params, ingest_params, load_mode: Optional[str] = None):
+    """
+    Post-load of a dataset table uploaded into PostGIS: SRID update, geometry index, clustering report and (if needed) staging table swap or delta apply.
+
+    Parameters
+    ----------
+    - dataset: Dataset loaded into PostGIS DB.
+    - db_params: Database connection details.
+    - geo_params: Geoserver connection details.
+    - ingest_params: PostGIS ingest parameters.
+    - load_mode: 'replace', 'staging' or 'delta'. Default: the load mode of the dataset load (ingest_params.load_mode).
+
+    Return
+    ----------
+    Dataset object
+    """
+    load_mode = load_mode or dataset.load_mode or ingest_params.load_mode
+    table = get_load_table(dataset, load_mode)
+
+    #Transform to SRID 3857 the dataset uploaded. Reprojected by PostGIS if it is not already in the SRID (pyproj fallback)
+    try:
+        if ingest_params.reproject and dataset.status != 'error' and not dataset.file_srid:
+            # Unknown source CRS (e.g. no .prj file): relabelling the SRID would keep the source coordinates
+            logging.error(f"{log_module}:The dataset: '{dataset.identifier}' has no CRS, it can not be reprojected to EPSG:{geo_params.declared_srid}")
+            dataset.set_status('error')
+            dataset.set_status_info(f"Error transforming: '{dataset.schema}.{table}', the source CRS is unknown")
+        elif ingest_params.reproject and dataset.file_srid and dataset.file_srid != geo_params.declared_srid:
+            dataset = transform_srid(dataset, db_params, geo_params.declared_srid, table=table)
+        else:
+            dataset = update_srid(dataset, db_params, geo_params.declared_srid, table=table)
+    except Exception as e:
+        logging.exception(
+            "Error found during updating SRID!"
+            f"Dataset table: {dataset.schema}.{dataset.table}, "
+            f"exception: {e}"
+        )
+
+    # Delta load: the changes are applied to the indexed table
+    if load_mode == 'delta':
+        replaced = False
+        if dataset.status == 'error':
+            logging.error(f"{log_module}:The delta table: '{dataset.schema}.{table}' has errors, the table: '{dataset.schema}.{dataset.table}' is not updated.")
+        else:
+            dataset, replaced = apply_delta(dataset, db_params, table, ingest_params.delta_key)
+            if not replaced:
+                if ingest_params.subdivide_vertices and dataset.status != 'error':
+                    dataset = subdivide_table(dataset, db_params, ingest_params.subdivide_vertices)
+                dataset = prepare_table(dataset, db_params, primary_key=ingest_params.primary_key)
+        if not replaced:
+            if ingest_params.clustering_check:
+                dataset = check_spatial_clustering(dataset, db_params)
+            if ingest_params.overview_tolerances and dataset.status != 'error':
+                dataset = create_overview_tables(dataset, db_params, ingest_params.overview_tolerances)
+            return dataset
+
+        # New fields: the delta staging table replaced the dataset table, it is prepared as a replace load
+        table = dataset.table
+
+    # Narrowed attribute types (table rewrite before the primary key and the indexes)
+    if ingest_params.narrow_types and dataset.status != 'error':
+        dataset = narrow_columns(dataset, db_params, table=table)
+
+    # Primary key before the geometry index (the identity column rewrites the table and its indexes)
+    if ingest_params.primary_key and dataset.status != 'error':
+        dataset = prepare_table(dataset, db_params, table=table, search_attributes=[], analyze=False)
+
+    # Index method: dataset doc, ingest parameter or selected by geometry type, row count and physical correlation (sampled for large point tables)
+    override = dataset.index_method or (ingest_params.index_method if ingest_params.index_method != 'auto' else None)
+    geometry_type = (dataset.geometry_type or '').upper()
+    if override is None and geometry_type in POINT_TYPES and (dataset.row_count or 0) >= BRIN_MIN_ROWS and dataset.clustering_correlation is None:
+        dataset = check_spatial_clustering(dataset, db_params, table=table, sample_percent=1)
+    index_method = select_index_method(geometry_type, dataset.row_count, dataset.clustering_correlation, override)
+
+    # Create Geometry Index and clustering table. The memory budget is shared by the concurrent builds (and partitions)
+    try:
+        if ingest_params.partition_by:
+            partitions = max(min(max(ingest_params.index_concurrency, PARTITION_INDEX_WORKERS), len(get_partitions(dataset, db_params, table)), get_pool_size(db_params) - 1), 1)
+            maintenance_work_mem, parallel_workers = get_index_settings(ingest_params.index_memory, ingest_params.index_sessions * partitions)
+            dataset = create_partition_indexes(dataset, db_params, table=table, cluster=ingest_params.spatial_sort is None, maintenance_work_mem=maintenance_work_mem, parallel_workers=parallel_workers, method=index_method, workers=partitions)
+        else:
+            maintenance_work_mem, parallel_workers = get_index_settings(ingest_params.index_memory, ingest_params.index_sessions)
+            dataset = create_index(dataset, db_params, table=table, cluster=ingest_params.spatial_sort is None, maintenance_work_mem=maintenance_work_mem, parallel_workers=parallel_workers, method=index_method)
+    except Exception as e:
+        logging.exception(
+            "Error found during creating geometry index!"
+            f"Dataset table: {dataset.schema}.{dataset.table}, "
+            f"exception: {e}"
+        )
+
+    # Oversized features split with its parent primary key (after the primary key and the geometry index, the report queries use it)
+    if ingest_params.subdivide_vertices and dataset.status != 'error':
+        dataset = subdivide_table(dataset, db_params, ingest_params.subdivide_vertices, table=table)
+
+    # Search attributes indexes and statistics (after CLUSTER, which rebuilds the indexes)
+    if dataset.status != 'error':
+        dataset = prepare_table(dataset, db_params, table=table, primary_key=False)
+
+    # Spatial clustering report
+    if ingest_params.clustering_check:
+        dataset = check_spatial_clustering(dataset, db_params, table=table)
+
+    # Index methods benchmark
+    if ingest_params.index_benchmark and dataset.status != 'error':
+        benchmark_index_methods(dataset, db_params, table=table)
+
+    # Swap the staging table with the dataset table
+    if load_mode == 'staging':
+        if dataset.status == 'error':
+            logging.error(f"{log_module}:The staging table: '{dataset.schema}.{table}' has errors, the table: '{dataset.schema}.{dataset.table}' is not replaced.")
+        else:
+            dataset = swap_staging_table(dataset, db_params, table, ingest_params.staging_logged)
+
+    # Overview tables of the dataset table for the small scale requests
+    if ingest_params.overview_tolerances and dataset.status != 'error':
+        dataset = create_overview_tables(dataset, db_params, ingest_params.overview_tolerances)
+
+    return dataset
+
+def shp2pgsql(dataset, db_engine, db_params, geo_params, ingest_params, load_mode: Optional[str] = None):
+    """
+    Store into a PostGIS Database an ESRI Shapefile dataset: load, SRID update, geometry index and (if needed) staging table swap.
+
+    Parameters
+    ----------
+    - dataset: Dataset to load into PostGIS DB.
+    - db_engine: SQLAlchemy database engine.
+    - db_params: Database connection details.
+    - geo_params: Geoserver connection details.
+    - ingest_params: PostGIS ingest parameters.
+    - load_mode: 'replace' or 'staging' (UNLOGGED staging table and atomic swap). Default: ingest_params.load_mode.
+
+    Return
+    ----------
+    Dataset object
+    """
+
+    start = datetime.now()
+
+    dataset = shp2pgsql_load(dataset, db_engine, ingest_params, load_mode, geo_params.declared_srid, db_params)
+    dataset = shp2pgsql_post_load(dataset, db_params, geo_params, ingest_params, load_mode)
+
+    # Outputinfo
+    end = datetime.now()
+    diff =  end - start
+    logging.info("Finish: " +  dataset.schema + "." + dataset.table + " | Time elapsed: " + str(diff))
+
+    return dataset
+
+def shp2pgsql_worker(dataset, db_params, geo_params, ingest_params, log_folder: Optional[str] = None):
+    """
+    Process pool task of shp2pgsql. The worker process builds its own engine (and connection pool) from the DBParams
+    and returns a lightweight load result instead of the Dataset object.
+
+    Parameters
+    ----------
+    - dataset: Dataset to load into PostGIS DB.
+    - db_params: Database connection details.
+    - geo_params: Geoserver connection details.
+    - ingest_params: PostGIS ingest parameters.
+    - log_folder: Logging file folder of the worker process.
+
+    Return
+    ----------
+    dict: Load result of the dataset (Dataset.load_result)
+    """
+    if log_folder is not None and not logging.getLogger().handlers:
+        log_file(log_folder)
+
+    db_engine = create_engine(db_params)
+    dataset = shp2pgsql(dataset, db_engine, db_params, geo_params, ingest_params)
+
+    return dataset.load_result()
+
 class DbLoader(BaseLoader):
     """
     Constructor of the DbLoader class.
@@ -430,7 +1064,7 @@ class DbLoader(BaseLoader):
     Subclass of: BaseLoader       
     """
 
-    def batch_shp2pgsql(self, dataset, db_engine, db_params, geo_params):
+    def batch_shp2pgsql(self, dataset, db_engine, db_params, geo_params, load_mode: Optional[str] = None):
         """Create batch task to store into a PostGIS Database all ESRI Shapefiles ZIPs from a directory.
 
         Parameters
@@ -440,49 +1074,13 @@ class DbLoader(BaseLoader):
         - db_engine: SQLAlchemy database engine.
         - db_params: Database connection details.
         - geo_params: Geoserver connection details.
+        - load_mode: 'replace' or 'staging' (UNLOGGED staging table and atomic swap). Default: ingest_params.load_mode.
 
         Return
         ----------
         Datasets Object.
         """
-
-        start = datetime.now()
-
-        # Upload to PostGIS
-        try:
-            dataset = shp_to_postgis(dataset, db_engine)
-        except Exception as e:
-            logging.exception(
-                "Error found during loading ESRI Shapefile to PostGIS!"
-                f"Dataset table: {dataset.schema}.{dataset.table}, "
-                f"exception: {e}"
-            )
-
-        #Transform to SRID 3857 the dataset uploaded
-        try:
-            dataset = update_srid(dataset, db_params, geo_params.declared_srid)
-        except Exception as e:
-            logging.exception(
-                "Error found during updating SRID!"
-                f"Dataset table: {dataset.schema}.{dataset.table}, "
-                f"exception: {e}"
-            )
-        
-        # Create Geometry Index and clustering table
-        try:
-            dataset = create_index(dataset, db_params)
-        except Exception as e:
-            logging.exception(
-                "Error found during creating geometry index!"
-                f"Dataset table: {dataset.schema}.{dataset.table}, "
-                f"exception: {e}"
-            )
-
-
-        # Outputinfo
-        end = datetime.now()
-        diff =  end - start
-        logging.info("Finish: " +  dataset.schema + "." + dataset.table + " | Time elapsed: " + str(diff))
+        return shp2pgsql(dataset, db_engine, db_params, geo_params, self.ingest_params, load_mode)
 
     def load_datasets_to_postgis(self):
         """
@@ -502,22 +1100,67 @@ class DbLoader(BaseLoader):
 
         # Load to DB
         if self.load_to_db is True:
+            # Longest datasets first, so the largest ones do not end the run with the other workers idle
+            workers = self.processes if self.parallel is True else 1
+            datasets = [d for d in self.datasets if d.status == "db_to-load" and d.file_format == "shp"]
+            datasets = self.skip_unchanged(datasets, 'db', 'db_uploaded')
+            datasets, costs, predicted_makespan = lpt_schedule(datasets, workers)
+            log_schedule('db', datasets, costs, workers, predicted_makespan)
+            start = time.perf_counter()
+
+            # Concurrent index builds sharing the memory budget: one by worker or by post-load thread
+            if self.parallel is True:
+                self.ingest_params.set_index_sessions(self.processes)
+            elif self.ingest_params.pipeline_depth and len(datasets) > 1:
+                self.ingest_params.set_index_sessions(self.ingest_params.index_concurrency)
+
             # Multi core processing
             if self.parallel is True:
-                logging.info(log_module + ":" + "Number of processes: " + str(self.processes))
-                # SHP to Postgis
-                Parallel(n_jobs=self.processes, prefer="threads")(delayed(self.batch_shp2pgsql)(dataset=d, db_engine=db_engine, db_params=self.db_params, geo_params=self.geoserver_params) for d in self.datasets if d.status == "db_to-load" and d.file_format == "shp")
+                logging.info(log_module + ":" + "Number of processes: " + str(self.processes) + " | Backend: " + self.parallel_backend)
+
+                # SHP to Postgis. Process pool: each worker returns the load result, merged into the Dataset objects
+                if self.parallel_backend == "processes":
+                    results = Parallel(n_jobs=self.processes, prefer="processes", batch_size=1)(delayed(shp2pgsql_worker)(dataset=d, db_params=self.db_params, geo_params=self.geoserver_params, ingest_params=self.ingest_params, log_folder=self.log_folder) for d in datasets)
+                    for dataset, result in zip(datasets, results):
+                        dataset.merge_load_result(result)
+
+                else:
+                    Parallel(n_jobs=self.processes, prefer="threads", batch_size=1)(delayed(self.batch_shp2pgsql)(dataset=d, db_engine=db_engine, db_params=self.db_params, geo_params=self.geoserver_params) for d in datasets)
+
+            # Single core processing. Pipelined: the next dataset is uploaded while the previous one is indexed
+            elif self.ingest_params.pipeline_depth and len(datasets) > 1:
+                pipeline = Pipeline(self.bundle_id, [
+                    ('datasets', datasets),
+                    ('load', lambda d: shp2pgsql_load(d, db_engine, self.ingest_params, target_srid=self.geoserver_params.declared_srid, db_params=self.db_params)),
+                    ('post_load', lambda d: shp2pgsql_post_load(d, self.db_params, self.geoserver_params, self.ingest_params), self.ingest_params.index_concurrency),
+                ], queue_size=self.ingest_params.pipeline_depth)
+                pipeline.run()
+                pipeline.log_occupancy()
 
-            # Single core processing
             else:
-                for dataset in self.datasets:
-                    if dataset.status == "db_to-load":
-                        # SHP to Postgis
-                        if dataset.file_format == "shp":
-                            self.batch_shp2pgsql(dataset, db_engine, self.db_params, self.geoserver_params)
+                for dataset in datasets:
+                    # SHP to Postgis
+                    self.batch_shp2pgsql(dataset, db_engine, self.db_params, self.geoserver_params)
+
+            actual_makespan = time.perf_counter() - start
+            self.output_info.set_makespan('db', predicted_makespan, actual_makespan)
+            logging.info(f"{log_module}:Makespan 'db': predicted {predicted_makespan:.1f}s | actual {actual_makespan:.1f}s")
+            self.record_ledger(datasets, 'db', 'db_uploaded')
+            self.log_pool_stats()
 
         return self
 
+    def log_pool_stats(self):
+        """
+        Log the usage stats of the database connection pool.
+        """
+        stats = get_pool_stats(self.db_params)
+        if stats is not None:
+            logging.info(
+                f"{log_module}:Connection pool: {self.db_params.endpoint} | Size: {stats['size']} - Checked out: {stats['checked_out']} - "
+                f"Checkouts: {stats['checkouts']} - Checkout wait (avg/max): {stats['avg_wait_time']:.3f}s/{stats['max_wait_time']:.3f}s"
+            )
+
 class GeoserverLoader(DbLoader):
     """
     Constructor of the GeoserverLoader class.
@@ -544,25 +1187,168 @@ class GeoserverLoader(DbLoader):
         datastore = geo_params.datastore
 
 
-        geo = Geoserver(geo_params.url, username=geo_params.username, password=geo_params.password, proxies=self.proxies)
+        # In-flight publishing requests, each one with its keep-alive connection
+        workers = max(geo_params.max_requests or (geo_params.pool_size if self.parallel is True or geo_params.async_requests else 1), 1)
+        geo = Geoserver(geo_params.url, username=geo_params.username, password=geo_params.password, proxies=self.proxies, pool_size=max(geo_params.pool_size, workers))
+
+        # Catalog cache: the existence of the workspace, datastores and layers checked in memory
+        if geo_params.catalog:
+            try:
+                geo.catalog = get_catalog(geo, [workspace], etag=geo_params.catalog_etag)
+            except Exception as e:
+                logging.warning(f"{log_module}:Geoserver catalog not available, the resources are requested one by one: {e}")
+                geo.catalog = None
 
         check_geoserver_workspace(geo, workspace, datastore)
         check_geoserver_datastore(geo, workspace, datastore, db_type, db_params)
 
-        for dataset in datasets:
-            if dataset.status == "db_uploaded" or dataset.status == "geo_to-load":
-                if dataset.file_srid is None and dataset.carto_type == "vector":
-                    dataset = get_srid(dataset, db_params)
-                dataset = create_geoserver_layer(geo, workspace, datastore, dataset, db_type, dataset.file_srid, geo_params.declared_srid)
+        # Existence, geometry type and SRID of all the tables in one query (tables may be loaded in this run)
+        self.load_tables_info(refresh=True, layout=geo_params.precompute_bbox)
 
-            elif dataset.status == 'db_to-load':
-                try:
-                    dataset = check_table_exists(dataset, db_params)
-                    if dataset.status == "db_uploaded":
-                        if dataset.file_srid is None and dataset.carto_type == "vector":
-                            dataset = get_srid(dataset, db_params)
-                        dataset = create_geoserver_layer(geo, workspace, datastore, dataset, db_type, dataset.file_srid, geo_params.declared_srid)
-                except:
-                    continue
+        # Longest datasets first (e.g. coverages uploaded and large layers)
+        datasets = [d for d in datasets if d.status in ("db_uploaded", "geo_to-load", "db_to-load")]
+        datasets = self.skip_unchanged(datasets, 'geoserver', 'geoserver_uploaded', geo)
+        datasets, costs, predicted_makespan = lpt_schedule(datasets, workers)
+        log_schedule('geoserver', datasets, costs, workers, predicted_makespan)
+        start = time.perf_counter()
+
+        # Pre-generalized datastore of the layers with overview tables (generalization info of all of them written at once)
+        generalized_datastore = None
+        if self.ingest_params.overview_tolerances and geo_params.overview_mode == 'pregeneralized':
+            overview_datasets = [d for d in (self.set_table_info(d) for d in datasets if d.carto_type == "vector") if d.overviews]
+            if overview_datasets:
+                generalized_datastore = check_geoserver_generalized_datastore(geo, workspace, datastore, overview_datasets, geo_params.overview_config)
+
+        # Asynchronous publishing: the requests of all the datasets overlap, up to 'workers' in flight
+        if geo_params.async_requests and datasets:
+            asyncio.run(self.publish_datasets_async(geo, datasets, generalized_datastore, workers))
+
+        # Concurrent publishing: each worker updates the status of its own Dataset object
+        elif workers > 1 and len(datasets) > 1:
+            publish_geoserver_datasets(geo, datasets, lambda geo, dataset: self.publish_dataset(geo, dataset, generalized_datastore), workers, thread_name_prefix=f"{self.bundle_id}-geoserver")
+
+        else:
+            for dataset in datasets:
+                self.publish_dataset(geo, dataset, generalized_datastore)
+
+        actual_makespan = time.perf_counter() - start
+        self.output_info.set_makespan('geoserver', predicted_makespan, actual_makespan)
+        logging.info(f"{log_module}:Makespan 'geoserver': predicted {predicted_makespan:.1f}s | actual {actual_makespan:.1f}s")
+        self.record_ledger(datasets, 'geoserver', 'geoserver_uploaded')
+        self.log_pool_stats()
+
+        if geo.catalog is not None:
+            geo.catalog.log_stats()
+
+        # Keep-alive reuse of the Geoserver session
+        stats = geo.get_connection_stats()
+        logging.info(f"{log_module}:Geoserver connections: {stats['requests']} requests | {stats['connections']} connections opened | {stats['reused']} reused")
+        geo.close()
+
+        return self
+
+    def publish_dataset(self, geo, dataset, generalized_datastore: Optional[str] = None):
+        """
+        Publish a dataset in Geoserver if it is available in the database (or a raster to upload).
+
+        Parameters
+        ----------
+        - geo: Geoserver connection object.
+        - dataset: Dataset object.
+        - generalized_datastore: Pre-generalized datastore of the layers with overview tables.
+
+        Return
+        ----------
+        Dataset object
+        """
+        if dataset.status == "db_uploaded" or dataset.status == "geo_to-load":
+            if dataset.carto_type == "vector":
+                dataset = self.set_table_info(dataset)
+            dataset = self.create_layer(geo, dataset, generalized_datastore)
+
+        elif dataset.status == 'db_to-load':
+            dataset = self.set_table_info(dataset)
+            if dataset.status == "db_uploaded":
+                dataset = self.create_layer(geo, dataset, generalized_datastore)
+
+        return dataset
+
+    async def publish_datasets_async(self, geo, datasets: list, generalized_datastore: Optional[str] = None, max_requests: Optional[int] = 10):
+        """
+        Publish the datasets in Geoserver with the asyncio client, sharing the catalog cache of the Geoserver object.
+
+        Parameters
+        ----------
+        - geo: Geoserver connection object (catalog cache).
+        - datasets: List of Dataset objects.
+        - generalized_datastore: Pre-generalized datastore of the layers with overview tables.
+        - max_requests: Maximum number of requests in flight to the Geoserver host.
+        """
+        geo_params = self.geoserver_params
+        logging.info(f"{log_module}:Asynchronous Geoserver publishing | In-flight requests: {max_requests}")
+        async with AsyncGeoserver(geo_params.url, username=geo_params.username, password=geo_params.password, proxies=self.proxies, max_requests=max_requests) as async_geo:
+            async_geo.catalog = geo.catalog
+            results = await asyncio.gather(*(self.publish_dataset_async(async_geo, dataset, generalized_datastore) for dataset in datasets), return_exceptions=True)
+
+        for dataset, result in zip(datasets, results):
+            if isinstance(result, Exception):
+                logging.error(f"{log_module}:Error when publishing: '{dataset.identifier}': {result}")
+                dataset.set_status('error')
+                dataset.set_status_info(f"Error when publishing: '{dataset.schema}.{dataset.table}' in Geoserver: {result}")
+
+        stats = async_geo.get_stats()
+        logging.info(f"{log_module}:Asynchronous Geoserver requests: {stats['requests']} | Max. in flight: {stats['max_in_flight']}")
+
+    async def publish_dataset_async(self, geo, dataset, generalized_datastore: Optional[str] = None):
+        """
+        Publish a dataset in Geoserver and its overview tables with the asyncio client (see publish_dataset and create_layer).
+
+        Parameters
+        ----------
+        - geo: AsyncGeoserver connection object.
+        - dataset: Dataset object.
+        - generalized_datastore: Pre-generalized datastore of the layers with overview tables.
+
+        Return
+        ----------
+        Dataset object
+        """
+        geo_params = self.geoserver_params
+        # The table info may be queried from the database: in a thread, not blocking the event loop
+        if dataset.status == 'db_to-load' or (dataset.carto_type == "vector" and dataset.status in ("db_uploaded", "geo_to-load")):
+            dataset = await asyncio.get_running_loop().run_in_executor(None, self.set_table_info, dataset)
+        if dataset.status not in ("db_uploaded", "geo_to-load"):
+            return dataset
+
+        if dataset.overviews and generalized_datastore is not None:
+            return await create_geoserver_layer_async(geo, geo_params.workspace, generalized_datastore, dataset, self.db_type, dataset.file_srid, geo_params.declared_srid)
+
+        dataset = await create_geoserver_layer_async(geo, geo_params.workspace, geo_params.datastore, dataset, self.db_type, dataset.file_srid, geo_params.declared_srid)
+        if dataset.overviews and dataset.status != 'error':
+            dataset = await create_geoserver_overviews_async(geo, geo_params.workspace, geo_params.datastore, dataset, dataset.file_srid, geo_params.declared_srid)
+
+        return dataset
+
+    def create_layer(self, geo, dataset, generalized_datastore: Optional[str] = None):
+        """
+        Publish a dataset in Geoserver and its overview tables: from the pre-generalized datastore (if available) or as a layer by overview.
+
+        Parameters
+        ----------
+        - geo: Geoserver connection object.
+        - dataset: Dataset object.
+        - generalized_datastore: Pre-generalized datastore of the layers with overview tables.
+
+        Return
+        ----------
+        Dataset object
+        """
+        geo_params = self.geoserver_params
+        if dataset.overviews and generalized_datastore is not None:
+            return create_geoserver_layer(geo, geo_params.workspace, generalized_datastore, dataset, self.db_type, dataset.file_srid, geo_params.declared_srid)
+
+        dataset = create_geoserver_layer(geo, geo_params.workspace, geo_params.datastore, dataset, self.db_type, dataset.file_srid, geo_params.declared_srid)
+        if dataset.overviews and dataset.status != 'error':
+            dataset = create_geoserver_overviews(geo, geo_params.workspace, geo_params.datastore, dataset, dataset.file_srid, geo_params.declared_srid)
 
-        return self
\ No newline at end of file
+        return dataset
\ No newline at end of file
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+## Coding: UTF-8
+## Author: mjanez@tragsa.es
+## Institution: -
+## Project: -
+# inbuilt libraries
+import logging
+import threading
+import time
+from typing import Optional
+
+# third-party libraries
+import numpy as np
+import shapely
+from pyproj import CRS, Transformer
+from pyproj.exceptions import CRSError
+
+
+log_module = f"[{__name__}]"
+
+# shapely.get_type_id of the single geometries and the constructor of its multi geometry
+MULTI_CONSTRUCTORS = {
+    0: shapely.multipoints,         # Point -> MultiPoint
+    1: shapely.multilinestrings,    # LineString -> MultiLineString
+    3: shapely.multipolygons,       # Polygon -> MultiPolygon
+}
+
+# Radius (m) of the sphere of the OGC scale denominators of the geographic CRS (a degree is 111319.49 m)
+OGC_EARTH_RADIUS = 6378137
+
+# pyproj Transformers are not thread safe, each thread (and worker process) caches its own
+_transformers = threading.local()
+
+def normalize_geometries(geoms, force_multi: Optional[bool] = True, force_2d: Optional[bool] = False):
+    """
+    Normalize an array of geometries with shapely vectorized functions.
+
+    Empty geometries are stored as NULL, single geometries (Point, LineString, Polygon) are promoted to its
+    multi geometry so each table has only one geometry family, and Z coordinates are dropped if needed.
+
+    Parameters
+    ----------
+        - geoms: Array of shapely geometries (e.g. GeoSeries.values).
+        - force_multi: Promote single geometries to multi geometries.
+        - force_2d: Drop the Z coordinates.
+
+    Return
+    ----------
+    Numpy array of geometries and dict with the time elapsed (seconds) of each stage.
+    """
+    timings = {}
+    geoms = np.array(geoms, dtype=object)
+
+    # Empty geometries to NULL
+    start = time.perf_counter()
+    geoms[shapely.is_empty(geoms)] = None
+    timings['empty'] = time.perf_counter() - start
+
+    # Drop Z
+    if force_2d:
+        start = time.perf_counter()
+        if shapely.has_z(geoms).any():
+            geoms = shapely.force_2d(geoms)
+        timings['force_2d'] = time.perf_counter() - start
+
+    # Single to multi geometries, NULL geometries have type_id -1
+    if force_multi:
+        start = time.perf_counter()
+        type_ids = shapely.get_type_id(geoms)
+        for type_id, constructor in MULTI_CONSTRUCTORS.items():
+            mask = type_ids == type_id
+            if mask.any():
+                geoms[mask] = constructor(geoms[mask][:, np.newaxis])
+        timings['force_multi'] = time.perf_counter() - start
+
+    return geoms, timings
+
+def hilbert_distance(x, y, level: Optional[int] = 16):
+    """
+    Returns the distance along a Hilbert curve of integer grid coordinates.
+
+    Parameters
+    ----------
+        - x: Numpy array of integer X coordinates in [0, 2^level).
+        - y: Numpy array of integer Y coordinates in [0, 2^level).
+        - level: Order of the Hilbert curve (grid of 2^level x 2^level cells).
+
+    Return
+    ----------
+    Numpy array of Hilbert distances
+    """
+    n = 1 << level
+    x = x.astype(np.int64)
+    y = y.astype(np.int64)
+    d = np.zeros(len(x), dtype=np.int64)
+
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+
+    return d
+
+def hilbert_bounds_distance(bounds, level: Optional[int] = 16):
+    """
+    Returns the distance along a Hilbert curve of the centers of an array of bounds, scaled to its extent.
+
+    NULL bounds (NaN) get the maximum distance.
+
+    Parameters
+    ----------
+        - bounds: Numpy array of (minx, miny, maxx, maxy) rows (e.g. shapely.bounds).
+        - level: Order of the Hilbert curve.
+
+    Return
+    ----------
+    Numpy array of Hilbert distances
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+    valid = ~np.isnan(cx)
+    if not valid.any():
+        return np.full(len(cx), np.iinfo(np.int64).max, dtype=np.int64)
+
+    # Scale the centers to the Hilbert grid
+    cells = (1 << level) - 1
+    minx, maxx = cx[valid].min(), cx[valid].max()
+    miny, maxy = cy[valid].min(), cy[valid].max()
+    x = np.nan_to_num((cx - minx) / ((maxx - minx) or 1) * cells)
+    y = np.nan_to_num((cy - miny) / ((maxy - miny) or 1) * cells)
+
+    distance = hilbert_distance(x, y, level)
+    distance[~valid] = np.iinfo(np.int64).max
+
+    return distance
+
+def hilbert_sort_index(geoms, level: Optional[int] = 16):
+    """
+    Returns the indices that sort an array of geometries along a Hilbert curve of the centers of its bounds.
+
+    NULL geometries are placed at the end.
+
+    Parameters
+    ----------
+        - geoms: Array of shapely geometries (e.g. GeoSeries.values).
+        - level: Order of the Hilbert curve.
+
+    Return
+    ----------
+    Numpy array of indices
+    """
+    bounds = shapely.bounds(np.asarray(geoms, dtype=object))
+
+    return np.argsort(hilbert_bounds_distance(bounds, level), kind='stable')
+
+def grid_cell_keys(geoms, cell_size: float):
+    """
+    Returns the key ('<column>_<row>') of the grid cell of the center of the bounds of each geometry.
+
+    Parameters
+    ----------
+        - geoms: Array of shapely geometries (e.g. GeoSeries.values).
+        - cell_size: Size of the grid cells, in the units of the coordinates.
+
+    Return
+    ----------
+    Numpy array of keys (None for NULL geometries)
+    """
+    bounds = shapely.bounds(np.asarray(geoms, dtype=object))
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+    valid = ~np.isnan(cx)
+
+    keys = np.full(len(cx), None, dtype=object)
+    if valid.any():
+        columns = np.floor(cx[valid] / cell_size).astype(np.int64).astype(str)
+        rows = np.floor(cy[valid] / cell_size).astype(np.int64).astype(str)
+        keys[valid] = np.char.add(np.char.add(columns, '_'), rows)
+
+    return keys
+
+def snap_to_grid(geoms, grid_size: float):
+    """
+    Snap the coordinates of an array of geometries to a grid with shapely set_precision.
+
+    The repeated vertices are removed and the collapsed parts dropped, keeping valid geometries.
+
+    Parameters
+    ----------
+        - geoms: Array of shapely geometries (e.g. GeoSeries.values).
+        - grid_size: Size of the grid, in the units of the coordinates.
+
+    Return
+    ----------
+    Numpy array of geometries and number of bytes of the coordinates removed.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    coordinates = shapely.get_num_coordinates(geoms).sum()
+    dimensions = 3 if shapely.has_z(geoms).any() else 2
+
+    geoms = shapely.set_precision(geoms, grid_size)
+    removed = coordinates - shapely.get_num_coordinates(geoms).sum()
+
+    return geoms, int(removed) * 8 * dimensions
+
+def get_transformer(source_crs, target_crs):
+    """
+    Returns a cached pyproj Transformer (always_xy) between two CRS.
+
+    The Transformers are cached per thread by (source, target) CRS pair, so the costly PROJ pipeline
+    lookup is done once per pair and reused by all the batches and datasets loaded in the thread.
+
+    Parameters
+    ----------
+        - source_crs: Source CRS (pyproj.CRS, EPSG code, WKT...).
+        - target_crs: Target CRS (pyproj.CRS, EPSG code, WKT...).
+
+    Return
+    ----------
+    pyproj.Transformer
+    """
+    cache = getattr(_transformers, 'cache', None)
+    if cache is None:
+        cache = _transformers.cache = {}
+
+    key = (CRS.from_user_input(source_crs).to_wkt(), CRS.from_user_input(target_crs).to_wkt())
+    transformer = cache.get(key)
+    if transformer is None:
+        transformer = Transformer.from_crs(key[0], key[1], always_xy=True)
+        cache[key] = transformer
+
+    return transformer
+
+def get_crs_srid(crs):
+    """
+    Returns the SRID of a CRS: its EPSG code, else its ESRI code (e.g. ESRI .prj files), else 0 (unknown SRID).
+
+    The codes are matched with a decreasing confidence, as GeoDataFrame.to_postgis does.
+
+    Parameters
+    ----------
+        - crs: CRS (pyproj.CRS, EPSG code, WKT...) or None.
+
+    Return
+    ----------
+    SRID int
+    """
+    if crs is None:
+        return 0
+
+    try:
+        crs = CRS.from_user_input(crs)
+        for confidence in (100, 70, 25):
+            srid = crs.to_epsg(min_confidence=confidence)
+            if srid is not None:
+                return srid
+            authority = crs.to_authority(auth_name="ESRI", min_confidence=confidence)
+            if authority is not None:
+                return int(authority[1])
+    except Exception as e:
+        logging.warning(f"{log_module}:The SRID of the CRS could not be identified: {e}")
+
+    return 0
+
+def get_unit_size(crs):
+    """
+    Returns the size (m) of a unit of the coordinates of a CRS, as measured by the OGC scale denominators: the linear
+    unit of the projected CRS and the length of an angular unit along the equator of the geographic CRS.
+
+    Parameters
+    ----------
+        - crs: CRS (pyproj.CRS, EPSG/ESRI SRID, WKT...).
+
+    Return
+    ----------
+    Metres by unit float. Raises ValueError if the CRS or its units are unknown.
+    """
+    try:
+        if isinstance(crs, int) or str(crs).isdigit():
+            try:
+                crs = CRS.from_epsg(int(crs))
+            except CRSError:
+                crs = CRS.from_authority("ESRI", str(crs))
+        else:
+            crs = CRS.from_user_input(crs)
+    except CRSError as e:
+        raise ValueError(f"Unknown CRS: {crs}") from e
+
+    if not crs.axis_info or not crs.axis_info[0].unit_conversion_factor:
+        raise ValueError(f"Unknown units of the CRS: {crs.name}")
+
+    # Angular units are converted to radians
+    factor = crs.axis_info[0].unit_conversion_factor
+    return factor * OGC_EARTH_RADIUS if crs.is_geographic else factor
+
+def get_latlon_bbox(bbox, source_crs):
+    """
+    Returns the lat/lon (EPSG:4326) bounding box of a bounding box, densified along its edges so the curved
+    edges of the reprojected box are enclosed.
+
+    Parameters
+    ----------
+        - bbox: (minx, miny, maxx, maxy) tuple.
+        - source_crs: CRS of the bounding box (pyproj.CRS, EPSG code, WKT...).
+
+    Return
+    ----------
+    (minlon, minlat, maxlon, maxlat) tuple
+    """
+    transformer = get_transformer(source_crs, "EPSG:4326")
+
+    return tuple(transformer.transform_bounds(*bbox, densify_pts=21))
+
+def reproject_geometries(geoms, source_crs, target_crs):
+    """
+    Reproject an array of geometries with vectorized pyproj calls over its coordinate arrays.
+
+    Parameters
+    ----------
+        - geoms: Array of shapely geometries (e.g. GeoSeries.values).
+        - source_crs: Source CRS (pyproj.CRS, EPSG code, WKT...).
+        - target_crs: Target CRS (pyproj.CRS, EPSG code, WKT...).
+
+    Return
+    ----------
+    Numpy array of geometries
+    """
+    transformer = get_transformer(source_crs, target_crs)
+    geoms = np.array(geoms, dtype=object)
+
+    def transform_xy(coords):
+        return np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+
+    def transform_xyz(coords):
+        return np.column_stack(transformer.transform(coords[:, 0], coords[:, 1], coords[:, 2]))
+
+    # 3D geometries keep its Z coordinates (transformed if the CRS have a vertical component)
+    has_z = shapely.has_z(geoms)
+    if has_z.any():
+        geoms[has_z] = shapely.transform(geoms[has_z], transform_xyz, include_z=True)
+        geoms[~has_z] = shapely.transform(geoms[~has_z], transform_xy)
+    else:
+        geoms = shapely.transform(geoms, transform_xy)
+
+    return geoms
+
+def log_timings(identifier: str, timings: dict):
+    """
+    Log the time elapsed by each stage of a dataset load.
+
+    Parameters
+    ----------
+        - identifier: Dataset identifier.
+        - timings: dict with the seconds elapsed by stage.
+
+    Return
+    ----------
+    Timings summary str
+    """
+    summary = ", ".join(f"{stage}: {elapsed:.3f}s" for stage, elapsed in timings.items())
+    logging.info(f"{log_module}:Stage timings of: '{identifier}' | {summary}")
+
+    return summary
@@ -4,16 +4,68 @@
 ## Institution: -
 ## Project: -
 # inbuilt libraries
+import asyncio
 import glob
 import os
 import logging
 import hashlib
+import threading
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+import xml.etree.ElementTree as ET
+
+# custom functions
+from controller.geometrymanager import get_unit_size
+from model.Geoserver import get_scale_style_sld
 
 
 log_module = f"[{__name__}]"
 log_model_geo = f"[model.geoserver]"
 
+# Size (m) of a rendering pixel of the OGC scale denominators (0.28 mm)
+OGC_PIXEL_SIZE = 0.00028
+
+# Check and create of the shared resources (workspaces, datastores, generalization info XML) by one publishing thread at a time
+_resource_lock = threading.RLock()
+
+
+def check_geoserver_resource(geo, kind: str, name: str, workspace: Optional[str] = None):
+    """
+    Check if a resource exists in Geoserver: lookup in the catalog cache of the Geoserver object (geo.catalog)
+    or, without catalog, a GET request of the resource.
+
+    Parameters
+    ----------
+    - geo: Geoserver connection object.
+    - kind: Resource type: 'workspace', 'datastore', 'coveragestore', 'layer', 'style' or 'layergroup'.
+    - name: Resource name.
+    - workspace: Geoserver workspace.
+
+    Return
+    ----------
+    True if exists
+    """
+    if geo.catalog is not None:
+        try:
+            return geo.catalog.has(kind, name, workspace)
+        except Exception as e:
+            logging.warning(f"{log_module}:Geoserver catalog lookup of {kind}: '{name}' failed, request the resource: {e}")
+
+    probes = {
+        'workspace': lambda: geo.get_workspace(workspace=name),
+        'datastore': lambda: geo.get_datastore(store_name=name, workspace=workspace),
+        'coveragestore': lambda: geo.get_coveragestore(coveragestore_name=name, workspace=workspace),
+        'layer': lambda: geo.get_layer(layer_name=name, workspace=workspace),
+        'style': lambda: geo.get_style(style_name=name, workspace=workspace),
+        'layergroup': lambda: geo.get_layergroup(layer_name=name, workspace=workspace),
+    }
+    try:
+        probes[kind]()
+        return True
+    except:
+        return False
 
 def check_geoserver_workspace(geo, workspace: str, datastore: str):
     """
@@ -25,15 +77,15 @@ def check_geoserver_workspace(geo, workspace: str, datastore: str):
     - workspace: Geoserver workspace.
     - datastore: Geoserver datastore.
     """
-    try:
-        geo.get_workspace(workspace=workspace)
-        logging.warning(f"{log_module}:Workspace: '{workspace}' exists.")
-    except:
-        try:
-            geo.create_workspace(workspace=workspace)
-            logging.info(f"{log_module}:Created workspace: '{datastore}'")
-        except Exception as e:
-            logging.exception(f"{log_model_geo}:{e}")
+    with _resource_lock:
+        if check_geoserver_resource(geo, 'workspace', workspace):
+            logging.warning(f"{log_module}:Workspace: '{workspace}' exists.")
+        else:
+            try:
+                geo.create_workspace(workspace=workspace)
+                logging.info(f"{log_module}:Created workspace: '{datastore}'")
+            except Exception as e:
+                logging.exception(f"{log_model_geo}:{e}")
                             
 def check_geoserver_datastore(geo, workspace: str, datastore: str, db_type: str, db_params):
     """
@@ -50,19 +102,195 @@ def check_geoserver_datastore(geo, workspace: str, datastore: str, db_type: str,
 
     # PostGIS
     if db_type == "postgres" or db_type == "postgis":
-        try:
-            geo.get_datastore(store_name=datastore, workspace=workspace)
-            logging.warning(f"{log_module}:Datastore: '{datastore}' exists.")
-        except:
-            try:
-                geo.create_featurestore(store_name=datastore, workspace=workspace, db=db_params.dbname, host=db_params.host, pg_user=db_params.username, pg_password=db_params.password)
-                logging.info(f"{log_module}:Created datastore: '{datastore}'")
-            except Exception as e:
-                logging.exception(f"{log_model_geo}:{e}")
+        with _resource_lock:
+            if check_geoserver_resource(geo, 'datastore', datastore, workspace):
+                logging.warning(f"{log_module}:Datastore: '{datastore}' exists.")
+            else:
+                try:
+                    geo.create_featurestore(store_name=datastore, workspace=workspace, db=db_params.dbname, host=db_params.host, pg_user=db_params.username, pg_password=db_params.password)
+                    logging.info(f"{log_module}:Created datastore: '{datastore}'")
+                except Exception as e:
+                    logging.exception(f"{log_model_geo}:{e}")
 
     else:
         logging.info(f"{log_module}:Create Geoserver datastore of db_type: '{db_type}' not supported yet.")
 
+def get_generalized_datastore(datastore: str):
+    """
+    Returns the name of the pre-generalized datastore of a PostGIS datastore.
+    """
+    return f"{datastore}_gen"
+
+def get_overview_layergroup(table: str):
+    """
+    Returns the name of the scale-dependent layer group of a table and its overview tables.
+    """
+    return f"{table}_overviews"
+
+def get_overview_scale(tolerance: float, srid):
+    """
+    Returns the scale denominator from which an overview table is used: the scale where its simplification tolerance
+    is smaller than a rendering pixel. The tolerance is converted to metres with the units of the SRID (a degree of
+    a geographic CRS measures 111319.49 m along the equator, as the OGC scale denominators).
+
+    Parameters
+    ----------
+    - tolerance: Simplification tolerance of the overview table, in the units of the SRID.
+    - srid: SRID of the table and its overview tables.
+
+    Return
+    ----------
+    Scale denominator. Raises ValueError if the units of the SRID are unknown.
+    """
+    return tolerance * get_unit_size(srid) / OGC_PIXEL_SIZE
+
+def get_overview_ranges(dataset, srid):
+    """
+    Returns the scale range of the table of a dataset and each of its overview tables: the table is drawn at larger
+    scales than the first overview, and each overview up to the scale of the next one.
+
+    Parameters
+    ----------
+    - dataset: Dataset object with overview tables.
+    - srid: SRID of the table and its overview tables.
+
+    Return
+    ----------
+    List of (table, min scale denominator, max scale denominator) tuples, None if unbounded
+    """
+    scales = [get_overview_scale(overview['tolerance'], srid) for overview in dataset.overviews]
+    tables = [dataset.table] + [overview['table'] for overview in dataset.overviews]
+
+    return list(zip(tables, [None] + scales, scales + [None]))
+
+def format_scale_range(min_scale: Optional[float] = None, max_scale: Optional[float] = None):
+    """
+    Returns the text of a scale range, e.g. '1:35,714 - 1:357,143'.
+    """
+    if min_scale is None:
+        return f"larger than 1:{max_scale:,.0f}"
+    elif max_scale is None:
+        return f"1:{min_scale:,.0f} and smaller"
+
+    return f"1:{min_scale:,.0f} - 1:{max_scale:,.0f}"
+
+def get_overview_styles(dataset, ranges: list):
+    """
+    Returns the scale-dependent styles of the table of a dataset and its overview tables.
+
+    Parameters
+    ----------
+    - dataset: Dataset object with overview tables.
+    - ranges: Scale ranges of the tables (see get_overview_ranges).
+
+    Return
+    ----------
+    List of (table, style name, SLD) tuples
+    """
+    return [(table, f"{table}_scale", get_scale_style_sld(f"{table}_scale", table, dataset.geometry_type, min_scale, max_scale))
+            for table, min_scale, max_scale in ranges]
+
+def write_generalization_info(config_path: str, workspace: str, datastore: str, datasets: list):
+    """
+    Write (or update) the generalization info XML of a pre-generalized datastore with the overview tables of the datasets.
+
+    Parameters
+    ----------
+    - config_path: Path of the generalization info XML.
+    - workspace: Geoserver workspace.
+    - datastore: Geoserver PostGIS datastore of the dataset and overview tables.
+    - datasets: List of Dataset objects with overview tables.
+    """
+    if os.path.isfile(config_path):
+        root = ET.parse(config_path).getroot()
+    else:
+        root = ET.Element('GeneralizationInfos', version='1.0')
+
+    for dataset in datasets:
+        for info in root.findall('GeneralizationInfo'):
+            if info.get('featureName') == dataset.table:
+                root.remove(info)
+
+        info = ET.SubElement(root, 'GeneralizationInfo', dataSourceName=f"{workspace}:{datastore}", featureName=dataset.table, baseFeatureName=dataset.table, geomPropertyName='geom')
+        for overview in dataset.overviews:
+            ET.SubElement(info, 'Generalization', dataSourceName=f"{workspace}:{datastore}", distance=str(overview['tolerance']), featureName=overview['table'], geomPropertyName='geom')
+
+    ET.indent(root)
+    ET.ElementTree(root).write(config_path, encoding='UTF-8', xml_declaration=True)
+
+def check_geoserver_generalized_datastore(geo, workspace: str, datastore: str, datasets: list, config_path: Optional[str] = None):
+    """
+    Create (or reload) the pre-generalized datastore of the datasets with overview tables. Geoserver selects the overview
+    table of each request by its generalization distance (Geoserver pre-generalized features extension).
+
+    Parameters
+    ----------
+    - geo: Geoserver connection object.
+    - workspace: Geoserver workspace.
+    - datastore: Geoserver PostGIS datastore of the dataset and overview tables.
+    - datasets: List of Dataset objects with overview tables.
+    - config_path: Path of the generalization info XML, readable by Geoserver.
+
+    Return
+    ----------
+    Name of the pre-generalized datastore or None if not available (the overview tables are published as layers)
+    """
+    if not config_path:
+        logging.warning(f"{log_module}:The generalization info XML (geo_overview_config) is not defined, the overview tables are published as layers.")
+        return None
+
+    generalized_datastore = get_generalized_datastore(datastore)
+    try:
+        with _resource_lock:
+            write_generalization_info(config_path, workspace, datastore, datasets)
+            exists = check_geoserver_resource(geo, 'datastore', generalized_datastore, workspace)
+
+            # The datastore is updated to reload the generalization info
+            geo.create_pregeneralized_datastore(store_name=generalized_datastore, config_url=Path(config_path).resolve().as_uri(), workspace=workspace, overwrite=exists)
+        logging.info(f"{log_module}:{'Reloaded' if exists else 'Created'} pre-generalized datastore: '{generalized_datastore}' with {len(datasets)} layers")
+
+    except Exception as e:
+        logging.exception(f"{log_model_geo}:{e}")
+        return None
+
+    return generalized_datastore
+
+def publish_geoserver_datasets(geo, datasets: list, publish, workers: int, thread_name_prefix: Optional[str] = 'geoserver'):
+    """
+    Publish the datasets in Geoserver with a pool of threads, each one updates the status of its own Dataset object.
+    The errors raised by the publishing of a dataset are set in its status, the other datasets are published.
+
+    The threads share the requests.Session of the Geoserver object: it is only configured (auth, proxies, adapters) by its
+    constructor, the urllib3 connection pool of its adapters and its cookie jar are thread-safe, and the pool keeps up to
+    pool_size connections (>= workers, so no connection is discarded). The shared resources (workspaces, datastores and
+    pre-generalized datastores) are checked and created under _resource_lock.
+
+    Parameters
+    ----------
+    - geo: Geoserver connection object.
+    - datasets: List of Dataset objects.
+    - publish: Function publish(geo, dataset) of a dataset.
+    - workers: Number of publishing threads (in-flight requests).
+    - thread_name_prefix: Prefix of the thread names (logs).
+
+    Return
+    ----------
+    List of Dataset objects
+    """
+    logging.info(f"{log_module}:Concurrent Geoserver publishing | In-flight requests: {workers}")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as executor:
+        futures = {executor.submit(publish, geo, dataset): dataset for dataset in datasets}
+        for future in as_completed(futures):
+            dataset = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logging.exception(f"{log_module}:Error when publishing: '{dataset.identifier}': {e}")
+                dataset.set_status('error')
+                dataset.set_status_info(f"Error when publishing: '{dataset.schema}.{dataset.table}' in Geoserver: {e}")
+
+    return datasets
+
 def get_geoserver_layername(name: str):
     """
     Check and create (if needed) the layername in Geoserver.
@@ -94,13 +322,32 @@ def get_geoserver_layername(name: str):
         geoserver_name = hashlib.sha1(name.encode("utf-8")).hexdigest()
     return geoserver_name
 
-def create_geoserver_layer(geo, workspace: str, datastore: str, dataset, db_type, file_srid, declared_srid):
+def get_featuretype_layout(dataset, file_srid, attributes: Optional[bool] = True):
     """
-    Create a Geoserver layer from differente origin
+    Returns the precomputed bounding boxes and attributes of the table of a dataset, as publish_featurestore arguments.
+
+    Parameters
+    ----------
+    - dataset: Dataset object.
+    - file_srid: Dataset native CRS code.
+    - attributes: Include the attributes of the table.
+
+    Return
+    ----------
+    dict of arguments (empty if the bounding boxes are not available in the native CRS, then computed by Geoserver)
+    """
+    if not dataset.bbox or str(dataset.bbox['srid']) != str(file_srid):
+        return {}
+
+    return dict(native_bbox=dataset.bbox['native'], latlon_bbox=dataset.bbox['latlon'], attributes=dataset.attributes if attributes else None)
+
+def get_layer_request(workspace: str, datastore: str, dataset, db_type, file_srid, declared_srid):
+    """
+    Returns the Geoserver request that publishes a dataset as a layer, shared by the blocking and asyncio publishers
+    (create_geoserver_layer and create_geoserver_layer_async) so only the transport differs.
 
     Parameters
     ----------
-    geo: Geoserver connection object.
     workspace: Geoserver workspace.
     datastore: Geoserver datastore.
     dataset: Dataset object to upload into PostGIS.
@@ -110,9 +357,9 @@ def create_geoserver_layer(geo, workspace: str, datastore: str, dataset, db_type
 
     Return
     ----------
-    Dataset object
+    dict {'kind', 'method', 'kwargs', 'declared_srid', 'message', 'error'} of the request, or None if the dataset can not
+    be published (status set to error if not supported)
     """
-
     dataset.set_ogc_workspace(workspace)
     dataset.set_ogc_layer(get_geoserver_layername(dataset.table))
 
@@ -121,56 +368,366 @@ def create_geoserver_layer(geo, workspace: str, datastore: str, dataset, db_type
 
         # PostGIS
         if db_type == "postgres" or db_type == "postgis":
-            try:
-                geo.get_layer(layer_name=dataset.table, workspace=workspace)
-                logging.warning(f"{log_module}:Layer: '{dataset.table}' exists.")
-            except:
-                try:
-                    geo.publish_featurestore(workspace=workspace, store_name=datastore, pg_table=dataset.table, title=dataset.name,srid=file_srid, declared_srid=declared_srid)
-                    logging.info(f"{log_module}:Created table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}' with EPSG:{declared_srid}")
-                    dataset.set_status('geoserver_uploaded')
-                    dataset.set_declared_srid(declared_srid)
-                    dataset.set_status_info(f"Created table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}' with EPSG:{declared_srid}")
-
-                except Exception as e:
-                    logging.exception(f"{log_model_geo}:{e}")
-                    dataset.set_status('error')
-                    dataset.set_status_info(f"Error when trying to publish table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}'.")
+            return dict(kind='Layer', method='publish_featurestore', declared_srid=declared_srid,
+                        kwargs=dict(workspace=workspace, store_name=datastore, pg_table=dataset.table, title=dataset.name, srid=file_srid, declared_srid=declared_srid, **get_featuretype_layout(dataset, file_srid)),
+                        message=f"Created table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}' with EPSG:{declared_srid}",
+                        error=f"Error when trying to publish table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}'.")
 
         # TODO:SQL Server
         elif db_type == "sql-server":
-            logging.info(f"{log_module}:Create Geoserver FeatureType of db_type: '{db_type}' not supported yet.")
-            dataset.set_status('error')
-            dataset.set_status_info(f"Create Geoserver FeatureType of db_type: '{db_type}' not supported yet.")            
+            unsupported = f"Create Geoserver FeatureType of db_type: '{db_type}' not supported yet."
 
         else:
-            logging.info(f"{log_module}:Create Geoserver FeatureType of db_type: '{db_type}' not supported yet.")
-            dataset.set_status('error')
-            dataset.set_status_info(f"Create Geoserver FeatureType of db_type: '{db_type}' not supported yet.")
+            unsupported = f"Create Geoserver FeatureType of db_type: '{db_type}' not supported yet."
 
     # Raster data
     elif dataset.carto_type == "raster":
 
         # GeoTIFF
         if dataset.file_format == "tiff":
-            try:
-                geo.get_layer(layer_name=dataset.table, workspace=workspace)
-                logging.warning(f"{log_module}:Coverage Layer: '{dataset.table}' exists.")
-            except:
-                try:
-                    geo.create_coveragestore(path=dataset.file_path,workspace=workspace, layer_name=dataset.ogc_layer, title=dataset.name,srid=file_srid, declared_srid=declared_srid)
-                    logging.info(f"{log_module}:Created table: '{dataset.schema}.{dataset.table}' as Geoserver Coverage: '{workspace}:{dataset.ogc_layer}'")
-                    dataset.set_status('geoserver_uploaded')
-                    dataset.set_status_info(f"Created table: '{dataset.schema}.{dataset.table}' as Geoserver Coverage: '{workspace}:{dataset.ogc_layer}'")
+            return dict(kind='Coverage Layer', method='create_coveragestore', declared_srid=None,
+                        kwargs=dict(path=dataset.file_path, workspace=workspace, layer_name=dataset.ogc_layer, title=dataset.name, srid=file_srid, declared_srid=declared_srid),
+                        message=f"Created table: '{dataset.schema}.{dataset.table}' as Geoserver Coverage: '{workspace}:{dataset.ogc_layer}'",
+                        error=f"Error when trying to publish table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}'.")
 
-                except Exception as e:
-                    logging.exception(f"{log_model_geo}:{e}")
-                    dataset.set_status('error')
-                    dataset.set_status_info(f"Error when trying to publish table: '{dataset.schema}.{dataset.table}' as Geoserver FeatureType: '{workspace}:{dataset.ogc_layer}'.")
+        else:
+            unsupported = f"Create Geoserver Coverage layer of file_format: '{dataset.file_format}' not supported yet."
+
+    else:
+        return None
+
+    logging.info(f"{log_module}:{unsupported}")
+    dataset.set_status('error')
+    dataset.set_status_info(unsupported)
+
+    return None
+
+def set_layer_result(dataset, request: dict, error: Optional[Exception] = None):
+    """
+    Set the status of a dataset from the result of its layer request (see get_layer_request).
+
+    Parameters
+    ----------
+    dataset: Dataset object.
+    request: Layer request.
+    error: Exception raised by the request (called from its except block), None if published.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if error is not None:
+        logging.exception(f"{log_model_geo}:{error}")
+        dataset.set_status('error')
+        dataset.set_status_info(request['error'])
+        return dataset
+
+    logging.info(f"{log_module}:{request['message']}")
+    dataset.set_status('geoserver_uploaded')
+    if request['declared_srid'] is not None:
+        dataset.set_declared_srid(request['declared_srid'])
+    dataset.set_status_info(request['message'])
+
+    return dataset
+
+def get_overview_requests(workspace: str, datastore: str, dataset, file_srid, declared_srid):
+    """
+    Returns the Geoserver requests that publish the overview tables of a dataset, shared by the blocking and asyncio
+    publishers: a layer by overview table for the scale range of its tolerance, and the layer group that draws the table
+    or the overview table of each scale, each one with a style whose rule is limited to its scale range (Min/MaxScaleDenominator).
+
+    Parameters
+    ----------
+    workspace: Geoserver workspace.
+    datastore: Geoserver datastore.
+    dataset: Dataset object with overview tables.
+    file_srid: Dataset native CRS code (SRID of the table and its overview tables).
+    declared_srid: Geoserver declared CRS code.
+
+    Return
+    ----------
+    List of overview layer requests and the layer group request, or None if the scales can not be computed
+    """
+    try:
+        ranges = get_overview_ranges(dataset, file_srid)
+    except ValueError as e:
+        logging.error(f"{log_module}:The scales of the overview tables of: '{dataset.schema}.{dataset.table}' could not be computed: {e}")
+        dataset.set_status_info(f"Error computing the scales of the overview tables of: '{dataset.schema}.{dataset.table}': {e}")
+        return None
+
+    overview_requests = []
+    for overview, (_, min_scale, max_scale) in zip(dataset.overviews, ranges[1:]):
+        scale_range = format_scale_range(min_scale, max_scale)
+        overview_requests.append(dict(
+            kwargs=dict(workspace=workspace, store_name=datastore, pg_table=overview['table'], title=f"{dataset.name} ({scale_range})",
+                        abstract=f"Overview of: '{workspace}:{dataset.ogc_layer}' for scales {scale_range}", srid=file_srid, declared_srid=declared_srid,
+                        **get_featuretype_layout(dataset, file_srid, attributes=False)),
+            message=f"Created overview table: '{dataset.schema}.{overview['table']}' as Geoserver FeatureType: '{workspace}:{overview['table']}' for scales {scale_range}",
+            error=f"Error when trying to publish overview table: '{dataset.schema}.{overview['table']}' as Geoserver FeatureType."))
+
+    layergroup = get_overview_layergroup(dataset.table)
+    styles = get_overview_styles(dataset, ranges)
+    layergroup_request = dict(
+        styles=[dict(name=style, sld=sld, workspace=workspace) for _, style, sld in styles],
+        kwargs=dict(name=layergroup, layers=[table for table, _, _ in styles], styles=[style for _, style, _ in styles], workspace=workspace,
+                    title=dataset.name, abstract=f"Scale-dependent overviews of: '{workspace}:{dataset.ogc_layer}'"),
+        message=f"Created layer group: '{workspace}:{layergroup}' of: '{dataset.table}' and {len(dataset.overviews)} overview tables",
+        error=f"Error when trying to publish the layer group: '{workspace}:{layergroup}' of the overview tables.")
+
+    return overview_requests, layergroup_request
+
+def set_overview_result(dataset, request: dict, error: Optional[Exception] = None):
+    """
+    Set the status info of a dataset from the result of an overview layer or layer group request (see get_overview_requests).
+    The overviews do not change the status of the dataset.
+
+    Parameters
+    ----------
+    dataset: Dataset object.
+    request: Overview layer or layer group request.
+    error: Exception raised by the request (called from its except block), None if published.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if error is not None:
+        logging.exception(f"{log_model_geo}:{error}")
+        dataset.set_status_info(request['error'])
+    else:
+        logging.info(f"{log_module}:{request['message']}")
+        dataset.set_status_info(request['message'])
+
+    return dataset
+
+def create_geoserver_layer(geo, workspace: str, datastore: str, dataset, db_type, file_srid, declared_srid):
+    """
+    Create a Geoserver layer from differente origin
+
+    Parameters
+    ----------
+    geo: Geoserver connection object.
+    workspace: Geoserver workspace.
+    datastore: Geoserver datastore.
+    dataset: Dataset object to upload into PostGIS.
+    db_type: Database type.
+    file_srid: Dataset native CRS code.
+    declared_srid: Geoserver declared CRS code.
+
+    Return
+    ----------
+    Dataset object
+    """
+    request = get_layer_request(workspace, datastore, dataset, db_type, file_srid, declared_srid)
+    if request is None:
+        return dataset
+
+    if check_geoserver_resource(geo, 'layer', dataset.table, workspace):
+        logging.warning(f"{log_module}:{request['kind']}: '{dataset.table}' exists.")
+        return dataset
+
+    try:
+        getattr(geo, request['method'])(**request['kwargs'])
+    except Exception as e:
+        return set_layer_result(dataset, request, e)
+
+    return set_layer_result(dataset, request)
+
+def create_geoserver_overview_layergroup(geo, dataset, request: dict):
+    """
+    Create (or update) the styles and the layer group that switches between the table of a dataset and its overview
+    tables by scale.
+
+    Parameters
+    ----------
+    geo: Geoserver connection object.
+    dataset: Dataset object with overview tables.
+    request: Layer group request (see get_overview_requests).
+
+    Return
+    ----------
+    Dataset object
+    """
+    layergroup = request['kwargs']
+    try:
+        for style in request['styles']:
+            geo.create_sld_style(**style, overwrite=check_geoserver_resource(geo, 'style', style['name'], style['workspace']))
+        geo.publish_layergroup(**layergroup, overwrite=check_geoserver_resource(geo, 'layergroup', layergroup['name'], layergroup['workspace']))
+    except Exception as e:
+        return set_overview_result(dataset, request, e)
+
+    return set_overview_result(dataset, request)
 
+def create_geoserver_overviews(geo, workspace: str, datastore: str, dataset, file_srid, declared_srid):
+    """
+    Publish the overview tables of a dataset as Geoserver layers, each one for the scale range of its tolerance, and
+    the layer group that draws the table or the overview table of each scale (see get_overview_requests).
+
+    Parameters
+    ----------
+    geo: Geoserver connection object.
+    workspace: Geoserver workspace.
+    datastore: Geoserver datastore.
+    dataset: Dataset object with overview tables.
+    file_srid: Dataset native CRS code.
+    declared_srid: Geoserver declared CRS code.
+
+    Return
+    ----------
+    Dataset object
+    """
+    requests = get_overview_requests(workspace, datastore, dataset, file_srid, declared_srid)
+    if requests is None:
+        return dataset
+
+    overview_requests, layergroup_request = requests
+    for request in overview_requests:
+        table = request['kwargs']['pg_table']
+        if check_geoserver_resource(geo, 'layer', table, workspace):
+            logging.warning(f"{log_module}:Layer: '{table}' exists.")
+            continue
+        try:
+            geo.publish_featurestore(**request['kwargs'])
+        except Exception as e:
+            set_overview_result(dataset, request, e)
+            continue
+        set_overview_result(dataset, request)
+
+    return create_geoserver_overview_layergroup(geo, dataset, layergroup_request)
+
+async def check_geoserver_resource_async(geo, kind: str, name: str, workspace: Optional[str] = None):
+    """
+    Check if a resource exists in Geoserver (asyncio): lookup in the catalog cache (geo.catalog) or a GET request of the resource.
+
+    Parameters
+    ----------
+    - geo: AsyncGeoserver connection object.
+    - kind: Resource type: 'workspace', 'datastore', 'layer', 'style' or 'layergroup'.
+    - name: Resource name.
+    - workspace: Geoserver workspace.
+
+    Return
+    ----------
+    True if exists
+    """
+    if geo.catalog is not None:
+        try:
+            return geo.catalog.has(kind, name, workspace)
+        except Exception as e:
+            logging.warning(f"{log_module}:Geoserver catalog lookup of {kind}: '{name}' failed, request the resource: {e}")
+
+    try:
+        if kind == 'workspace':
+            await geo.get_workspace(workspace=name)
+        elif kind == 'datastore':
+            await geo.get_datastore(store_name=name, workspace=workspace)
+        elif kind == 'style':
+            await geo.get_style(style_name=name, workspace=workspace)
+        elif kind == 'layergroup':
+            await geo.get_layergroup(layer_name=name, workspace=workspace)
         else:
-            logging.info(f"{log_module}:Create Geoserver Coverage layer of file_format: '{dataset.file_format}' not supported yet.")
-            dataset.set_status('error')
-            dataset.set_status_info(f"Create Geoserver Coverage layer of file_format: '{dataset.file_format}' not supported yet.")
+            await geo.get_layer(layer_name=name, workspace=workspace)
+        return True
+    except:
+        return False
+
+async def create_geoserver_layer_async(geo, workspace: str, datastore: str, dataset, db_type, file_srid, declared_srid):
+    """
+    Create a Geoserver layer from differente origin (asyncio counterpart of create_geoserver_layer).
+
+    Parameters
+    ----------
+    geo: AsyncGeoserver connection object.
+    workspace: Geoserver workspace.
+    datastore: Geoserver datastore.
+    dataset: Dataset object to upload into PostGIS.
+    db_type: Database type.
+    file_srid: Dataset native CRS code.
+    declared_srid: Geoserver declared CRS code.
+
+    Return
+    ----------
+    Dataset object
+    """
+    request = get_layer_request(workspace, datastore, dataset, db_type, file_srid, declared_srid)
+    if request is None:
+        return dataset
+
+    if await check_geoserver_resource_async(geo, 'layer', dataset.table, workspace):
+        logging.warning(f"{log_module}:{request['kind']}: '{dataset.table}' exists.")
+        return dataset
+
+    try:
+        await getattr(geo, request['method'])(**request['kwargs'])
+    except Exception as e:
+        return set_layer_result(dataset, request, e)
+
+    return set_layer_result(dataset, request)
+
+async def create_geoserver_overview_layergroup_async(geo, dataset, request: dict):
+    """
+    Create (or update) the styles and the scale-dependent layer group of a dataset and its overview tables (asyncio
+    counterpart of create_geoserver_overview_layergroup), the styles concurrently.
+
+    Parameters
+    ----------
+    geo: AsyncGeoserver connection object.
+    dataset: Dataset object with overview tables.
+    request: Layer group request (see get_overview_requests).
+
+    Return
+    ----------
+    Dataset object
+    """
+    async def publish_style(style):
+        exists = await check_geoserver_resource_async(geo, 'style', style['name'], style['workspace'])
+        await geo.create_sld_style(**style, overwrite=exists)
+
+    layergroup = request['kwargs']
+    try:
+        await asyncio.gather(*(publish_style(style) for style in request['styles']))
+        exists = await check_geoserver_resource_async(geo, 'layergroup', layergroup['name'], layergroup['workspace'])
+        await geo.publish_layergroup(**layergroup, overwrite=exists)
+    except Exception as e:
+        return set_overview_result(dataset, request, e)
+
+    return set_overview_result(dataset, request)
+
+async def create_geoserver_overviews_async(geo, workspace: str, datastore: str, dataset, file_srid, declared_srid):
+    """
+    Publish the overview tables of a dataset as Geoserver layers and its scale-dependent layer group (asyncio counterpart
+    of create_geoserver_overviews), all the overviews of the dataset concurrently.
+
+    Parameters
+    ----------
+    geo: AsyncGeoserver connection object.
+    workspace: Geoserver workspace.
+    datastore: Geoserver datastore.
+    dataset: Dataset object with overview tables.
+    file_srid: Dataset native CRS code.
+    declared_srid: Geoserver declared CRS code.
+
+    Return
+    ----------
+    Dataset object
+    """
+    async def publish_overview(request):
+        table = request['kwargs']['pg_table']
+        if await check_geoserver_resource_async(geo, 'layer', table, workspace):
+            logging.warning(f"{log_module}:Layer: '{table}' exists.")
+            return
+        try:
+            await geo.publish_featurestore(**request['kwargs'])
+        except Exception as e:
+            set_overview_result(dataset, request, e)
+            return
+        set_overview_result(dataset, request)
+
+    requests = get_overview_requests(workspace, datastore, dataset, file_srid, declared_srid)
+    if requests is None:
+        return dataset
+
+    overview_requests, layergroup_request = requests
+    await asyncio.gather(*(publish_overview(request) for request in overview_requests))
 
-    return dataset
\ No newline at end of file
+    return await create_geoserver_overview_layergroup_async(geo, dataset, layergroup_request)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+## Coding: UTF-8
+## Author: mjanez@tragsa.es
+## Institution: -
+## Project: -
+# inbuilt libraries
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+
+log_module = f"[{__name__}]"
+
+# End of stream marker passed between the stages
+_END = object()
+
+# Seconds between checks of the stop event when a queue is full/empty
+_POLL_INTERVAL = 0.1
+
+class PipelineStage:
+    def __init__(self, name: str, func=None, workers: Optional[int] = 1):
+        """
+        Constructor of the PipelineStage class.
+
+        Parameters
+        ----------
+        name: str. Name of the stage.
+        func: callable, optional. Function applied to each item. The result is passed to the next stage (the last stage result is discarded).
+        workers: int, optional. Number of threads of the stage (items processed concurrently, the order of the items is not kept). Default: 1
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(workers or 1, 1)
+        self.items: int = 0
+        self.busy: float = 0.0
+        self.active = self.workers
+        self.lock = threading.Lock()
+
+    def add(self, elapsed: float):
+        with self.lock:
+            self.items += 1
+            self.busy += elapsed
+
+class Pipeline:
+    def __init__(self, name: str, stages: list, queue_size: Optional[int] = 2):
+        """
+        Constructor of the Pipeline class.
+
+        Each stage runs in its own thread and the stages are linked by bounded queues, so a stage
+        blocks when the next one is behind and at most queue_size items are held between two stages.
+
+        Parameters
+        ----------
+        name: str. Name of the pipeline (e.g. dataset identifier).
+        stages: list of (name, func) or (name, func, workers) tuples. The first stage is the source: 'func' is an iterable of items.
+        queue_size: int, optional. Capacity of each queue between two stages. Default: 2
+
+        Notes
+        ----------
+        The heavy work of the stages (file reads, shapely vectorized functions, COPY) releases the GIL, so the stages overlap.
+        """
+        self.name = name
+        self.source = stages[0][1]
+        self.stages = [PipelineStage(stages[0][0])] + [PipelineStage(*stage) for stage in stages[1:]]
+        self.queue_size = max(queue_size or 1, 1)
+        self.elapsed: float = 0.0
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_source(self, stage, q_out):
+        try:
+            items = iter(self.source)
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                finally:
+                    stage.busy += time.perf_counter() - start
+                stage.items += 1
+                if not self._put(q_out, item):
+                    return
+            self._put(q_out, _END)
+        except Exception as e:
+            self._fail(stage, e)
+
+    def _run_stage(self, stage, q_in, q_out):
+        try:
+            while True:
+                item = self._get(q_in)
+                if item is _END:
+                    break
+                start = time.perf_counter()
+                result = stage.func(item)
+                stage.add(time.perf_counter() - start)
+                if q_out is not None and not self._put(q_out, result):
+                    return
+
+            # The end marker is passed to the other threads of the stage, the last one passes it to the next stage
+            with stage.lock:
+                stage.active -= 1
+                last = stage.active == 0
+            if not last:
+                self._put(q_in, _END)
+            elif q_out is not None:
+                self._put(q_out, _END)
+        except Exception as e:
+            self._fail(stage, e)
+
+    def _fail(self, stage, e):
+        logging.error(f"{log_module}:Pipeline: '{self.name}' failed at stage: '{stage.name}': {e}")
+        self._errors.append(e)
+        self._stop.set()
+
+    def run(self):
+        """
+        Run the pipeline until the source is exhausted.
+
+        Return
+        ----------
+        Number of items processed by the last stage. The first exception raised by a stage is re-raised.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages[1:]]
+        threads = [threading.Thread(target=self._run_source, args=(self.stages[0], queues[0]), name=f"{self.name}-{self.stages[0].name}", daemon=True)]
+        for i, stage in enumerate(self.stages[1:]):
+            q_out = queues[i + 1] if i + 1 < len(queues) else None
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(target=self._run_stage, args=(stage, queues[i], q_out), name=f"{self.name}-{stage.name}-{worker}", daemon=True))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+
+        return self.stages[-1].items
+
+    def occupancy(self):
+        """
+        Returns the occupancy of each stage: share of the pipeline wall time the stage was working (not waiting on a queue),
+        averaged over the threads of the stage. The stage with the highest occupancy is the bottleneck.
+
+        Return
+        ----------
+        dict of occupancy (0-1) by stage name
+        """
+        return {stage.name: (stage.busy / (self.elapsed * stage.workers) if self.elapsed else 0.0) for stage in self.stages}
+
+    def log_occupancy(self):
+        """
+        Log the occupancy of each stage.
+
+        Return
+        ----------
+        Occupancy summary str
+        """
+        occupancy = self.occupancy()
+        summary = ", ".join(f"{name}: {value:.0%}" for name, value in occupancy.items())
+        bottleneck = max(occupancy, key=occupancy.get)
+        logging.info(f"{log_module}:Pipeline: '{self.name}' | Elapsed: {self.elapsed:.3f}s | Stage occupancy: {summary} | Bottleneck: '{bottleneck}'")
+
+        return summary
@@ -4,70 +4,581 @@
 ## Institution: -
 ## Project: -
 # inbuilt libraries
+import hashlib
+import io
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 # custom functions
-from model.db import get_query, get_connection
+from model.db import get_query, get_pooled_connection, get_pool_size
+from controller.geometrymanager import normalize_geometries, hilbert_sort_index, hilbert_bounds_distance, reproject_geometries, grid_cell_keys, snap_to_grid, get_latlon_bbox, get_crs_srid, log_timings
+from controller.pipeline import Pipeline
 
 # third-party libraries
+import numpy as np
+import pandas as pd
+import fiona
 import geopandas as gpd
+from pyproj.exceptions import CRSError, ProjError
 import shapely
-from shapely.geometry.polygon import Polygon
-from shapely.geometry.multipolygon import MultiPolygon
 
 
 
 log_module = f"[{__name__}]"
 
-def shp_to_postgis(dataset, db_engine):
+# Index builds: memory (MB) needed by each participant of a parallel build and maximum parallel workers by build
+PARALLEL_BUILD_MEMORY = 32
+MAX_PARALLEL_MAINTENANCE_WORKERS = 8
+
+# Geometry index methods and thresholds of the index selector
+INDEX_METHODS = ('gist', 'spgist', 'brin')
+POINT_TYPES = ('POINT', 'MULTIPOINT', 'POINTZ', 'MULTIPOINTZ')
+SPGIST_MIN_ROWS = 100000
+BRIN_MIN_ROWS = 1000000
+BRIN_MIN_CORRELATION = 0.9
+
+# Names of the identity primary key added to the tables, the first one not used by the fields of the file
+PRIMARY_KEY_COLUMNS = ('gid', 'fid', 'ogc_fid')
+
+# Partitioned tables: field of the partition key, key of the NULL values and concurrent partition index builds
+PARTITION_KEY_COLUMN = 'partition_key'
+PARTITION_NULL_KEY = 'none'
+PARTITION_INDEX_WORKERS = 4
+
+# Overview tables: geometry types generalized and maximum number of vertices of the subdivided geometries
+OVERVIEW_TYPES = ('LINESTRING', 'MULTILINESTRING', 'POLYGON', 'MULTIPOLYGON')
+OVERVIEW_MAX_VERTICES = 256
+
+# Subdivided features: field of the primary key of the original feature (NULL if not subdivided)
+PARENT_FID_COLUMN = 'parent_fid'
+
+# Internal fields of the loaded tables (not narrowed nor published as FeatureType attributes)
+INTERNAL_COLUMNS = ('feature_hash', PARTITION_KEY_COLUMN, PARENT_FID_COLUMN)
+
+# Prefixes of the indexes named after their table: geometry (gidx_<table>), primary key (pk_<table>) and attribute (aidx_<table>_<field>)
+TABLE_INDEX_PREFIXES = ('gidx_', 'pk_')
+ATTRIBUTE_INDEX_PREFIX = 'aidx_'
+
+# Narrowed attribute types: integer types by range of values and strings of boolean values
+INTEGER_RANGES = (('smallint', -2**15, 2**15 - 1), ('integer', -2**31, 2**31 - 1), ('bigint', -2**63, 2**63 - 1))
+BOOLEAN_STRINGS = ('TRUE', 'FALSE')
+
+# pandas dtypes of the field types of the file schemas (fiona), so every batch of a file has the same dtypes
+# e.g. an integer field is read as float64 in the batches with NULL values
+FIELD_DTYPES = {'int': 'Int64', 'int64': 'Int64', 'int32': 'Int32', 'int16': 'Int16', 'float': 'float64', 'str': 'str', 'bool': 'boolean'}
+
+# Java bindings of the attributes of the Geoserver FeatureTypes by PostgreSQL type (pg_type.typname)
+JAVA_BINDINGS = {
+    'int2': 'java.lang.Short', 'int4': 'java.lang.Integer', 'int8': 'java.lang.Long',
+    'float4': 'java.lang.Float', 'float8': 'java.lang.Double', 'numeric': 'java.math.BigDecimal',
+    'bool': 'java.lang.Boolean', 'date': 'java.sql.Date', 'time': 'java.sql.Time',
+    'timestamp': 'java.sql.Timestamp', 'timestamptz': 'java.sql.Timestamp', 'uuid': 'java.util.UUID',
+}
+GEOMETRY_BINDINGS = {
+    'POINT': 'Point', 'MULTIPOINT': 'MultiPoint', 'LINESTRING': 'LineString', 'MULTILINESTRING': 'MultiLineString',
+    'POLYGON': 'Polygon', 'MULTIPOLYGON': 'MultiPolygon',
+}
+
+def get_pg_type(dtype):
     """
-    Store into a PostGIS Database the ESRI Shapefiles from a dataset object info.
+    Returns the PostgreSQL column type of a pandas dtype.
 
     Parameters
     ----------
-        - dataset: Dataset object to upload into PostGIS.
+        - dtype: pandas/numpy dtype of the column.
+
+    Return
+    ----------
+    PostgreSQL type name
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    elif pd.api.types.is_integer_dtype(dtype):
+        # Nullable pandas dtypes (Int16, Int32...) expose its numpy_dtype
+        itemsize = np.dtype(getattr(dtype, 'numpy_dtype', dtype)).itemsize
+        return {1: 'smallint', 2: 'smallint', 4: 'integer'}.get(itemsize, 'bigint')
+    elif pd.api.types.is_float_dtype(dtype):
+        itemsize = np.dtype(getattr(dtype, 'numpy_dtype', dtype)).itemsize
+        return 'real' if itemsize == 4 else 'double precision'
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'timestamp with time zone' if getattr(dtype, 'tz', None) is not None else 'timestamp'
+    else:
+        return 'text'
+
+def get_partition_table(table: str, key):
+    """
+    Returns the name of the partition of a partitioned table for a partition key.
+
+    Parameters
+    ----------
+        - table: DB table (partitioned).
+        - key: Partition key value.
+
+    Return
+    ----------
+    Partition table name: '<table>_p_<hash of the key>'
+    """
+    key_hash = hashlib.blake2b(str(key).encode('utf-8'), digest_size=6).hexdigest()
+
+    # The table is truncated so the index names of the partitions (gidx_<partition>) keep the hash
+    return f"{table[:42]}_p_{key_hash}"
+
+def get_table_ddl(gdf, schema: str, table: str, srid: int, geom_col: Optional[str] = 'geom', unlogged: Optional[bool] = False, partition_col: Optional[str] = None, geometry_type: Optional[str] = None):
+    """
+    Generate the CREATE TABLE statement of a GeoDataFrame schema.
+
+    Parameters
+    ----------
+        - gdf: GeoDataFrame to store.
+        - schema: DB schema.
+        - table: DB table.
+        - srid: Spatial reference identifier (SRID) of the geometry column.
+        - geom_col: Name of the geometry field.
+        - unlogged: Create the table as UNLOGGED (no WAL writes). Not applied to partitioned tables.
+        - partition_col: Create a table partitioned by the list of values of this field.
+        - geometry_type: Type of the geometry column (e.g. 'MULTIPOLYGONZ'). Default: the geometry type of the GeoDataFrame.
+
+    Return
+    ----------
+    CREATE TABLE query
+    """
+    geom_type = geometry_type
+    if geom_type is None:
+        geom_types = gdf[geom_col].geom_type.dropna().unique()
+        geom_type = geom_types[0].upper() if len(geom_types) == 1 else 'GEOMETRY'
+        if gdf[geom_col].has_z.any():
+            geom_type += 'Z'
+
+    columns = ['"{}" {}'.format(col.replace('"', '""'), get_pg_type(gdf[col].dtype)) for col in gdf.columns if col != geom_col]
+    columns.append('"{}" geometry({}, {})'.format(geom_col, geom_type, srid))
+
+    return 'CREATE {unlogged}TABLE {schema}."{table}" ({columns}){partition}'.format(
+                unlogged='UNLOGGED ' if unlogged and partition_col is None else '',
+                schema=schema,
+                table=table,
+                columns=', '.join(columns),
+                partition=' PARTITION BY LIST ("{}")'.format(partition_col) if partition_col else ''
+            )
+
+def get_copy_null(df):
+    """
+    Returns the NULL string of the COPY of a DataFrame: '\\N', or '\\N<n>' if a text value is '\\N' (so it is not read as NULL).
+
+    Parameters
+    ----------
+        - df: DataFrame to copy.
+
+    Return
+    ----------
+    NULL string
+    """
+    text_columns = [col for col in df.columns if pd.api.types.is_object_dtype(df[col].dtype) or pd.api.types.is_string_dtype(df[col].dtype)]
+    null, n = '\\N', 0
+    while any((df[col] == null).any() for col in text_columns):
+        null, n = f'\\N{n}', n + 1
+
+    return null
+
+def copy_to_postgis(gdf, db_engine, schema: str, table: str, if_exists: Optional[str] = 'replace', geom_col: Optional[str] = 'geom', srid: Optional[int] = None, chunksize: Optional[int] = 100000, unlogged: Optional[bool] = False, partition_col: Optional[str] = None, geometry_type: Optional[str] = None):
+    """
+    Store a GeoDataFrame into a PostGIS table with COPY ... FROM STDIN (CSV format).
+
+    Geometries are sent as hex EWKB and attributes as typed CSV values, so the rows are parsed by the server in bulk instead of one INSERT per row.
+    NULL values are sent as '\\N' (another NULL string if a text value is '\\N', see get_copy_null).
+
+    Parameters
+    ----------
+        - gdf: GeoDataFrame to store.
         - db_engine: SQLAlchemy database engine.
+        - schema: DB schema.
+        - table: DB table.
+        - if_exists: 'replace' drops and creates the table, 'append' creates the table only if it does not exist.
+        - geom_col: Name of the geometry field.
+        - srid: Spatial reference identifier (SRID). Default: EPSG (or ESRI) code of the GeoDataFrame CRS, 0 if unknown.
+        - chunksize: Number of rows sent in each COPY buffer.
+        - unlogged: Create the table as UNLOGGED (no WAL writes).
+        - partition_col: Store into a table partitioned by the list of values of this field. The partitions of new values are
+          created and the rows of each partition are copied directly into it (no tuple routing).
+        - geometry_type: Type of the geometry column of the created table. Default: the geometry type of the GeoDataFrame.
 
     Return
     ----------
-    Dataset object
+    Number of rows stored
     """
+    if srid is None:
+        srid = get_crs_srid(gdf.crs)
+
+    # Hex EWKB geometries, NULL geometries are kept as NULL
+    geoms = shapely.set_srid(np.asarray(gdf[geom_col].values, dtype=object), srid)
+    df = pd.DataFrame(gdf.drop(columns=geom_col))
+    df[geom_col] = shapely.to_wkb(geoms, hex=True, include_srid=True)
+
+    columns = ', '.join('"{}"'.format(col.replace('"', '""')) for col in df.columns)
+    null = get_copy_null(df)
+    query_copy = 'COPY {schema}."{table}" ({columns}) FROM STDIN WITH (FORMAT csv, NULL \'{null}\')'
+
+    # Rows of each partition or the whole table
+    if partition_col is not None:
+        parts = [(get_partition_table(table, key), key, part) for key, part in df.groupby(partition_col, sort=False)]
+    else:
+        parts = [(table, None, df)]
 
+    conn = db_engine.raw_connection()
     try:
-        gdf = gpd.GeoDataFrame(gpd.read_file(dataset.file_path)).rename_geometry('geom')
+        cur = conn.cursor()
+        if if_exists == 'replace':
+            cur.execute('DROP TABLE IF EXISTS {schema}."{table}"'.format(schema=schema, table=table))
+            cur.execute(get_table_ddl(gdf, schema, table, srid, geom_col, unlogged, partition_col, geometry_type))
+        elif if_exists == 'append':
+            cur.execute(get_table_ddl(gdf, schema, table, srid, geom_col, unlogged, partition_col, geometry_type).replace('TABLE', 'TABLE IF NOT EXISTS', 1))
 
-        # Convert to Multipolygon to avoid the Shapefiles mix POLYGONs and MULTIPOLYGON
-        gdf["geom"] = [MultiPolygon([feature]) if type(feature) == Polygon else feature for feature in gdf["geom"]]
+        for part_table, key, part in parts:
+            if partition_col is not None:
+                cur.execute('CREATE TABLE IF NOT EXISTS {schema}."{partition}" PARTITION OF {schema}."{table}" FOR VALUES IN (%s)'.format(
+                    schema=schema, table=table, partition=part_table), (str(key),))
 
-        # Store native SRID
-        dataset.set_file_srid(gdf.crs.to_epsg())
+            for start in range(0, len(part), chunksize):
+                buffer = io.StringIO()
+                part.iloc[start:start + chunksize].to_csv(buffer, index=False, header=False, na_rep=null)
+                buffer.seek(0)
+                cur.copy_expert(query_copy.format(schema=schema, table=part_table, columns=columns, null=null), buffer)
 
-        # Column lowercase
-        gdf.columns = map(str.lower, gdf.columns)
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return len(df)
+
+def get_feature_hashes(gdf, geom_col: Optional[str] = 'geom', counts=None):
+    """
+    Returns a 64-bit hash of each feature (geometry WKB and attributes).
+
+    Identical features get different hashes by its occurrence number, so the duplicated rows are kept by the delta loads.
+
+    Parameters
+    ----------
+        - gdf: GeoDataFrame.
+        - geom_col: Name of the geometry field.
+        - counts: pandas Series with the occurrences of each content hash in the previous batches (streaming mode).
+
+    Return
+    ----------
+    Numpy array of int64 hashes and the pandas Series of occurrences updated with the batch
+    """
+    df = pd.DataFrame(gdf.drop(columns=geom_col))
+    df[geom_col] = shapely.to_wkb(np.asarray(gdf[geom_col].values, dtype=object), hex=True)
+    hashes = pd.util.hash_pandas_object(df, index=False)
+
+    # Occurrence of each content hash, continued from the previous batches
+    occurrence = hashes.groupby(hashes).cumcount()
+    if counts is not None and len(counts):
+        occurrence += hashes.map(counts).fillna(0).astype(np.int64)
+        counts = counts.add(hashes.value_counts(), fill_value=0)
+    else:
+        counts = hashes.value_counts()
+
+    keys = pd.util.hash_pandas_object(pd.DataFrame({'hash': hashes, 'occurrence': occurrence}), index=False)
+
+    return keys.values.view(np.int64), counts
+
+def get_schema_dtypes(schema: dict):
+    """
+    Returns the pandas dtypes of the fields of a file schema (fiona), integers as nullable dtypes.
+
+    Parameters
+    ----------
+        - schema: fiona schema, e.g. {'properties': {'name': 'str:80', 'code': 'int:10'}, 'geometry': 'Polygon'}.
+
+    Return
+    ----------
+    dict: {field: dtype}
+    """
+    dtypes = {}
+    for field, field_type in schema['properties'].items():
+        dtype = FIELD_DTYPES.get(field_type.split(':')[0])
+        if dtype is not None:
+            dtypes[field] = dtype
+
+    return dtypes
+
+def get_schema_geometry_type(schema: dict, force_multi: Optional[bool] = True, force_2d: Optional[bool] = False):
+    """
+    Returns the PostGIS geometry type of the normalized geometries of a file schema (fiona).
+
+    Parameters
+    ----------
+        - schema: fiona schema, e.g. {'properties': {...}, 'geometry': '3D Polygon'}.
+        - force_multi: The single geometries are promoted to its multi geometry.
+        - force_2d: The Z coordinates are dropped.
+
+    Return
+    ----------
+    Geometry type (e.g. 'MULTIPOLYGONZ') or None if the schema has no single geometry type
+    """
+    geometry = schema.get('geometry')
+    if not isinstance(geometry, str) or geometry in ('Unknown', 'Any', 'None'):
+        return None
+
+    has_z = geometry.startswith('3D ')
+    geometry_type = geometry.replace('3D ', '').upper()
+    if geometry_type not in GEOMETRY_BINDINGS:
+        return None
+    if force_multi and not geometry_type.startswith('MULTI'):
+        geometry_type = 'MULTI' + geometry_type
+
+    return geometry_type + ('Z' if has_z and not force_2d else '')
+
+def cast_dtypes(gdf, dtypes: dict):
+    """
+    Cast the fields of a GeoDataFrame to the dtypes of its file schema, so the table columns and the feature hashes
+    do not depend on the values of a batch.
+
+    Parameters
+    ----------
+        - gdf: GeoDataFrame.
+        - dtypes: dict: {field: dtype} (get_schema_dtypes).
+
+    Return
+    ----------
+    GeoDataFrame
+    """
+    for field, dtype in dtypes.items():
+        if field in gdf.columns and gdf[field].dtype != dtype:
+            try:
+                gdf[field] = gdf[field].astype(dtype)
+            except (TypeError, ValueError, OverflowError) as e:
+                logging.warning(f"{log_module}:The field: '{field}' could not be cast to: {dtype}: {e}")
+
+    return gdf
+
+def read_shp_batches(file_path: str, batch_size: int):
+    """
+    Read an ESRI Shapefile in batches of features, so only one batch is held in memory.
+
+    Parameters
+    ----------
+        - file_path: Path of the ESRI Shapefile.
+        - batch_size: Number of features of each batch.
+
+    Return
+    ----------
+    Generator of GeoDataFrames
+    """
+    with fiona.open(file_path) as src:
+        total = len(src)
+
+    # An empty Shapefile still yields one (empty) batch to create the table
+    for start in range(0, max(total, 1), batch_size):
+        yield gpd.read_file(file_path, rows=slice(start, start + batch_size))
+
+def write_gdf(gdf, dataset, db_engine, load_method: Optional[str] = 'to_postgis', if_exists: Optional[str] = 'replace', table: Optional[str] = None, unlogged: Optional[bool] = False, partition_col: Optional[str] = None, geometry_type: Optional[str] = None):
+    """
+    Write a GeoDataFrame into the dataset table with the selected writer.
+
+    Parameters
+    ----------
+        - gdf: GeoDataFrame to store.
+        - dataset: Dataset object to upload into PostGIS.
+        - db_engine: SQLAlchemy database engine.
+        - load_method: Writer of the rows. 'copy' (COPY ... FROM STDIN) or 'to_postgis' (GeoDataFrame.to_postgis INSERTs).
+        - if_exists: 'replace' or 'append'.
+        - table: DB table. Default: dataset table.
+        - unlogged: Create the table as UNLOGGED (no WAL writes).
+        - partition_col: Store into a table partitioned by this field (always written with COPY).
+        - geometry_type: Type of the geometry column of the created table. Default: the geometry type of the GeoDataFrame.
+    """
+    if table is None:
+        table = dataset.table
+
+    if load_method == 'copy' or partition_col is not None:
+        copy_to_postgis(gdf, db_engine, dataset.schema, table, if_exists=if_exists, unlogged=unlogged, partition_col=partition_col, geometry_type=geometry_type)
+    else:
+        # to_postgis can not create UNLOGGED tables nor set the geometry type, create it empty and alter it before the rows are written
+        if (unlogged or geometry_type) and if_exists == 'replace':
+            gdf.iloc[:0].to_postgis(name=table, schema=dataset.schema, index=False, con=db_engine, if_exists='replace')
+            with db_engine.begin() as conn:
+                if unlogged:
+                    conn.execute('ALTER TABLE {schema}."{table}" SET UNLOGGED'.format(schema=dataset.schema, table=table))
+                if geometry_type:
+                    conn.execute('ALTER TABLE {schema}."{table}" ALTER COLUMN "{geom_col}" TYPE geometry({geometry_type}, {srid})'.format(
+                        schema=dataset.schema, table=table, geom_col=gdf.geometry.name, geometry_type=geometry_type, srid=get_crs_srid(gdf.crs)))
+            if_exists = 'append'
 
         gdf.to_postgis(
-            name=dataset.table,
+            name=table,
             schema=dataset.schema,
             index=False, 
             con=db_engine,
-            if_exists='replace',              
+            if_exists=if_exists,              
             chunksize=10000,                                                # Set the storage size once to prevent the data from being too large
         )
 
-        logging.info(log_module + ":" + "Write: "+ dataset.identifier + " into a table: " + dataset.schema + "." + dataset.table)
-        gdf = gpd.GeoDataFrame(gpd.read_file(dataset.file_path))
+def shp_to_postgis(dataset, db_engine, load_method: Optional[str] = 'to_postgis', batch_size: Optional[int] = None, force_2d: Optional[bool] = False, table: Optional[str] = None, unlogged: Optional[bool] = False, spatial_sort: Optional[str] = None, pipeline_depth: Optional[int] = None, target_srid: Optional[int] = None, reproject: Optional[str] = None, feature_hash: Optional[bool] = False, partition_by: Optional[str] = None, partition_grid_size: Optional[float] = None, precision: Optional[float] = None):
+    """
+    Store into a PostGIS Database the ESRI Shapefiles from a dataset object info.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_engine: SQLAlchemy database engine.
+        - load_method: Writer of the rows. 'copy' (COPY ... FROM STDIN) or 'to_postgis' (GeoDataFrame.to_postgis INSERTs).
+        - batch_size: Number of features read and written at once (streaming mode). If None, the whole file is read.
+        - force_2d: Drop the Z coordinates of the geometries.
+        - table: DB table. Default: dataset table.
+        - unlogged: Create the table as UNLOGGED (no WAL writes).
+        - spatial_sort: 'hilbert' to write the rows sorted along a Hilbert curve (spatially clustered table). In streaming mode each batch is sorted.
+        - pipeline_depth: In streaming mode, run the read, transform and write stages in a pipeline with queues of this size. None/0: sequential stages.
+        - target_srid: SRID of the table (EPSG code), used by the reprojection.
+        - reproject: 'pyproj' to reproject the geometries to target_srid while they are loaded. If the source CRS can not be handled by pyproj, the rows are loaded with the source SRID (ST_Transform fallback after the load).
+          With 'postgis' only the CRS without EPSG code (e.g. ESRI .prj), which PostGIS can not transform, are reprojected while they are loaded.
+        - feature_hash: Store the hash of each feature in the column 'feature_hash' (delta loads).
+        - partition_by: Store into a table partitioned by 'grid' (cell of the geometry, partition_grid_size) or by a field of the file.
+        - partition_grid_size: Size of the grid cells of the 'grid' partitions, in the units of the stored coordinates.
+        - precision: Snap the coordinates to a grid of this size (units of the stored coordinates). Default: None (full precision).
+
+    Return
+    ----------
+    Dataset object
+    """
+
+    if table is None:
+        table = dataset.table
+
+    timings = dict(read=0.0, write=0.0)
+    state = dict(batch=0, rows=0, reproject=reproject == 'pyproj' and bool(target_srid), hash_counts=None, precision_bytes=0, dtypes={}, geometry_type=None)
+
+    def transform(gdf):
+        gdf = gdf.rename_geometry('geom')
+
+        # Field dtypes of the file schema, the same in every batch (e.g. integers with NULL values)
+        gdf = cast_dtypes(gdf, state['dtypes'])
+
+        # Reproject the coordinates to the table SRID (Transformers are cached by CRS pair). The CRS without EPSG code are
+        # always reprojected by pyproj, ST_Transform only handles the SRIDs of spatial_ref_sys
+        epsg = gdf.crs.to_epsg() if gdf.crs is not None else None
+        if gdf.crs is not None and reproject and target_srid and (state['reproject'] or epsg is None) and get_crs_srid(gdf.crs) != target_srid:
+            start = time.perf_counter()
+            try:
+                geoms = reproject_geometries(gdf["geom"].values, gdf.crs, target_srid)
+                gdf["geom"] = gpd.GeoSeries(geoms, index=gdf.index)
+                gdf = gdf.set_crs(epsg=target_srid, allow_override=True)
+            except (CRSError, ProjError) as e:
+                if epsg is None:
+                    raise Exception(f"The CRS of the dataset: '{dataset.identifier}' has no EPSG code and can not be reprojected with pyproj to EPSG:{target_srid}: {e}")
+                logging.warning(f"{log_module}:The dataset: '{dataset.identifier}' can not be reprojected with pyproj to EPSG:{target_srid}, it will be transformed by PostGIS: {e}")
+                state['reproject'] = False
+            timings['reproject'] = timings.get('reproject', 0.0) + time.perf_counter() - start
+
+        # Coordinates snapped to the precision grid, the collapsed geometries are stored as NULL by the normalization
+        if precision:
+            start = time.perf_counter()
+            geoms, removed_bytes = snap_to_grid(gdf["geom"].values, precision)
+            gdf["geom"] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+            state['precision_bytes'] += removed_bytes
+            timings['precision'] = timings.get('precision', 0.0) + time.perf_counter() - start
+
+        # Single to multi geometries to avoid the Shapefiles mix e.g. POLYGONs and MULTIPOLYGONs
+        geoms, normalize_timings = normalize_geometries(gdf["geom"].values, force_2d=force_2d)
+        gdf["geom"] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+        for stage, elapsed in normalize_timings.items():
+            timings[f"normalize_{stage}"] = timings.get(f"normalize_{stage}", 0.0) + elapsed
+
+        # Column lowercase
+        gdf.columns = map(str.lower, gdf.columns)
+
+        # Hash of the stored geometry and attributes, diffed by the delta loads
+        if feature_hash:
+            start = time.perf_counter()
+            gdf["feature_hash"], state['hash_counts'] = get_feature_hashes(gdf, counts=state['hash_counts'])
+            timings['hash'] = timings.get('hash', 0.0) + time.perf_counter() - start
+
+        # Partition of each row
+        if partition_by:
+            if partition_by == 'grid':
+                keys = pd.Series(grid_cell_keys(gdf["geom"].values, partition_grid_size), index=gdf.index)
+            else:
+                keys = gdf[partition_by.lower()].astype(str).where(gdf[partition_by.lower()].notna())
+            gdf[PARTITION_KEY_COLUMN] = keys.fillna(PARTITION_NULL_KEY)
+
+        # Spatially sorted rows, the table is stored clustered without CLUSTER
+        if spatial_sort == 'hilbert':
+            start = time.perf_counter()
+            gdf = gdf.iloc[hilbert_sort_index(gdf["geom"].values)]
+            timings['sort'] = timings.get('sort', 0.0) + time.perf_counter() - start
+
+        return gdf
+
+    def write(gdf):
+        # Store native SRID and geometry type and create the table with the first batch
+        start = time.perf_counter()
+        if state['batch'] == 0:
+            dataset.set_file_srid(get_crs_srid(gdf.crs))
+            geom_types = gdf.geom_type.dropna().unique()
+            if len(geom_types) == 1:
+                dataset.set_geometry_type(geom_types[0].upper())
+            write_gdf(gdf, dataset, db_engine, load_method, if_exists='replace', table=table, unlogged=unlogged, partition_col=PARTITION_KEY_COLUMN if partition_by else None, geometry_type=state['geometry_type'])
+        else:
+            write_gdf(gdf, dataset, db_engine, load_method, if_exists='append', table=table, unlogged=unlogged, partition_col=PARTITION_KEY_COLUMN if partition_by else None)
+        timings['write'] += time.perf_counter() - start
+
+        state['batch'] += 1
+        state['rows'] += len(gdf)
+        if batch_size:
+            logging.info(f"{log_module}:Write batch {state['batch']} of: '{dataset.identifier}' ({state['rows']} features)")
+
+    try:
+        # Field and geometry types of the table from the file schema, not from the values of the first batch
+        with fiona.open(dataset.file_path) as src:
+            state['dtypes'] = get_schema_dtypes(src.schema)
+            if batch_size:
+                state['geometry_type'] = get_schema_geometry_type(src.schema, force_2d=force_2d)
+
+        # Pipelined stages: the next batch is read and transformed while the previous one is written
+        if batch_size and pipeline_depth:
+            pipeline = Pipeline(dataset.identifier, [('read', read_shp_batches(dataset.file_path, batch_size)), ('transform', transform), ('write', write)], queue_size=pipeline_depth)
+            pipeline.run()
+            timings['read'] = pipeline.stages[0].busy
+            occupancy = pipeline.log_occupancy()
+
+        else:
+            occupancy = None
+            start = time.perf_counter()
+            if batch_size:
+                batches = read_shp_batches(dataset.file_path, batch_size)
+            else:
+                batches = [gpd.read_file(dataset.file_path)]
+
+            for gdf in batches:
+                timings['read'] += time.perf_counter() - start
+                write(transform(gdf))
+                start = time.perf_counter()
+
+        logging.info(log_module + ":" + "Write: "+ dataset.identifier + " into a table: " + dataset.schema + "." + table)
         dataset.set_status('db_uploaded')
-        dataset.set_status_info('Upload to: ' + dataset.schema + "." + dataset.table)
+        dataset.set_row_count(state['rows'])
+        dataset.set_status_info('Upload to: ' + dataset.schema + "." + table)
+        dataset.set_status_info('Stage timings: ' + log_timings(dataset.identifier, timings))
+        if occupancy is not None:
+            dataset.set_status_info('Stage occupancy: ' + occupancy)
+        if precision:
+            dataset.set_bytes_saved((dataset.bytes_saved or 0) + state['precision_bytes'])
+            logging.info(f"{log_module}:Precision of: '{dataset.identifier}' | Grid: {precision} | Coordinates removed: {state['precision_bytes']} bytes")
+            dataset.set_status_info(f"Precision grid: {precision} | Coordinates removed: {state['precision_bytes']} bytes")
         
-    except:
-        logging.error(log_module + ":" + "The dataset: " + dataset.identifier + " has no path, it will not be loaded.")
+    except Exception as e:
+        logging.error(log_module + ":" + "The dataset: " + dataset.identifier + " has no path, it will not be loaded: " + str(e))
         dataset.set_status('error')
-        dataset.set_status_info('Error reading the ESRI Shapefile')
+        dataset.set_status_info('Error reading the ESRI Shapefile: ' + str(e))
 
     return dataset
 
-def update_srid(dataset, db_params, new_srid:Optional[int] = 3857, geom_col:Optional[str] = 'geom'):
+def update_srid(dataset, db_params, new_srid:Optional[int] = 3857, geom_col:Optional[str] = 'geom', table: Optional[str] = None):
     """
     Update SRID of the spatial table. Default EPSG:3857.
 
@@ -77,6 +588,7 @@ def update_srid(dataset, db_params, new_srid:Optional[int] = 3857, geom_col:Opti
         - db_params: Database connection details.
         - new_srid: Spatial reference identifier (SRID), an EPSG Code (https://spatialreference.org/ref/epsg/).
         - geom_col: Name of the geometry field.
+        - table: DB table. Default: dataset table.
 
 
     Return
@@ -84,29 +596,88 @@ def update_srid(dataset, db_params, new_srid:Optional[int] = 3857, geom_col:Opti
     Dataset object
     """
 
+    if table is None:
+        table = dataset.table
+
+    conn = None
     try:
-        conn = get_connection(db_params)
+        conn = get_pooled_connection(db_params)
         cur = conn.cursor()
         query = "SELECT UpdateGeometrySRID('{schema}', '{table}', '{geom}', {new_srid})".format(
                             schema=dataset.schema,
-                            table=dataset.table,
+                            table=table,
                             geom=geom_col,
                             new_srid=new_srid
                         )
         cur.execute(query)
-        logging.info(f"{log_module}:Update table: '{dataset.schema }.{dataset.table}' with SRID: EPSG:{new_srid}")
-        dataset.set_status_info(f"Update table: '{dataset.schema }.{dataset.table}' with SRID: EPSG:{new_srid}")
+        logging.info(f"{log_module}:Update table: '{dataset.schema}.{table}' with SRID: EPSG:{new_srid}")
+        dataset.set_status_info(f"Update table: '{dataset.schema}.{table}' with SRID: EPSG:{new_srid}")
 
         dataset.set_file_srid(new_srid)
         conn.commit()
-        conn.close()
-        conn = None
 
+    except Exception as e:
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when transform to EPSG: {new_srid}: {e}")
+        dataset.set_status('error')
+        dataset.set_status_info(f"Error transforming: '{dataset.schema}.{table}' when transform to EPSG: {new_srid}")
+    finally:
+        if conn is not None:
+            conn.close()
 
-    except:
-        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when transform to EPSG: {new_srid}")
+    return dataset
+
+def transform_srid(dataset, db_params, new_srid: Optional[int] = 3857, geom_col: Optional[str] = 'geom', table: Optional[str] = None):
+    """
+    Reproject the geometries of the spatial table with ST_Transform (the source SRID must be in spatial_ref_sys). Default EPSG:3857.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - new_srid: Spatial reference identifier (SRID), an EPSG Code (https://spatialreference.org/ref/epsg/).
+        - geom_col: Name of the geometry field.
+        - table: DB table. Default: dataset table.
+
+    Return
+    ----------
+    Dataset object
+    """
+
+    if table is None:
+        table = dataset.table
+
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+
+        # Keep the geometry type of the column
+        cur.execute("SELECT type, coord_dimension FROM geometry_columns WHERE f_table_schema = %s AND f_table_name = %s AND f_geometry_column = %s", (dataset.schema, table, geom_col))
+        geometry_type, coord_dimension = cur.fetchone()
+        if coord_dimension == 3 and not geometry_type.endswith('M'):
+            geometry_type += 'Z'
+
+        cur.execute('ALTER TABLE {schema}."{table}" ALTER COLUMN "{geom}" TYPE geometry({geometry_type}, {new_srid}) USING ST_Transform("{geom}", {new_srid})'.format(
+                            schema=dataset.schema,
+                            table=table,
+                            geom=geom_col,
+                            geometry_type=geometry_type,
+                            new_srid=new_srid
+                        ))
+        conn.commit()
+        logging.info(f"{log_module}:Transform table: '{dataset.schema}.{table}' from EPSG:{dataset.file_srid} to EPSG:{new_srid}")
+        dataset.set_status_info(f"Transform table: '{dataset.schema}.{table}' from EPSG:{dataset.file_srid} to EPSG:{new_srid}")
+        dataset.set_file_srid(new_srid)
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when transform to EPSG: {new_srid}: {e}")
         dataset.set_status('error')
-        dataset.set_status_info(f"Error transforming: '{dataset.schema}.{dataset.table}' when transform to EPSG: {new_srid}")
+        dataset.set_status_info(f"Error transforming: '{dataset.schema}.{table}' when transform to EPSG: {new_srid}")
+    finally:
+        if conn is not None:
+            conn.close()
 
     return dataset
 
@@ -124,8 +695,9 @@ def get_srid(dataset, db_params, geom_col:Optional[str] = 'geom'):
     -------
     dataset : object
     """
+    conn = None
     try:
-        conn = get_connection(db_params)
+        conn = get_pooled_connection(db_params)
         query = "SELECT Find_SRID('{schema}', '{table}', '{geom}')".format(
                     schema=dataset.schema,
                     table=dataset.table,
@@ -134,19 +706,19 @@ def get_srid(dataset, db_params, geom_col:Optional[str] = 'geom'):
         cur = conn.cursor()
         cur.execute(query)
 
-        if isinstance(cur.fetchone()[0], int):
-            srid = cur.fetchone()[0]
-        else:
+        srid = cur.fetchone()[0]
+        if not isinstance(srid, int):
             srid = 0
         dataset.set_file_srid(srid)
         conn.commit()
-        conn.close()
-        conn = None
 
-    except:
-        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when check SRID")
+    except Exception as e:
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when check SRID: {e}")
         dataset.set_status('error')
         dataset.set_status_info(f"Error checking: '{dataset.schema}.{dataset.table}' SRID")
+    finally:
+        if conn is not None:
+            conn.close()
 
     return dataset
 
@@ -163,8 +735,9 @@ def check_table_exists(dataset, db_params):
     -------
     dataset : object
     """
+    conn = None
     try:
-        conn = get_connection(db_params)
+        conn = get_pooled_connection(db_params)
         query = "SELECT EXISTS ( SELECT FROM pg_tables WHERE schemaname='{schema}' AND tablename='{table}');".format(
                     schema=dataset.schema,
                     table=dataset.table
@@ -175,60 +748,1221 @@ def check_table_exists(dataset, db_params):
         if cur.fetchone()[0] == True:
              dataset.set_status('db_uploaded')
         conn.commit()
-        conn.close()
-        conn = None
 
     except Exception as e:
         logging.error(f"{log_module}:The dataset: '{dataset.identifier}' does not exists in the dbname: {db_params.dbname} and schema: {dataset.schema}")
         dataset.set_status('error')
         dataset.set_status_info(f"The dataset: '{dataset.identifier}' does not exists in the dbname: {db_params.dbname} and schema: {dataset.schema}")
         raise Exception(e)
+    finally:
+        if conn is not None:
+            conn.close()
 
     return dataset
     
 
-def create_index(dataset, db_params):
+def get_java_binding(type_name: str, geometry_type: Optional[str] = None):
     """
-    Update/Create Geometry Index and clustering table
+    Returns the Java binding of an attribute of a Geoserver FeatureType from its PostgreSQL type.
+    """
+    if type_name == 'geometry':
+        return "org.locationtech.jts.geom." + GEOMETRY_BINDINGS.get(str(geometry_type).upper().rstrip('M').rstrip('Z'), 'Geometry')
+
+    return JAVA_BINDINGS.get(type_name, 'java.lang.String')
+
+def get_tables_info(datasets, db_params, geom_col: Optional[str] = 'geom', overview_levels: Optional[int] = 0, layout: Optional[bool] = False):
+    """
+    Returns the existence, geometry type and SRID of the tables of a list of datasets with a single catalog query.
 
     Parameters
     ----------
-        - dataset: Dataset object to upload into PostGIS
-        - db_params: Database connection details
+        - datasets: List of Dataset objects.
+        - db_params: Database connection details.
+        - geom_col: Name of the geometry field.
+        - overview_levels: Number of overview tables of each dataset table also looked up.
+        - layout: Also return the bounding boxes (native and lat/lon) and the attributes of the tables (get_tables_layout).
 
     Return
     ----------
-    Dataset object
+    dict: {(schema, table): {'geometry_type': str, 'srid': int}} of the existing tables ('bbox' and 'attributes' added with layout).
     """
+    tables = sorted({(d.schema, d.table) for d in datasets if d.table is not None})
+    tables = sorted(set(tables) | {(schema, get_overview_table(table, level)) for schema, table in tables for level in range(1, (overview_levels or 0) + 1)})
+    tables_info = {}
+    if not tables:
+        return tables_info
 
+    query = """SELECT t.schemaname, t.tablename, g.type, g.srid
+                FROM pg_tables t
+                LEFT JOIN geometry_columns g ON g.f_table_schema = t.schemaname AND g.f_table_name = t.tablename AND g.f_geometry_column = %s
+                WHERE (t.schemaname, t.tablename) IN (SELECT * FROM unnest(%s::text[], %s::text[]))"""
+    conn = get_pooled_connection(db_params)
     try:
-        conn = get_connection(db_params)
         cur = conn.cursor()
-        query_geom_idx = 'CREATE INDEX gidx_{table} ON {schema}."{table}" USING GIST(geom)'.format(
-                            schema=dataset.schema,
-                            table=dataset.table,
-                        )
-        query_cluster = 'CLUSTER {schema}."{table}" USING gidx_{table}'.format(
-                            schema=dataset.schema,
-                            table=dataset.table,
-                        )
-        cur.execute(query_geom_idx)
-        logging.info(log_module + ":" + "Create geom index of table: " + dataset.schema + "." + dataset.table)
-        dataset.set_status_info('Create geom index of table: ' + dataset.schema + "." + dataset.table)
-
-        cur.execute(query_cluster)
-        logging.info(log_module + ":" + "Clustering table: " + dataset.schema + "." + dataset.table)
-        dataset.set_status_info('Clustering table: ' + dataset.schema + "." + dataset.table)
+        cur.execute(query, (geom_col, [t[0] for t in tables], [t[1] for t in tables]))
 
+        for schema, table, geometry_type, srid in cur.fetchall():
+            tables_info[(schema, table)] = dict(geometry_type=geometry_type, srid=srid if isinstance(srid, int) else 0)
         conn.commit()
+
+        # Without the layout the Geoserver FeatureTypes are published with its bounding boxes computed by Geoserver
+        if layout and tables_info:
+            try:
+                get_tables_layout(cur, tables_info, geom_col)
+                conn.commit()
+            except Exception as e:
+                logging.warning(f"{log_module}:The bounding boxes and attributes of the tables could not be retrieved: {e}")
+                conn.rollback()
+    finally:
         conn.close()
-        conn = None
 
-    except:
-        logging.error(log_module + ":" + "The dataset: " + dataset.identifier + " fail when cluster the geom index")
-        dataset.set_status('error')
-        dataset.set_status_info('Error clustering: ' + dataset.schema + "." + dataset.table)
+    logging.info(f"{log_module}:Catalog lookup: {len(tables_info)} of {len(tables)} dataset tables exist in the dbname: {db_params.dbname}")
 
-    return dataset
+    return tables_info
+
+def get_tables_layout(cur, tables_info: dict, geom_col: Optional[str] = 'geom'):
+    """
+    Add the bounding boxes and the attributes of the tables to its catalog info, so the Geoserver FeatureTypes
+    are published without scanning the tables. The primary keys (not exposed by the datastore) and the internal
+    fields of the loader (INTERNAL_COLUMNS) are not attributes of the FeatureTypes.
+
+    The native bounding box is read from the planner statistics (ST_EstimatedExtent, tables analyzed after the load),
+    with an ST_Extent scan only for the tables without statistics. The lat/lon bounding box is the native one reprojected.
+
+    Parameters
+    ----------
+        - cur: Database cursor.
+        - tables_info: dict of the existing tables (get_tables_info), updated.
+        - geom_col: Name of the geometry field.
+    """
+    start = time.perf_counter()
+    tables = [key for key, info in tables_info.items() if info['geometry_type']]
+    schemas, names = [t[0] for t in tables], [t[1] for t in tables]
+
+    # Attributes of all the tables in one query, without the identity and primary key fields
+    cur.execute("""SELECT n.nspname, c.relname, a.attname, t.typname, NOT a.attnotnull
+                   FROM pg_attribute a
+                   JOIN pg_class c ON c.oid = a.attrelid
+                   JOIN pg_namespace n ON n.oid = c.relnamespace
+                   JOIN pg_type t ON t.oid = a.atttypid
+                   WHERE a.attnum > 0 AND NOT a.attisdropped AND a.attidentity = '' AND (n.nspname, c.relname) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+                   AND NOT EXISTS (SELECT 1 FROM pg_index i WHERE i.indrelid = c.oid AND i.indisprimary AND a.attnum = ANY(i.indkey))
+                   ORDER BY n.nspname, c.relname, a.attnum""", (schemas, names))
+    for schema, table, name, type_name, nillable in cur.fetchall():
+        if name in INTERNAL_COLUMNS:
+            continue
+        info = tables_info[(schema, table)]
+        info.setdefault('attributes', []).append(dict(name=name, binding=get_java_binding(type_name, info['geometry_type']), nillable=nillable))
 
+    # Estimated extents of all the tables in one query
+    cur.execute("""SELECT u.s, u.t, ST_XMin(x.e), ST_YMin(x.e), ST_XMax(x.e), ST_YMax(x.e)
+                   FROM unnest(%s::text[], %s::text[]) AS u(s, t), LATERAL (SELECT ST_EstimatedExtent(u.s, u.t, %s) AS e) AS x""", (schemas, names, geom_col))
+    extents = {(schema, table): bbox for schema, table, *bbox in cur.fetchall()}
+
+    scanned = 0
+    for key in tables:
+        bbox = extents.get(key)
+        if bbox is None or bbox[0] is None:
+            cur.execute('SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e) FROM (SELECT ST_Extent("{geom}") AS e FROM {schema}."{table}") AS t'.format(geom=geom_col, schema=key[0], table=key[1]))
+            bbox = cur.fetchone()
+            scanned += 1
+        if bbox is None or bbox[0] is None:
+            continue
+
+        info = tables_info[key]
+        bbox = tuple(float(value) for value in bbox)
+        try:
+            latlon = get_latlon_bbox(bbox, f"EPSG:{info['srid']}") if info['srid'] else None
+        except (CRSError, ProjError) as e:
+            logging.warning(f"{log_module}:The lat/lon bounding box of: '{key[0]}.{key[1]}' could not be computed: {e}")
+            latlon = None
+        if latlon is not None and all(np.isfinite(latlon)):
+            info['bbox'] = dict(native=bbox, latlon=latlon, srid=info['srid'])
+
+    logging.info(f"{log_module}:Tables layout: {len([key for key in tables if 'bbox' in tables_info[key]])} bounding boxes ({scanned} scanned without statistics) and attributes of {len(tables)} tables in {time.perf_counter() - start:.3f}s")
+
+def get_index_settings(index_memory: Optional[int] = None, sessions: Optional[int] = 1):
+    """
+    Returns the session settings of the index builds from a global memory budget shared by the concurrent builds.
+
+    Parameters
+    ----------
+        - index_memory: Memory budget (MB) of all the concurrent index builds. None: server defaults.
+        - sessions: Number of concurrent index builds.
+
+    Return
+    ----------
+    maintenance_work_mem (MB) and max_parallel_maintenance_workers of each session, or (None, None)
+    """
+    if not index_memory:
+        return None, None
+
+    maintenance_work_mem = max(int(index_memory) // max(sessions or 1, 1), 1)
+    # Each participant (leader included) of a parallel index build needs 32MB of maintenance_work_mem
+    parallel_workers = min(max(maintenance_work_mem // PARALLEL_BUILD_MEMORY - 1, 0), MAX_PARALLEL_MAINTENANCE_WORKERS)
+
+    return maintenance_work_mem, parallel_workers
+
+def select_index_method(geometry_type: Optional[str] = None, row_count: Optional[int] = None, correlation: Optional[float] = None, override: Optional[str] = None):
+    """
+    Select the method of the geometry index of a table.
 
+    - BRIN: large point tables physically sorted in space (a fraction of the GIST size, built in seconds).
+    - SP-GiST: point tables (space partitioning of non overlapping geometries).
+    - GIST: other geometries and small tables.
+
+    Parameters
+    ----------
+        - geometry_type: Geometry type of the table (e.g. 'MULTIPOINT').
+        - row_count: Number of rows of the table.
+        - correlation: Correlation between the physical and the spatial order of the rows (check_spatial_clustering).
+        - override: Index method of the dataset ('gist', 'spgist' or 'brin'), used if it is valid.
+
+    Return
+    ----------
+    Index method str
+    """
+    if override and str(override).lower() in INDEX_METHODS:
+        return str(override).lower()
+
+    if geometry_type is None or geometry_type.upper() not in POINT_TYPES or not row_count:
+        return 'gist'
+
+    if row_count >= BRIN_MIN_ROWS and correlation is not None and abs(correlation) >= BRIN_MIN_CORRELATION:
+        return 'brin'
+
+    if row_count >= SPGIST_MIN_ROWS:
+        return 'spgist'
+
+    return 'gist'
+
+def benchmark_index_methods(dataset, db_params, table: Optional[str] = None, geom_col: Optional[str] = 'geom', methods: Optional[tuple] = INDEX_METHODS, sample_percent: Optional[float] = 10, queries: Optional[int] = 20, window: Optional[float] = 0.01):
+    """
+    Compare the geometry index methods on a sample of a table: index size, build time and bbox query latency.
+
+    The sample (TABLESAMPLE SYSTEM, blocks in physical order) is copied into a temporary table, each index is built,
+    the same random bbox queries are run with sequential scans disabled and the index is dropped.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - table: DB table. Default: dataset table.
+        - geom_col: Name of the geometry field.
+        - methods: Index methods to compare.
+        - sample_percent: Percent of the table blocks sampled.
+        - queries: Number of bbox queries.
+        - window: Size of the bbox queries, fraction of the sample extent width/height.
+
+    Return
+    ----------
+    dict: {method: {'size': bytes, 'build_time': s, 'query_time': s (mean)}}
+    """
+    if table is None:
+        table = dataset.table
+
+    results = {}
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+        cur.execute('CREATE TEMPORARY TABLE bench_sample ON COMMIT DROP AS SELECT "{geom}" AS geom FROM {schema}."{table}" TABLESAMPLE SYSTEM ({sample_percent}) WHERE "{geom}" IS NOT NULL'.format(
+            schema=dataset.schema, table=table, geom=geom_col, sample_percent=sample_percent))
+        cur.execute("SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e), ST_SRID(g) FROM (SELECT ST_Extent(geom) AS e, min(ST_SRID(geom)) AS g FROM bench_sample) AS t")
+        minx, miny, maxx, maxy, srid = cur.fetchone()
+        if minx is None:
+            return results
+
+        # Same random windows for all the methods
+        rng = np.random.default_rng(0)
+        width, height = (maxx - minx) * window, (maxy - miny) * window
+        xs = rng.uniform(minx, maxx - width, queries)
+        ys = rng.uniform(miny, maxy - height, queries)
+        cur.execute("SET LOCAL enable_seqscan = off")
+
+        for method in methods:
+            start = time.perf_counter()
+            cur.execute(f"CREATE INDEX bench_idx ON bench_sample USING {method}(geom)")
+            build_time = time.perf_counter() - start
+            cur.execute("ANALYZE bench_sample")
+            cur.execute("SELECT pg_relation_size('bench_idx')")
+            size = cur.fetchone()[0]
+
+            start = time.perf_counter()
+            for x, y in zip(xs, ys):
+                cur.execute("SELECT count(*) FROM bench_sample WHERE geom && ST_MakeEnvelope(%s, %s, %s, %s, %s)", (float(x), float(y), float(x + width), float(y + height), srid))
+                cur.fetchone()
+            query_time = (time.perf_counter() - start) / max(queries, 1)
+
+            cur.execute("DROP INDEX bench_idx")
+            results[method] = dict(size=size, build_time=build_time, query_time=query_time)
+
+        conn.rollback()
+        summary = " | ".join(f"{m}: size {r['size'] / 1024 / 1024:.1f}MB, build {r['build_time']:.3f}s, query {r['query_time'] * 1000:.2f}ms" for m, r in results.items())
+        logging.info(f"{log_module}:Index benchmark of table: '{dataset.schema}.{table}' ({sample_percent}% sample) | {summary}")
+        dataset.set_status_info(f"Index benchmark ({sample_percent}% sample): {summary}")
+
+    except Exception as e:
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when benchmark the index methods: {e}")
+        if conn is not None:
+            conn.rollback()
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return results
+
+def create_index(dataset, db_params, table: Optional[str] = None, cluster: Optional[bool] = True, maintenance_work_mem: Optional[int] = None, parallel_workers: Optional[int] = None, method: Optional[str] = 'gist'):
+    """
+    Update/Create Geometry Index and clustering table
+
+    A new table is indexed with CREATE INDEX. If the index already exists (e.g. previous run), it is replaced without
+    blocking the readers: CREATE INDEX CONCURRENTLY of a new index, DROP INDEX CONCURRENTLY of the old one and rename.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS
+        - db_params: Database connection details
+        - table: DB table. Default: dataset table.
+        - cluster: CLUSTER the table using the geometry index (only GIST indexes). Not needed if the rows were loaded spatially sorted.
+        - maintenance_work_mem: Session maintenance_work_mem (MB) of the build. Default: server setting.
+        - parallel_workers: Session max_parallel_maintenance_workers of the build. Default: server setting.
+        - method: Index method: 'gist', 'spgist' or 'brin' (select_index_method). Default: gist.
+
+    Return
+    ----------
+    Dataset object
+    """
+
+    if table is None:
+        table = dataset.table
+    method = method if method in INDEX_METHODS else 'gist'
+
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        # CREATE/DROP INDEX CONCURRENTLY can not run inside a transaction (autocommit of the DBAPI connection of the pool proxy)
+        conn.connection.autocommit = True
+        cur = conn.cursor()
+        if maintenance_work_mem:
+            cur.execute("SET maintenance_work_mem = '{}MB'".format(int(maintenance_work_mem)))
+        if parallel_workers is not None:
+            cur.execute("SET max_parallel_maintenance_workers = {}".format(int(parallel_workers)))
+
+        start = time.perf_counter()
+        cur.execute("SELECT to_regclass(%s)", (f'{dataset.schema}."gidx_{table}"',))
+        if cur.fetchone()[0] is None:
+            cur.execute('CREATE INDEX "gidx_{table}" ON {schema}."{table}" USING {method}(geom)'.format(schema=dataset.schema, table=table, method=method))
+        else:
+            new_index = f"gidx_{table}"[:59] + "_new"
+            cur.execute('DROP INDEX IF EXISTS {schema}."{new_index}"'.format(schema=dataset.schema, new_index=new_index))
+            cur.execute('CREATE INDEX CONCURRENTLY "{new_index}" ON {schema}."{table}" USING {method}(geom)'.format(schema=dataset.schema, table=table, new_index=new_index, method=method))
+            cur.execute('DROP INDEX CONCURRENTLY {schema}."gidx_{table}"'.format(schema=dataset.schema, table=table))
+            cur.execute('ALTER INDEX {schema}."{new_index}" RENAME TO "gidx_{table}"'.format(schema=dataset.schema, table=table, new_index=new_index))
+        build_time = time.perf_counter() - start
+        dataset.set_index_build_time(build_time)
+        dataset.set_index_method(method)
+        logging.info(log_module + ":" + "Create geom index of table: " + dataset.schema + "." + table + f" | Method: {method} | Build time: {build_time:.3f}s")
+        dataset.set_status_info('Create geom index of table: ' + dataset.schema + "." + table + f" | Method: {method} | Build time: {build_time:.3f}s")
+
+        if cluster and method == 'gist':
+            cur.execute('CLUSTER {schema}."{table}" USING "gidx_{table}"'.format(schema=dataset.schema, table=table))
+            logging.info(log_module + ":" + "Clustering table: " + dataset.schema + "." + table)
+            dataset.set_status_info('Clustering table: ' + dataset.schema + "." + table)
+
+    except:
+        logging.error(log_module + ":" + "The dataset: " + dataset.identifier + " fail when cluster the geom index")
+        dataset.set_status('error')
+        dataset.set_status_info('Error clustering: ' + dataset.schema + "." + table)
+    finally:
+        if conn is not None:
+            # Pooled connection: restore the session
+            try:
+                conn.cursor().execute("RESET maintenance_work_mem; RESET max_parallel_maintenance_workers")
+                conn.connection.autocommit = False
+            except Exception:
+                pass
+            conn.close()
+
+    return dataset
+
+def get_partitions(dataset, db_params, table: Optional[str] = None):
+    """
+    Returns the partitions of a partitioned table.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - table: DB table. Default: dataset table.
+
+    Return
+    ----------
+    List of partition tables (empty if the table is not partitioned)
+    """
+    if table is None:
+        table = dataset.table
+
+    conn = get_pooled_connection(db_params)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname", (f'{dataset.schema}."{table}"',))
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+def create_partition_indexes(dataset, db_params, table: Optional[str] = None, cluster: Optional[bool] = True, maintenance_work_mem: Optional[int] = None, parallel_workers: Optional[int] = None, method: Optional[str] = 'gist', workers: Optional[int] = PARTITION_INDEX_WORKERS):
+    """
+    Create the geometry index of a partitioned table: the index of each partition is built in parallel and attached to the
+    index of the partitioned table (created ON ONLY the parent table).
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - table: DB table (partitioned). Default: dataset table.
+        - cluster: CLUSTER each partition using its geometry index (only GIST indexes).
+        - maintenance_work_mem: Session maintenance_work_mem (MB) of each build. Default: server setting.
+        - parallel_workers: Session max_parallel_maintenance_workers of each build. Default: server setting.
+        - method: Index method: 'gist', 'spgist' or 'brin'. Default: gist.
+        - workers: Number of partitions indexed concurrently, at most the pool size - 1 (a connection is left to the other loaders).
+
+    Return
+    ----------
+    Dataset object
+    """
+    if table is None:
+        table = dataset.table
+    method = method if method in INDEX_METHODS else 'gist'
+
+    conn = None
+    try:
+        partitions = get_partitions(dataset, db_params, table)
+        start = time.perf_counter()
+
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+        cur.execute('CREATE INDEX IF NOT EXISTS "gidx_{table}" ON ONLY {schema}."{table}" USING {method}(geom)'.format(schema=dataset.schema, table=table, method=method))
+        conn.commit()
+        # Each build checks out its own connection, the connection is not held while they wait for the pool
+        conn.close()
+        conn = None
+
+        workers = max(min(workers or 1, len(partitions), get_pool_size(db_params) - 1), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda partition: create_index(dataset, db_params, table=partition, cluster=cluster, maintenance_work_mem=maintenance_work_mem, parallel_workers=parallel_workers, method=method), partitions))
+
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+        for partition in partitions:
+            cur.execute('ALTER INDEX {schema}."gidx_{table}" ATTACH PARTITION {schema}."gidx_{partition}"'.format(schema=dataset.schema, table=table, partition=partition))
+        conn.commit()
+
+        build_time = time.perf_counter() - start
+        dataset.set_index_build_time(build_time)
+        logging.info(f"{log_module}:Create geom index of partitioned table: '{dataset.schema}.{table}' ({len(partitions)} partitions) | Method: {method} | Build time: {build_time:.3f}s")
+        dataset.set_status_info(f"Create geom index of partitioned table: '{dataset.schema}.{table}' ({len(partitions)} partitions) | Method: {method} | Build time: {build_time:.3f}s")
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when create the geom index of the partitions: {e}")
+        dataset.set_status('error')
+        dataset.set_status_info(f"Error creating the geom index of the partitions of: '{dataset.schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
+
+def prepare_table(dataset, db_params, table: Optional[str] = None, primary_key: Optional[bool] = True, search_attributes: Optional[list] = None, analyze: Optional[bool] = True):
+    """
+    Prepare a loaded table for the Geoserver queries: identity primary key (feature IDs and WFS paging), indexes of the
+    search attributes (CQL filters) and ANALYZE (planner statistics before the layer is published).
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - table: DB table. Default: dataset table.
+        - primary_key: Add an identity primary key if the table has not one.
+        - search_attributes: List of fields indexed with a btree index. Default: dataset search attributes.
+        - analyze: ANALYZE the table.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if table is None:
+        table = dataset.table
+    if search_attributes is None:
+        search_attributes = dataset.search_attributes or []
+
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+        cur.execute("SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s", (dataset.schema, table))
+        columns = [row[0] for row in cur.fetchall()]
+
+        # Identity primary key, named after the table (the staging names are renamed by the swap)
+        if primary_key:
+            cur.execute("SELECT 1 FROM pg_index WHERE indrelid = to_regclass(%s) AND indisprimary", (f'{dataset.schema}."{table}"',))
+            if cur.fetchone() is None:
+                pk_column = next(c for c in PRIMARY_KEY_COLUMNS + tuple(f"gid_{i}" for i in range(1, 10)) if c not in columns)
+                # Partitioned tables: sequence default (no identity columns) and the partition key in the primary key
+                if PARTITION_KEY_COLUMN in columns:
+                    sequence = f"{table}_{pk_column}_seq"[:63]
+                    cur.execute('CREATE SEQUENCE IF NOT EXISTS {schema}."{sequence}"'.format(schema=dataset.schema, sequence=sequence))
+                    cur.execute('ALTER TABLE {schema}."{table}" ADD COLUMN "{column}" bigint NOT NULL DEFAULT nextval(\'{schema}."{sequence}"\'), ADD CONSTRAINT "{pk}" PRIMARY KEY ("{column}", "{partition_col}")'.format(
+                        schema=dataset.schema, table=table, column=pk_column, sequence=sequence, pk=f"pk_{table}"[:63], partition_col=PARTITION_KEY_COLUMN))
+                    cur.execute('ALTER SEQUENCE {schema}."{sequence}" OWNED BY {schema}."{table}"."{column}"'.format(schema=dataset.schema, sequence=sequence, table=table, column=pk_column))
+                else:
+                    cur.execute('ALTER TABLE {schema}."{table}" ADD COLUMN "{column}" bigint GENERATED ALWAYS AS IDENTITY, ADD CONSTRAINT "{pk}" PRIMARY KEY ("{column}")'.format(
+                        schema=dataset.schema, table=table, column=pk_column, pk=f"pk_{table}"[:63]))
+                logging.info(f"{log_module}:Add primary key: '{pk_column}' to table: '{dataset.schema}.{table}'")
+                dataset.set_status_info(f"Add primary key: '{pk_column}' to table: '{dataset.schema}.{table}'")
+
+        # Search attributes
+        for attribute in search_attributes:
+            column = attribute.strip().lower()
+            if column not in columns:
+                logging.warning(f"{log_module}:The search attribute: '{column}' is not a field of table: '{dataset.schema}.{table}'")
+                continue
+            cur.execute('CREATE INDEX IF NOT EXISTS "{index}" ON {schema}."{table}" ("{column}")'.format(
+                schema=dataset.schema, table=table, column=column, index=f"aidx_{table}_{column}"[:63]))
+            logging.info(f"{log_module}:Create index of search attribute: '{column}' of table: '{dataset.schema}.{table}'")
+            dataset.set_status_info(f"Create index of search attribute: '{column}' of table: '{dataset.schema}.{table}'")
+
+        conn.commit()
+
+        # Planner statistics of the new rows
+        if analyze:
+            cur.execute('ANALYZE {schema}."{table}"'.format(schema=dataset.schema, table=table))
+            conn.commit()
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when prepare the table: '{dataset.schema}.{table}': {e}")
+        dataset.set_status('error')
+        dataset.set_status_info(f"Error preparing the table: '{dataset.schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
+
+def measure_bbox_queries(cur, schema: str, table: str, windows: list, srid: int, geom_col: Optional[str] = 'geom'):
+    """
+    Run bbox queries on a table and measure the selectivity of the index filter and the latency.
+
+    Parameters
+    ----------
+        - cur: Database cursor.
+        - schema: DB schema.
+        - table: DB table.
+        - windows: List of (minx, miny, maxx, maxy) bbox windows.
+        - srid: SRID of the windows.
+        - geom_col: Name of the geometry field.
+
+    Return
+    ----------
+    dict: {'candidates': rows of the bbox filter, 'hits': rows intersecting, 'selectivity': hits / candidates, 'query_time': s (mean)}
+    """
+    candidates = hits = 0
+    start = time.perf_counter()
+    for window in windows:
+        cur.execute("""SELECT count(*), count(*) FILTER (WHERE ST_Intersects(t.{geom}, e.geom))
+                       FROM {schema}."{table}" t, ST_MakeEnvelope(%s, %s, %s, %s, %s) AS e(geom)
+                       WHERE t.{geom} && e.geom""".format(schema=schema, table=table, geom=geom_col), (*map(float, window), srid))
+        window_candidates, window_hits = cur.fetchone()
+        candidates += window_candidates
+        hits += window_hits
+    query_time = (time.perf_counter() - start) / max(len(windows), 1)
+
+    return dict(candidates=candidates, hits=hits, selectivity=hits / candidates if candidates else 1.0, query_time=query_time)
+
+def subdivide_table(dataset, db_params, max_vertices: int, table: Optional[str] = None, geom_col: Optional[str] = 'geom', queries: Optional[int] = 20, window: Optional[float] = 0.01):
+    """
+    Split the features of a table with more than max_vertices vertices with ST_Subdivide, so the bbox of each piece
+    is small and the geometry index filters the rows of the bbox queries. Each piece keeps the primary key of the original
+    feature in the field 'parent_fid' (reassembled with ST_Union ... GROUP BY COALESCE(parent_fid, <primary key>)).
+
+    The selectivity of the index filter (rows intersecting / rows of the bbox filter) and the latency of the same random bbox
+    queries over the extent of the split features are reported before and after.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - max_vertices: Maximum number of vertices of the features, the larger ones are subdivided.
+        - table: DB table (with primary key). Default: dataset table.
+        - geom_col: Name of the geometry field.
+        - queries: Number of bbox queries of the report.
+        - window: Size of the bbox queries, fraction of the extent width/height of the split features.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if table is None:
+        table = dataset.table
+
+    geometry_type = (dataset.geometry_type or '').upper()
+    if geometry_type in POINT_TYPES:
+        return dataset
+
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+
+        # Primary key of the features (without the partition key)
+        cur.execute("""SELECT a.attname FROM pg_index i JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                       WHERE i.indrelid = to_regclass(%s) AND i.indisprimary""", (f'{dataset.schema}."{table}"',))
+        keys = [row[0] for row in cur.fetchall() if row[0] != PARTITION_KEY_COLUMN]
+        if len(keys) != 1:
+            logging.warning(f"{log_module}:The table: '{dataset.schema}.{table}' has no primary key, its features are not subdivided.")
+            return dataset
+        key = keys[0]
+
+        cur.execute("""SELECT n, ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e), srid FROM (
+                        SELECT count(*) AS n, ST_Extent({geom}) AS e, min(ST_SRID({geom})) AS srid FROM {schema}."{table}" WHERE ST_NPoints({geom}) > %s) AS t""".format(
+                        schema=dataset.schema, table=table, geom=geom_col), (max_vertices,))
+        oversized, minx, miny, maxx, maxy, srid = cur.fetchone()
+        if not oversized:
+            conn.commit()
+            logging.info(f"{log_module}:The table: '{dataset.schema}.{table}' has no features with more than {max_vertices} vertices.")
+            return dataset
+
+        # Same random windows before and after
+        rng = np.random.default_rng(0)
+        width, height = (maxx - minx) * window, (maxy - miny) * window
+        xs = rng.uniform(minx, maxx - width, queries)
+        ys = rng.uniform(miny, maxy - height, queries)
+        windows = [(x, y, x + width, y + height) for x, y in zip(xs, ys)]
+        before = measure_bbox_queries(cur, dataset.schema, table, windows, srid, geom_col)
+
+        cur.execute("""SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum""", (f'{dataset.schema}."{table}"',))
+        columns = "".join('"{}", '.format(row[0]) for row in cur.fetchall() if row[0] not in (key, geom_col, PARENT_FID_COLUMN))
+
+        # The pieces get a new primary key (identity/sequence) and the parent one
+        cur.execute('ALTER TABLE {schema}."{table}" ADD COLUMN IF NOT EXISTS "{parent}" bigint'.format(schema=dataset.schema, table=table, parent=PARENT_FID_COLUMN))
+        cur.execute("""WITH oversized AS (DELETE FROM {schema}."{table}" WHERE ST_NPoints({geom}) > %s RETURNING *)
+                       INSERT INTO {schema}."{table}" ({columns}"{parent}", {geom})
+                       SELECT {columns}COALESCE("{parent}", "{key}"), ST_Multi(ST_Subdivide({geom}, %s)) FROM oversized""".format(
+                       schema=dataset.schema, table=table, geom=geom_col, columns=columns, parent=PARENT_FID_COLUMN, key=key), (max_vertices, max_vertices))
+        pieces = cur.rowcount
+        conn.commit()
+
+        after = measure_bbox_queries(cur, dataset.schema, table, windows, srid, geom_col)
+        conn.commit()
+
+        report = (f"Subdivide table: '{dataset.schema}.{table}' | {oversized} features with more than {max_vertices} vertices into {pieces} pieces | "
+                  f"Index selectivity: {before['selectivity']:.1%} -> {after['selectivity']:.1%} (bbox rows {before['candidates']} -> {after['candidates']}) | "
+                  f"Query latency: {before['query_time'] * 1000:.2f}ms -> {after['query_time'] * 1000:.2f}ms")
+        logging.info(f"{log_module}:{report}")
+        dataset.set_status_info(report)
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when subdivide the features of: '{dataset.schema}.{table}': {e}")
+        dataset.set_status('error')
+        dataset.set_status_info(f"Error subdividing the features of: '{dataset.schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
+
+def get_narrow_types(cur, schema: str, table: str, columns: list):
+    """
+    Returns the narrowest type of the fields of a table that stores its values, with a single scan: smallint/integer
+    for the integer and integral float fields, real for the float fields exactly stored as float4 and boolean for the
+    'TRUE'/'FALSE' strings.
+
+    Parameters
+    ----------
+        - cur: Cursor of the DB connection.
+        - schema: DB schema.
+        - table: DB table.
+        - columns: List of (field, type) tuples of bigint, integer, double precision and text/character varying fields.
+
+    Return
+    ----------
+    dict of narrow type by field (None if the field type can not be narrowed)
+    """
+    # Range of the numeric fields (integral floats and float4 round trip) and boolean strings
+    aggregates = []
+    for name, data_type in columns:
+        if data_type in ('bigint', 'integer'):
+            aggregates += [f'min("{name}")::float8', f'max("{name}")::float8', 'true', 'false']
+        elif data_type == 'double precision':
+            aggregates += [f'min("{name}")', f'max("{name}")', f'bool_and("{name}" = trunc("{name}"))',
+                           f'bool_and(CASE WHEN abs("{name}") < 1e38 THEN "{name}"::real::float8 = "{name}" ELSE false END)']
+        else:
+            aggregates += ['NULL::float8', 'NULL::float8', f"bool_and(upper(\"{name}\") IN ({', '.join(repr(v) for v in BOOLEAN_STRINGS)}))", 'false']
+    cur.execute('SELECT {aggregates} FROM {schema}."{table}"'.format(aggregates=", ".join(aggregates), schema=schema, table=table))
+    stats = cur.fetchone()
+
+    narrow_types = {}
+    integer_types = [t for t, _, _ in INTEGER_RANGES]
+    for i, (name, data_type) in enumerate(columns):
+        minimum, maximum, integral, single = stats[i * 4:i * 4 + 4]
+        narrow_type = None
+        if data_type not in ('bigint', 'integer', 'double precision'):
+            narrow_type = 'boolean' if integral else None
+        elif minimum is not None and maximum is not None and integral:
+            narrow_type = next((t for t, low, high in INTEGER_RANGES if low <= minimum and maximum <= high), None)
+            if narrow_type is not None and data_type != 'double precision' and integer_types.index(narrow_type) >= integer_types.index(data_type):
+                narrow_type = None
+        if narrow_type is None and data_type == 'double precision' and single:
+            narrow_type = 'real'
+        narrow_types[name] = narrow_type
+
+    return narrow_types
+
+def get_widened_type(live_type: str, delta_type: str, narrow_type: Optional[str] = None):
+    """
+    Returns the type of a (narrowed) field of a table that stores the values of a delta load: its type if the delta
+    values fit, the wider integer type of both or else the type of the field in the delta table.
+
+    Parameters
+    ----------
+        - live_type: Type of the field in the dataset table.
+        - delta_type: Type of the field in the delta staging table.
+        - narrow_type: Narrowest type of the delta values (see get_narrow_types). Default: the delta type.
+
+    Return
+    ----------
+    PostgreSQL type name
+    """
+    fit_type = narrow_type or delta_type
+    if fit_type == live_type:
+        return live_type
+
+    integer_types = [t for t, _, _ in INTEGER_RANGES]
+    if live_type in integer_types and fit_type in integer_types:
+        return max(live_type, fit_type, key=integer_types.index)
+
+    return delta_type
+
+def narrow_columns(dataset, db_params, table: Optional[str] = None, geom_col: Optional[str] = 'geom'):
+    """
+    Narrow the attribute types of a table to the observed values with a single table rewrite: integer and integral
+    float fields to smallint/integer, float fields exactly stored as float4 to real and 'TRUE'/'FALSE' strings to boolean.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - table: DB table. Default: dataset table.
+        - geom_col: Name of the geometry field.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if table is None:
+        table = dataset.table
+
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+        cur.execute("""SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = %s AND table_name = %s
+                       AND data_type IN ('bigint', 'integer', 'double precision', 'text', 'character varying') ORDER BY ordinal_position""", (dataset.schema, table))
+        columns = [(name, data_type) for name, data_type in cur.fetchall() if name not in (geom_col, *INTERNAL_COLUMNS)]
+        if not columns:
+            return dataset
+
+        narrow_types = get_narrow_types(cur, dataset.schema, table, columns)
+        changes = [(name, narrow_type, f'upper("{name}")::boolean' if narrow_type == 'boolean' else f'"{name}"::{narrow_type}')
+                   for name, narrow_type in narrow_types.items() if narrow_type is not None]
+
+        if not changes:
+            conn.commit()
+            return dataset
+
+        cur.execute('SELECT pg_total_relation_size(to_regclass(%s))', (f'{dataset.schema}."{table}"',))
+        size_before = cur.fetchone()[0]
+        cur.execute('ALTER TABLE {schema}."{table}" {changes}'.format(schema=dataset.schema, table=table,
+                    changes=", ".join(f'ALTER COLUMN "{name}" TYPE {narrow_type} USING {using}' for name, narrow_type, using in changes)))
+        cur.execute('SELECT pg_total_relation_size(to_regclass(%s))', (f'{dataset.schema}."{table}"',))
+        size_after = cur.fetchone()[0]
+        conn.commit()
+
+        saved = size_before - size_after
+        dataset.set_bytes_saved((dataset.bytes_saved or 0) + saved)
+        summary = ", ".join(f"{name}: {narrow_type}" for name, narrow_type, _ in changes)
+        logging.info(f"{log_module}:Narrow types of table: '{dataset.schema}.{table}' | {summary} | Size: {size_before} -> {size_after} bytes ({saved} bytes saved)")
+        dataset.set_status_info(f"Narrow types of table: '{dataset.schema}.{table}' | {summary} | {saved} bytes saved")
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when narrow the types of: '{dataset.schema}.{table}': {e}")
+        dataset.set_status_info(f"Error narrowing the types of: '{dataset.schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
+
+def get_overview_table(table: str, level: int):
+    """
+    Returns the name of an overview table of a dataset table.
+
+    Parameters
+    ----------
+        - table: DB table.
+        - level: Overview level (1: lowest tolerance).
+
+    Return
+    ----------
+    Overview table name
+    """
+    return f"ovr{level}_{table}"[:63]
+
+def create_overview_tables(dataset, db_params, tolerances: list, table: Optional[str] = None, geom_col: Optional[str] = 'geom', max_vertices: Optional[int] = OVERVIEW_MAX_VERTICES):
+    """
+    Create the overview tables of a line/polygon table: generalized copies (ST_SimplifyPreserveTopology) of the geometries
+    at each tolerance, subdivided (ST_Subdivide) so the small scale requests read few vertices of each indexed piece.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - tolerances: List of simplification tolerances, in the units of the table SRID. Level 1 is the lowest tolerance.
+        - table: DB table. Default: dataset table.
+        - geom_col: Name of the geometry field.
+        - max_vertices: Maximum number of vertices of the subdivided geometries.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if table is None:
+        table = dataset.table
+
+    geometry_type = (dataset.geometry_type or '').upper()
+    if geometry_type not in OVERVIEW_TYPES:
+        logging.info(f"{log_module}:The table: '{dataset.schema}.{table}' of geometry type: '{geometry_type}' has no overview tables.")
+        return dataset
+
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+        cur.execute("""SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+                       WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum""", (f'{dataset.schema}."{table}"',))
+        attributes = cur.fetchall()
+        columns = "".join('"{}", '.format(name) for name, _ in attributes if name != geom_col)
+
+        # The subdivided pieces are stored as multi geometries of the same type and SRID
+        geom_type = dict(attributes)[geom_col]
+        if geom_type.lower().startswith('geometry(') and not geom_type.lower().startswith('geometry(multi'):
+            geom_type = 'geometry(Multi' + geom_type[len('geometry('):]
+
+        cur.execute('SELECT sum(ST_NPoints({geom})) FROM {schema}."{table}"'.format(schema=dataset.schema, table=table, geom=geom_col))
+        vertices = int(cur.fetchone()[0] or 0)
+        conn.commit()
+
+        overviews = []
+        for level, tolerance in enumerate(sorted(tolerances), start=1):
+            start = time.perf_counter()
+            overview = get_overview_table(table, level)
+
+            # Each level is simplified from the table geometries, so the subdivided pieces of a feature share its edges
+            cur.execute('DROP TABLE IF EXISTS {schema}."{overview}"'.format(schema=dataset.schema, overview=overview))
+            cur.execute("""CREATE TABLE {schema}."{overview}" AS
+                           SELECT {columns}ST_Multi(ST_Subdivide({geom}, {max_vertices}))::{geom_type} AS {geom}
+                           FROM (SELECT {columns}ST_SimplifyPreserveTopology({geom}, %s) AS {geom} FROM {schema}."{table}" WHERE {geom} IS NOT NULL) AS simplified
+                           WHERE NOT ST_IsEmpty({geom})""".format(
+                           schema=dataset.schema, overview=overview, table=table, columns=columns, geom=geom_col, geom_type=geom_type, max_vertices=max_vertices), (tolerance,))
+            cur.execute('CREATE INDEX "{index}" ON {schema}."{overview}" USING gist({geom})'.format(schema=dataset.schema, overview=overview, index=f"gidx_{overview}"[:63], geom=geom_col))
+            cur.execute('ANALYZE {schema}."{overview}"'.format(schema=dataset.schema, overview=overview))
+            cur.execute('SELECT count(*), sum(ST_NPoints({geom})) FROM {schema}."{overview}"'.format(schema=dataset.schema, overview=overview, geom=geom_col))
+            rows, overview_vertices = cur.fetchone()
+            conn.commit()
+
+            overview_vertices = int(overview_vertices or 0)
+            overviews.append(dict(table=overview, tolerance=tolerance, vertices=overview_vertices))
+            logging.info(f"{log_module}:Overview table: '{dataset.schema}.{overview}' | Tolerance: {tolerance} | Features: {rows} | Vertices: {overview_vertices} of {vertices} ({overview_vertices / (vertices or 1):.1%}) | Build time: {time.perf_counter() - start:.3f}s")
+            dataset.set_status_info(f"Overview table: '{dataset.schema}.{overview}' | Tolerance: {tolerance} | Vertices: {overview_vertices} of {vertices}")
+
+        dataset.set_overviews(overviews)
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when create the overview tables: {e}")
+        dataset.set_status_info(f"Error creating the overview tables of: '{dataset.schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
+
+def get_clustering_correlation(conn, schema: str, table: str, geom_col: Optional[str] = 'geom', sample_percent: Optional[float] = None, chunk_size: Optional[int] = 100000):
+    """
+    Returns the correlation between the physical order of the rows of a table (block number) and its order along the
+    Hilbert curve of the spatial sort (hilbert_sort_index).
+
+    Parameters
+    ----------
+        - conn: Database connection.
+        - schema: DB schema.
+        - table: DB table (not partitioned).
+        - geom_col: Name of the geometry field.
+        - sample_percent: Percent of the table blocks sampled (TABLESAMPLE SYSTEM). If None, the whole table is checked.
+        - chunk_size: Number of rows fetched at once (server side cursor).
+
+    Return
+    ----------
+    Correlation (None if the table has less than 2 geometries) and number of rows checked
+    """
+    query = """SELECT (ctid::text::point)[0], ST_XMin({geom}), ST_YMin({geom}), ST_XMax({geom}), ST_YMax({geom})
+                FROM {schema}."{table}" {sample}
+                WHERE {geom} IS NOT NULL""".format(
+                schema=schema,
+                table=table,
+                geom=geom_col,
+                sample=f"TABLESAMPLE SYSTEM ({sample_percent})" if sample_percent else ""
+            )
+
+    # Block number and bounds of the rows, fetched in chunks
+    cur = conn.cursor(name=f"clustering_{table}"[:63])
+    cur.execute(query)
+    chunks = []
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=np.float64))
+    cur.close()
+
+    rows = np.concatenate(chunks) if chunks else np.empty((0, 5))
+    if len(rows) < 2:
+        return None, len(rows)
+
+    # Rank of each row along the Hilbert curve of the table extent
+    order = np.argsort(hilbert_bounds_distance(rows[:, 1:]), kind='stable')
+    rank = np.empty(len(order), dtype=np.float64)
+    rank[order] = np.arange(len(order))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = np.corrcoef(rows[:, 0], rank)[0, 1]
+
+    return (None if np.isnan(correlation) else float(correlation)), len(rows)
+
+def check_spatial_clustering(dataset, db_params, table: Optional[str] = None, geom_col: Optional[str] = 'geom', sample_percent: Optional[float] = None):
+    """
+    Check the spatial clustering of a table: correlation between the physical order of the rows (block number) and its order
+    along the Hilbert curve of the spatial sort.
+
+    The correlation is close to 1 in a spatially clustered table and close to 0 if the rows are randomly stored. The partitions
+    of a partitioned table are checked one by one (the block numbers of each partition are independent), and the correlation
+    of the table is the mean weighted by the rows of each partition.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - table: DB table. Default: dataset table.
+        - geom_col: Name of the geometry field.
+        - sample_percent: Percent of the table blocks sampled (TABLESAMPLE SYSTEM). If None, the whole table is checked.
+
+    Return
+    ----------
+    Dataset object
+    """
+    if table is None:
+        table = dataset.table
+
+    conn = None
+    try:
+        partitions = get_partitions(dataset, db_params, table)
+
+        conn = get_pooled_connection(db_params)
+        results = [get_clustering_correlation(conn, dataset.schema, partition, geom_col, sample_percent) for partition in (partitions or [table])]
+        conn.commit()
+
+        results = [(correlation, rows) for correlation, rows in results if correlation is not None]
+        correlation = sum(correlation * rows for correlation, rows in results) / sum(rows for _, rows in results) if results else None
+
+        dataset.set_clustering_correlation(correlation)
+        logging.info(f"{log_module}:Spatial clustering correlation of table: '{dataset.schema}.{table}': {correlation}")
+        dataset.set_status_info(f"Spatial clustering correlation of table: '{dataset.schema}.{table}': {correlation}")
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when check the spatial clustering: {e}")
+        dataset.set_status_info(f"Error checking the spatial clustering of: '{dataset.schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
+
+def get_staging_table(table: str):
+    """
+    Returns the name of the staging table of a dataset table.
+
+    Parameters
+    ----------
+        - table: DB table.
+
+    Return
+    ----------
+    Staging table name
+    """
+    # The prefix keeps the staging index name (gidx_stg_<table>) different from the live one if the name is truncated (63 chars)
+    return f"stg_{table}"[:63]
+
+def get_delta_table(table: str):
+    """
+    Returns the name of the delta staging table of a dataset table.
+
+    Parameters
+    ----------
+        - table: DB table.
+
+    Return
+    ----------
+    Delta staging table name
+    """
+    return f"dlt_{table}"[:63]
+
+def check_delta_table(dataset, db_params, key: Optional[str] = None):
+    """
+    Check if the dataset table can be updated with a delta load: it exists and has the feature hashes (and the key field).
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - key: Field that identifies the features (UPDATEs). Optional.
+
+    Return
+    ----------
+    True/False
+    """
+    conn = get_pooled_connection(db_params)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s AND column_name = ANY(%s)",
+            (dataset.schema, dataset.table, ['feature_hash', key] if key else ['feature_hash'])
+        )
+        columns = {row[0] for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+    return 'feature_hash' in columns and (key is None or key in columns)
+
+def apply_delta(dataset, db_params, delta_table: str, key: Optional[str] = None):
+    """
+    Apply to the dataset table the differences with its delta staging table (new rows of the file) with set-based SQL,
+    diffing the feature hashes: only the new features are INSERTed, the changed ones UPDATEd (if there is a key field)
+    and the missing ones DELETEd. The values are cast to the (narrowed) types of the dataset table, the narrowed fields
+    that do not fit the delta values are widened first (get_widened_type). The delta staging table is dropped.
+
+    If the fields of the file changed, the dataset table is replaced by the delta staging table, which has no primary key
+    nor indexes yet: the caller prepares it as a replace load.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - delta_table: Delta staging table loaded with the rows of the file (with feature hashes).
+        - key: Field that identifies the features, changed features are UPDATEd. Default: None (changed features are DELETEd and INSERTed).
+
+    Return
+    ----------
+    Dataset object and True if the dataset table was replaced by the delta staging table
+    """
+    schema = dataset.schema
+    table = dataset.table
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+
+        # Identity columns (primary key) are generated by the dataset table
+        query_columns = """SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+                           WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped AND attidentity = '' ORDER BY attnum"""
+        cur.execute(query_columns, (f'{schema}."{delta_table}"',))
+        delta_types = dict(cur.fetchall())
+        columns = list(delta_types)
+        cur.execute(query_columns, (f'{schema}."{table}"',))
+        live_types = dict(cur.fetchall())
+        live_columns = list(live_types)
+
+        # Subdivided features: the pieces of a changed feature are DELETEd and the feature INSERTed (subdivided again)
+        subdivided = PARENT_FID_COLUMN in live_columns
+        live_columns = [c for c in live_columns if c != PARENT_FID_COLUMN]
+
+        # New fields: the file can not be diffed, replace the table
+        if set(columns) != set(live_columns):
+            conn.close()
+            conn = None
+            logging.warning(f"{log_module}:The fields of the dataset: '{dataset.identifier}' changed, the table: '{schema}.{table}' is replaced.")
+            dataset = swap_staging_table(dataset, db_params, delta_table)
+            return dataset, dataset.status != 'error'
+
+        # Narrowed fields (narrow_columns) are widened if the delta values do not fit them (e.g. larger integers)
+        changed = [c for c in columns if live_types[c] != delta_types[c]]
+        if changed:
+            narrowable = [(c, delta_types[c]) for c in changed if delta_types[c] in ('bigint', 'integer', 'double precision', 'text') or delta_types[c].startswith('character varying')]
+            narrow_types = get_narrow_types(cur, schema, delta_table, narrowable) if narrowable else {}
+            widened = {c: get_widened_type(live_types[c], delta_types[c], narrow_types.get(c)) for c in changed}
+            widened = {c: widened_type for c, widened_type in widened.items() if widened_type != live_types[c]}
+            if widened:
+                cur.execute('ALTER TABLE {schema}."{table}" {changes}'.format(schema=schema, table=table, changes=", ".join(
+                    'ALTER COLUMN "{c}" TYPE {widened_type} USING {using}'.format(c=c, widened_type=widened_type, using=f'upper("{c}"::text)' if live_types[c] == 'boolean' else f'"{c}"::{widened_type}')
+                    for c, widened_type in widened.items())))
+                live_types.update(widened)
+                logging.info(f"{log_module}:Widen types of table: '{schema}.{table}' for the delta load | {', '.join(f'{c}: {t}' for c, t in widened.items())}")
+
+        match = "t.{key} = s.{key}".format(key=f'"{key}"') if key else "t.feature_hash = s.feature_hash"
+        column_list = ", ".join(f'"{c}"' for c in columns)
+
+        # Anti-joins over the feature hashes (or key) of the live table
+        cur.execute('CREATE INDEX IF NOT EXISTS "hidx_{table}" ON {schema}."{table}" ({column})'.format(schema=schema, table=table, column=f'"{key}"' if key else 'feature_hash'))
+        cur.execute('ANALYZE {schema}."{delta_table}"'.format(schema=schema, delta_table=delta_table))
+
+        pieces_match = f' AND (t."{PARENT_FID_COLUMN}" IS NULL OR t.feature_hash = s.feature_hash)' if key and subdivided else ''
+        cur.execute('DELETE FROM {schema}."{table}" t WHERE NOT EXISTS (SELECT 1 FROM {schema}."{delta_table}" s WHERE {match}{pieces_match})'.format(schema=schema, table=table, delta_table=delta_table, match=match, pieces_match=pieces_match))
+        deleted = cur.rowcount
+
+        updated = 0
+        if key:
+            assignments = ", ".join(f'"{c}" = s."{c}"::{live_types[c]}' for c in columns if c != key)
+            cur.execute('UPDATE {schema}."{table}" t SET {assignments} FROM {schema}."{delta_table}" s WHERE {match} AND t.feature_hash IS DISTINCT FROM s.feature_hash'.format(
+                schema=schema, table=table, delta_table=delta_table, assignments=assignments, match=match))
+            updated = cur.rowcount
+
+        cur.execute('INSERT INTO {schema}."{table}" ({columns}) SELECT {s_columns} FROM {schema}."{delta_table}" s WHERE NOT EXISTS (SELECT 1 FROM {schema}."{table}" t WHERE {match})'.format(
+            schema=schema, table=table, delta_table=delta_table, columns=column_list, s_columns=", ".join(f's."{c}"::{live_types[c]}' for c in columns), match=match))
+        inserted = cur.rowcount
+
+        cur.execute('DROP TABLE {schema}."{delta_table}"'.format(schema=schema, delta_table=delta_table))
+        conn.commit()
+
+        if inserted or updated or deleted:
+            cur.execute('ANALYZE {schema}."{table}"'.format(schema=schema, table=table))
+            conn.commit()
+
+        logging.info(f"{log_module}:Delta load of table: '{schema}.{table}' | inserted: {inserted}, updated: {updated}, deleted: {deleted}")
+        dataset.set_status_info(f"Delta load of table: '{schema}.{table}' | inserted: {inserted}, updated: {updated}, deleted: {deleted}")
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when apply the delta table: '{schema}.{delta_table}': {e}")
+        dataset.set_status('error')
+        dataset.set_status_info(f"Error applying delta table: '{schema}.{delta_table}' into: '{schema}.{table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset, False
+
+def get_renamed_index(index: str, old_table: str, new_table: str):
+    """
+    Returns the name of an index named after a table (gidx_<table>, pk_<table>, aidx_<table>_<field>) once the table is renamed.
+
+    Parameters
+    ----------
+        - index: Index name.
+        - old_table: Table name before the rename.
+        - new_table: Table name after the rename.
+
+    Return
+    ----------
+    New index name, None if the index is not named after the table
+    """
+    for prefix in TABLE_INDEX_PREFIXES:
+        if index == f"{prefix}{old_table}"[:63]:
+            return f"{prefix}{new_table}"[:63]
+
+    attribute_prefix = f"{ATTRIBUTE_INDEX_PREFIX}{old_table}_"[:63]
+    if index.startswith(attribute_prefix):
+        return f"{ATTRIBUTE_INDEX_PREFIX}{new_table}_{index[len(attribute_prefix):]}"[:63]
+
+    return None
+
+def swap_staging_table(dataset, db_params, staging_table: str, set_logged: Optional[bool] = True):
+    """
+    Replace the dataset table by its staging table with an atomic rename.
+
+    The live table is readable until the swap transaction, which only drops the old table and renames the staging
+    table and its geometry index.
+
+    Parameters
+    ----------
+        - dataset: Dataset object to upload into PostGIS.
+        - db_params: Database connection details.
+        - staging_table: Staging table loaded with the new rows.
+        - set_logged: Set the UNLOGGED staging table as LOGGED before the swap (crash safe).
+
+    Return
+    ----------
+    Dataset object
+    """
+    conn = None
+    try:
+        conn = get_pooled_connection(db_params)
+        cur = conn.cursor()
+
+        # Rewrite through the WAL outside the swap transaction, the live table is not locked yet (partitioned tables have no storage)
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (f'{dataset.schema}."{staging_table}"',))
+        if set_logged and cur.fetchone()[0] != 'p':
+            cur.execute('ALTER TABLE {schema}."{staging_table}" SET LOGGED'.format(schema=dataset.schema, staging_table=staging_table))
+            conn.commit()
+
+        cur.execute('DROP TABLE IF EXISTS {schema}."{table}"'.format(schema=dataset.schema, table=dataset.table))
+        cur.execute('ALTER TABLE {schema}."{staging_table}" RENAME TO "{table}"'.format(schema=dataset.schema, staging_table=staging_table, table=dataset.table))
+        # Partitions, indexes, primary key and sequences named after the staging table (gidx_, pk_, aidx_, _seq)
+        renames = [(staging_table, dataset.table)]
+        cur.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)", (f'{dataset.schema}."{dataset.table}"',))
+        for (partition,) in cur.fetchall():
+            key_hash = re.search(r'_p_([0-9a-f]{12})$', partition)
+            if key_hash:
+                new_partition = f"{dataset.table[:42]}_p_{key_hash.group(1)}"
+                cur.execute('ALTER TABLE {schema}."{partition}" RENAME TO "{new_partition}"'.format(schema=dataset.schema, partition=partition, new_partition=new_partition))
+                renames.append((partition, new_partition))
+
+        for old_table, new_table in renames:
+            cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s", (dataset.schema, new_table))
+            for (index,) in cur.fetchall():
+                new_index = get_renamed_index(index, old_table, new_table)
+                if new_index is not None:
+                    cur.execute('ALTER INDEX {schema}."{index}" RENAME TO "{new_index}"'.format(schema=dataset.schema, index=index, new_index=new_index))
+
+        cur.execute("""SELECT s.relname FROM pg_class s JOIN pg_depend d ON d.objid = s.oid
+                       WHERE s.relkind = 'S' AND d.refobjid = to_regclass(%s)""", (f'{dataset.schema}."{dataset.table}"',))
+        for (sequence,) in cur.fetchall():
+            # <table>_<field>_seq
+            if sequence.startswith(f"{staging_table}_"):
+                cur.execute('ALTER SEQUENCE {schema}."{sequence}" RENAME TO "{new_sequence}"'.format(schema=dataset.schema, sequence=sequence, new_sequence=f"{dataset.table}{sequence[len(staging_table):]}"[:63]))
+        conn.commit()
+
+        logging.info(f"{log_module}:Swap staging table: '{dataset.schema}.{staging_table}' into: '{dataset.schema}.{dataset.table}'")
+        dataset.set_status_info(f"Swap staging table: '{dataset.schema}.{staging_table}' into: '{dataset.schema}.{dataset.table}'")
+
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"{log_module}:The dataset: '{dataset.identifier}' fail when swap the staging table: '{dataset.schema}.{staging_table}': {e}")
+        dataset.set_status('error')
+        dataset.set_status_info(f"Error swapping staging table: '{dataset.schema}.{staging_table}' into: '{dataset.schema}.{dataset.table}'")
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return dataset
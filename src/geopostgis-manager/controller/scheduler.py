@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+## Coding: UTF-8
+## Author: mjanez@tragsa.es
+## Institution: -
+## Project: -
+# inbuilt libraries
+import heapq
+import logging
+import os
+import struct
+from typing import Optional
+
+
+log_module = f"[{__name__}]"
+
+# Estimated throughput of a dataset load, used to convert file sizes and feature counts into seconds
+BYTES_PER_SECOND = 20 * 1024 * 1024
+FEATURES_PER_SECOND = 25000
+
+# ESRI Shapefile index (.shx): 100 bytes header, 8 bytes per record. File length (16-bit words) at bytes 24-27, big-endian
+SHX_HEADER_SIZE = 100
+SHX_RECORD_SIZE = 8
+
+def get_sidecar_path(file_path: str, extension: str):
+    """
+    Returns the path of a sidecar file of a dataset (e.g. the .dbf of a .shp), matching the extension case.
+
+    Parameters
+    ----------
+        - file_path: Path of the dataset file.
+        - extension: Extension of the sidecar file (e.g. '.dbf').
+
+    Return
+    ----------
+    Path of the sidecar file or None if not exists
+    """
+    base = os.path.splitext(file_path)[0]
+    for path in (base + extension.lower(), base + extension.upper()):
+        if os.path.isfile(path):
+            return path
+
+    return None
+
+def get_shx_feature_count(file_path: str):
+    """
+    Returns the number of features of an ESRI Shapefile from the header of its index (.shx) without opening it.
+
+    Parameters
+    ----------
+        - file_path: Path of the ESRI Shapefile.
+
+    Return
+    ----------
+    Number of features or None if the index is not available
+    """
+    shx_path = get_sidecar_path(file_path, '.shx')
+    if shx_path is None:
+        return None
+
+    try:
+        with open(shx_path, 'rb') as f:
+            header = f.read(SHX_HEADER_SIZE)
+        file_length = struct.unpack('>i', header[24:28])[0] * 2
+        return max((file_length - SHX_HEADER_SIZE) // SHX_RECORD_SIZE, 0)
+
+    except (OSError, struct.error) as e:
+        logging.warning(f"{log_module}:Could not read the index header of: '{shx_path}': {e}")
+        return None
+
+def estimate_dataset_cost(dataset):
+    """
+    Estimate the load time (seconds) of a dataset from the size of its files and its number of features.
+
+    Parameters
+    ----------
+        - dataset: Dataset object.
+
+    Return
+    ----------
+    Estimated cost in seconds
+    """
+    file_path = dataset.file_path
+    if not file_path or not os.path.isfile(file_path):
+        return 0.0
+
+    size = os.path.getsize(file_path)
+    features = 0
+    if dataset.file_format == "shp":
+        dbf_path = get_sidecar_path(file_path, '.dbf')
+        if dbf_path is not None:
+            size += os.path.getsize(dbf_path)
+        features = get_shx_feature_count(file_path) or 0
+
+    return size / BYTES_PER_SECOND + features / FEATURES_PER_SECOND
+
+def lpt_schedule(datasets: list, workers: Optional[int] = 1):
+    """
+    Longest Processing Time first schedule of datasets across workers.
+
+    Datasets are ordered by estimated cost (descending) and each one is assigned to the least loaded worker.
+    Dispatching the ordered datasets to a pool of workers as they become idle reproduces the schedule.
+
+    Parameters
+    ----------
+        - datasets: List of Dataset objects.
+        - workers: Number of workers.
+
+    Return
+    ----------
+    List of Dataset objects ordered by cost, dict of costs by dataset identifier and predicted makespan (seconds)
+    """
+    costs = {d.identifier: estimate_dataset_cost(d) for d in datasets}
+    ordered = sorted(datasets, key=lambda d: costs[d.identifier], reverse=True)
+
+    loads = [0.0] * max(workers or 1, 1)
+    heapq.heapify(loads)
+    for dataset in ordered:
+        heapq.heappush(loads, heapq.heappop(loads) + costs[dataset.identifier])
+
+    return ordered, costs, max(loads)
+
+def log_schedule(stage: str, datasets: list, costs: dict, workers: int, predicted_makespan: float):
+    """
+    Log the schedule of a load stage.
+
+    Parameters
+    ----------
+        - stage: Name of the stage (e.g. 'db').
+        - datasets: List of Dataset objects in dispatch order.
+        - costs: dict of costs by dataset identifier.
+        - workers: Number of workers.
+        - predicted_makespan: Predicted makespan (seconds).
+    """
+    total = sum(costs.values())
+    logging.info(f"{log_module}:Schedule '{stage}': {len(datasets)} datasets | Workers: {workers} | Total estimated cost: {total:.1f}s | Predicted makespan: {predicted_makespan:.1f}s")
+    for dataset in datasets[:5]:
+        logging.info(f"{log_module}:Schedule '{stage}': '{dataset.identifier}' estimated cost: {costs[dataset.identifier]:.1f}s")
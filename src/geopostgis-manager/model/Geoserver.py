@@ -12,6 +12,7 @@ from config.config import prepare_zip_file
 
 # third-party libraries
 import requests
+from requests.adapters import HTTPAdapter
 from xmltodict import parse, unparse
 import socks
 
@@ -45,6 +46,200 @@ class FileReader:
     def read_callback(self, size):
         return self.fp.read(size)
 
+def get_featurestore_xml(
+    store_name: str,
+    description: Optional[str] = None,
+    expose_primary_keys: str = "false",
+    host: str = "localhost",
+    port: int = 5432,
+    pg_user: str = "postgres",
+    pg_password: str = "admin",
+    schema: str = "public",
+    db: str = "postgres",
+    evictor_run_periodicity: Optional[int] = 300,
+    max_open_prepared_statements: Optional[int] = 50,
+    encode_functions: Optional[str] = "false",
+    primary_key_metadata_table: Optional[str] = None,
+    batch_insert_size: Optional[int] = 1,
+    preparedstatements: Optional[str] = "false",
+    estimated_extends: Optional[str] = "true",
+    fetch_size: Optional[int] = 1000,
+    validate_connections: Optional[str] = "true",
+    support_on_the_fly_geometry_simplification: Optional[str] = "true",
+    connection_timeout: Optional[int] = 20,
+    create_database: Optional[str] = "false",
+    min_connections: Optional[int] = 1,
+    max_connections: Optional[int] = 10,
+    evictor_tests_per_run: Optional[int] = 3,
+    test_while_idle: Optional[str] = "true",
+    max_connection_idle_time: Optional[int] = 300,
+    loose_bbox: Optional[str] = "true",
+):
+    """
+    Returns the XML of a PostGIS datastore (see Geoserver.create_featurestore).
+    """
+    return """
+        <dataStore>
+        <name>{}</name>
+        <description>{}</description>
+        <connectionParameters>
+        <entry key="Expose primary keys">{}</entry>
+        <entry key="host">{}</entry>
+        <entry key="port">{}</entry>
+        <entry key="user">{}</entry>
+        <entry key="passwd">{}</entry>
+        <entry key="dbtype">postgis</entry>
+        <entry key="schema">{}</entry>
+        <entry key="database">{}</entry>
+        <entry key="Evictor run periodicity">{}</entry>
+        <entry key="Max open prepared statements">{}</entry>
+        <entry key="encode functions">{}</entry>
+        <entry key="Primary key metadata table">{}</entry>
+        <entry key="Batch insert size">{}</entry>
+        <entry key="preparedStatements">{}</entry>
+        <entry key="Estimated extends">{}</entry>
+        <entry key="fetch size">{}</entry>
+        <entry key="validate connections">{}</entry>
+        <entry key="Support on the fly geometry simplification">{}</entry>
+        <entry key="Connection timeout">{}</entry>
+        <entry key="create database">{}</entry>
+        <entry key="min connections">{}</entry>
+        <entry key="max connections">{}</entry>
+        <entry key="Evictor tests per run">{}</entry>
+        <entry key="Test while idle">{}</entry>
+        <entry key="Max connection idle time">{}</entry>
+        <entry key="Loose bbox">{}</entry>
+        </connectionParameters>
+        </dataStore>
+        """.format(
+        store_name,
+        description,
+        expose_primary_keys,
+        host,
+        port,
+        pg_user,
+        pg_password,
+        schema,
+        db,
+        evictor_run_periodicity,
+        max_open_prepared_statements,
+        encode_functions,
+        primary_key_metadata_table,
+        batch_insert_size,
+        preparedstatements,
+        estimated_extends,
+        fetch_size,
+        validate_connections,
+        support_on_the_fly_geometry_simplification,
+        connection_timeout,
+        create_database,
+        min_connections,
+        max_connections,
+        evictor_tests_per_run,
+        test_while_idle,
+        max_connection_idle_time,
+        loose_bbox,
+    )
+
+def get_featuretype_xml(
+    pg_table: str,
+    title: str,
+    abstract: str,
+    srid: Optional[int] = 4326,
+    declared_srid: Optional[int] = 4326,
+    recalculate: Optional[str] = "nativebbox,latlonbbox",
+    proj_policy: Optional[str] = "REPROJECT_TO_DECLARED",
+    native_bbox: Optional[tuple] = None,
+    latlon_bbox: Optional[tuple] = None,
+    attributes: Optional[list] = None,
+):
+    """
+    Returns the XML of a FeatureType of a PostGIS table (see Geoserver.publish_featurestore).
+    """
+    layer_xml = "<featureType><name>{}</name><title>{}</title><abstract>{}</abstract><nativeCRS>EPSG:{}</nativeCRS><srs>EPSG:{}</srs>".format(
+        pg_table, title, abstract, srid, declared_srid
+    )
+    if native_bbox is not None and latlon_bbox is not None:
+        layer_xml += "<nativeBoundingBox><minx>{}</minx><miny>{}</miny><maxx>{}</maxx><maxy>{}</maxy><crs>EPSG:{}</crs></nativeBoundingBox>".format(*native_bbox, srid)
+        layer_xml += "<latLonBoundingBox><minx>{}</minx><miny>{}</miny><maxx>{}</maxx><maxy>{}</maxy><crs>EPSG:4326</crs></latLonBoundingBox>".format(*latlon_bbox)
+        if attributes:
+            layer_xml += "<attributes>{}</attributes>".format("".join(
+                "<attribute><name>{}</name><minOccurs>0</minOccurs><maxOccurs>1</maxOccurs><nillable>{}</nillable><binding>{}</binding></attribute>".format(
+                    attribute["name"], str(attribute.get("nillable", True)).lower(), attribute["binding"]
+                ) for attribute in attributes
+            ))
+    else:
+        layer_xml += "<recalculate>{}</recalculate>".format(recalculate)
+    if srid != declared_srid:
+        layer_xml += "<projectionPolicy>{}</projectionPolicy>".format(proj_policy)
+
+    return layer_xml + "</featureType>"
+
+# SLD symbolizers of the scale-dependent styles by geometry family
+SLD_SYMBOLIZERS = {
+    'POINT': '<PointSymbolizer><Graphic><Mark><WellKnownName>circle</WellKnownName><Fill><CssParameter name="fill">#AAAAAA</CssParameter></Fill>'
+             '<Stroke><CssParameter name="stroke">#000000</CssParameter></Stroke></Mark><Size>6</Size></Graphic></PointSymbolizer>',
+    'LINESTRING': '<LineSymbolizer><Stroke><CssParameter name="stroke">#0000FF</CssParameter><CssParameter name="stroke-width">1</CssParameter></Stroke></LineSymbolizer>',
+    'POLYGON': '<PolygonSymbolizer><Fill><CssParameter name="fill">#AAAAAA</CssParameter></Fill>'
+               '<Stroke><CssParameter name="stroke">#000000</CssParameter><CssParameter name="stroke-width">0.5</CssParameter></Stroke></PolygonSymbolizer>',
+}
+
+def get_scale_style_sld(
+    name: str,
+    layer_name: str,
+    geometry_type: Optional[str] = None,
+    min_scale: Optional[float] = None,
+    max_scale: Optional[float] = None,
+):
+    """
+    Returns the SLD (1.0.0) of a style that renders a layer only in a scale range (MinScaleDenominator inclusive,
+    MaxScaleDenominator exclusive).
+
+    Parameters
+    ----------
+    name : str
+    layer_name : str
+    geometry_type : str, optional
+        Geometry type of the layer (e.g. 'MULTIPOLYGON'). Default: polygon symbolizer.
+    min_scale : float, optional
+    max_scale : float, optional
+    """
+    family = (geometry_type or '').upper().replace('MULTI', '').rstrip('ZM')
+    rule = ""
+    if min_scale is not None:
+        rule += "<MinScaleDenominator>{}</MinScaleDenominator>".format(min_scale)
+    if max_scale is not None:
+        rule += "<MaxScaleDenominator>{}</MaxScaleDenominator>".format(max_scale)
+    rule += SLD_SYMBOLIZERS.get(family, SLD_SYMBOLIZERS['POLYGON'])
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<StyledLayerDescriptor version="1.0.0" xmlns="http://www.opengis.net/sld" xmlns:ogc="http://www.opengis.net/ogc" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xsi:schemaLocation="http://www.opengis.net/sld http://schemas.opengis.net/sld/1.0.0/StyledLayerDescriptor.xsd">'
+        "<NamedLayer><Name>{}</Name><UserStyle><Name>{}</Name><Title>{}</Title><FeatureTypeStyle><Rule>{}</Rule></FeatureTypeStyle></UserStyle></NamedLayer>"
+        "</StyledLayerDescriptor>"
+    ).format(layer_name, name, name, rule)
+
+def get_layergroup_xml(
+    name: str,
+    layers: List[str],
+    styles: List[str],
+    workspace: str,
+    title: Optional[str] = None,
+    abstract: Optional[str] = None,
+):
+    """
+    Returns the XML of a single (rendered as one layer) layer group of a workspace, each layer with its own style
+    (see Geoserver.publish_layergroup).
+    """
+    publishables = "".join('<published type="layer"><name>{}:{}</name></published>'.format(workspace, layer) for layer in layers)
+    group_styles = "".join("<style><name>{}:{}</name></style>".format(workspace, style) for style in styles)
+
+    return "<layerGroup><name>{}</name><mode>SINGLE</mode><title>{}</title><abstractTxt>{}</abstractTxt><workspace><name>{}</name></workspace><publishables>{}</publishables><styles>{}</styles></layerGroup>".format(
+        name, title or name, abstract or name, workspace, publishables, group_styles
+    )
+
 class Geoserver:
     """
     Geoserver object.
@@ -53,6 +248,8 @@ class Geoserver:
     service_url: str. The URL for the GeoServer instance.
     username: str. Login name for session.
     password: str. Password for session.
+    proxies: dict. HTTP/HTTPS proxies of the session.
+    pool_size: int. Maximum number of keep-alive connections of the session to the GeoServer host.
     """
 
     def __init__(
@@ -63,24 +260,57 @@ class Geoserver:
         proxies = {
         'http': None,
         'https': None
-        }  # default proxies
+        },  # default proxies
+        pool_size: int = 10,  # keep-alive connections to the GeoServer host
     ):
         self.service_url = service_url
         self.username = username
         self.password = password
         self.proxies = proxies
+        self.pool_size = pool_size
+        self.catalog = None  # GeoserverCatalog updated on each create/delete (optional)
+
+        # Persistent session: auth and proxies set once, connections kept alive and reused by all the requests
+        self.session = requests.Session()
+        self.session.auth = (self.username, self.password)
+        self.session.proxies.update({k: v for k, v in (self.proxies or {}).items() if v})
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
         # private request method to reduce repetition of putting auth(username,password) in all requests call. DRY principle
 
     def _requests(self, method: str, url: str, **kwargs) -> requests.Response:
-        if method == "post":
-            return requests.post(url, auth=(self.username, self.password), proxies=self.proxies, **kwargs)
-        elif method == "get":
-            return requests.get(url, auth=(self.username, self.password), proxies=self.proxies, **kwargs)
-        elif method == "put":
-            return requests.put(url, auth=(self.username, self.password), proxies=self.proxies, **kwargs)
-        elif method == "delete":
-            return requests.delete(url, auth=(self.username, self.password), proxies=self.proxies, **kwargs)
+        return self.session.request(method.upper(), url, **kwargs)
+
+    def _update_catalog(self, action: str, kind: str, name: str, workspace: Optional[str] = None):
+        if self.catalog is not None:
+            getattr(self.catalog, action)(kind, name, workspace)
+
+    def get_connection_stats(self):
+        """
+        Returns the connection reuse counters of the session (all the connection pools, including proxies).
+
+        Returns
+        -------
+        dict: {'requests': requests sent, 'connections': connections opened, 'reused': requests sent over a kept-alive connection}
+        """
+        requests_sent = connections = 0
+        for adapter in {id(a): a for a in self.session.adapters.values()}.values():
+            for manager in [adapter.poolmanager] + list(adapter.proxy_manager.values()):
+                for key in manager.pools.keys():
+                    pool = manager.pools.get(key)
+                    if pool is not None:
+                        requests_sent += pool.num_requests
+                        connections += pool.num_connections
+
+        return dict(requests=requests_sent, connections=connections, reused=max(requests_sent - connections, 0))
+
+    def close(self):
+        """
+        Close the connections of the session.
+        """
+        self.session.close()
 
 
     #--Server--#
@@ -105,7 +335,7 @@ class Geoserver:
             """
             try:
                 url = "{}/rest/about/status.json".format(self.service_url)
-                r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+                r = self._requests("get", url)
                 if r.status_code == 200:
                     return r.json()
                 else:
@@ -120,7 +350,7 @@ class Geoserver:
         """
         try:
             url = "{}/rest/about/system-status.json".format(self.service_url)
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -136,7 +366,7 @@ class Geoserver:
         """
         try:
             url = "{}/rest/about/manifest.json".format(self.service_url)
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -163,7 +393,7 @@ class Geoserver:
                 url += "service/{}/users/".format(service)
 
             headers = {"accept": "application/xml"}
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies, headers=headers)
+            r = self._requests("get", url, headers=headers)
 
             if r.status_code == 200:
                 return parse(r.content)
@@ -196,8 +426,8 @@ class Geoserver:
                 username, password, enabled
             )
             headers = {"content-type": "text/xml; charset=utf-8", "accept": "application/json"}
-            r = requests.post(
-                url, data, auth=(self.username, self.password), proxies=self.proxies, headers=headers
+            r = self._requests(
+                "post", url, data=data, headers=headers
             )
 
             if r.status_code == 201:
@@ -242,8 +472,8 @@ class Geoserver:
             data = unparse({"user": modifications})
             print(url, data)
             headers = {"content-type": "text/xml; charset=utf-8", "accept": "application/json"}
-            r = requests.post(
-                url, data, auth=(self.username, self.password), proxies=self.proxies, headers=headers
+            r = self._requests(
+                "post", url, data=data, headers=headers
             )
 
             if r.status_code == 200:
@@ -273,8 +503,8 @@ class Geoserver:
                 url += "service/{}/user/{}".format(service, username)
 
             headers = {"accept": "application/json"}
-            r = requests.delete(
-                url, auth=(self.username, self.password), proxies=self.proxies, headers=headers
+            r = self._requests(
+                "delete", url, headers=headers
             )
 
             if r.status_code == 200:
@@ -302,7 +532,7 @@ class Geoserver:
             else:
                 url += "service/{}/groups/".format(service)
 
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
 
             if r.status_code == 200:
                 return parse(r.content)
@@ -329,7 +559,7 @@ class Geoserver:
                 url += "group/{}".format(group)
             else:
                 url += "service/{}/group/{}".format(service, group)
-            r = requests.post(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("post", url)
 
             if r.status_code == 201:
                 return "Group created successfully"
@@ -357,7 +587,7 @@ class Geoserver:
             else:
                 url += "service/{}/group/{}".format(service, group)
 
-            r = requests.delete(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("delete", url)
 
             if r.status_code == 200:
                 return "Group deleted successfully"
@@ -374,7 +604,7 @@ class Geoserver:
         """
         try:
             url = "{}/rest/workspaces/default".format(self.service_url)
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -391,7 +621,7 @@ class Geoserver:
         try:
             payload = {"recurse": "true"}
             url = "{}/rest/workspaces/{}.json".format(self.service_url, workspace)
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies, params=payload)
+            r = self._requests("get", url, params=payload)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -406,7 +636,7 @@ class Geoserver:
         """
         try:
             url = "{}/rest/workspaces".format(self.service_url)
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -453,6 +683,7 @@ class Geoserver:
             r = self._requests("post", url, data=data.encode('utf-8'), headers=headers)
 
             if r.status_code == 201:
+                self._update_catalog("add", "workspace", workspace)
                 return "{} Workspace {} created!".format(r.status_code, workspace)
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -471,11 +702,12 @@ class Geoserver:
         try:
             payload = {"recurse": "true"}
             url = "{}/rest/workspaces/{}".format(self.service_url, workspace)
-            r = requests.delete(
-                url, auth=(self.username, self.password), proxies=self.proxies, params=payload
+            r = self._requests(
+                "delete", url, params=payload
             )
 
             if r.status_code == 200:
+                self._update_catalog("remove", "workspace", workspace)
                 return "Status code: {}, delete workspace".format(r.status_code)
 
             else:
@@ -524,7 +756,7 @@ class Geoserver:
             url = "{}/rest/workspaces/{}/datastores.json".format(
                 self.service_url, workspace
             )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -569,7 +801,7 @@ class Geoserver:
             url = "{}/rest/workspaces/{}/coveragestores".format(
                 self.service_url, workspace
             )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -667,6 +899,8 @@ class Geoserver:
                     r = self._requests(method="put", url=url, data=f.encode('utf-8'), headers=headers)
 
                     if r.status_code == 201:
+                        self._update_catalog("add", "coveragestore", layer_name, workspace)
+                        self._update_catalog("add", "layer", layer_name, workspace)
                         return r.json()
                     else:
                         raise GeoserverException(r.status_code, r.content)
@@ -700,11 +934,12 @@ class Geoserver:
                     self.service_url, coveragestore_name
                 )
 
-            r = requests.delete(
-                url, auth=(self.username, self.password), proxies=self.proxies, params=payload
+            r = self._requests(
+                "delete", url, params=payload
             )
 
             if r.status_code == 200:
+                self._update_catalog("remove", "coveragestore", coveragestore_name, workspace)
                 return "Coverage store deleted successfully"
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -743,7 +978,7 @@ class Geoserver:
 
             if workspace is not None:
                 url = "{}/rest/workspaces/{}/layers".format(self.service_url, workspace)
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -771,6 +1006,7 @@ class Geoserver:
 
             r = self._requests(method="delete", url=url, params=payload)
             if r.status_code == 200:
+                self._update_catalog("remove", "layer", layer_name, workspace)
                 return "Status code: {}, delete layer".format(r.status_code)
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -794,7 +1030,7 @@ class Geoserver:
                 url = "{}/rest/workspaces/{}/layergroups".format(
                     self.service_url, workspace
                 )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -822,6 +1058,54 @@ class Geoserver:
         except Exception as e:
             raise Exception(e)
 
+    def publish_layergroup(
+        self,
+        name: str,
+        layers: List[str],
+        styles: List[str],
+        workspace: Optional[str] = None,
+        title: Optional[str] = None,
+        abstract: Optional[str] = None,
+        overwrite: bool = False,
+    ):
+        """
+        Create (or update) a single layer group of a workspace with a style by layer.
+
+        Parameters
+        ----------
+        name : str
+        layers : list
+            Layer names of the workspace, in drawing order.
+        styles : list
+            Style names of the workspace, one by layer.
+        workspace : str, optional default value = "default".
+        title : str, optional
+        abstract : str, optional
+        overwrite : bool
+        """
+        try:
+            if workspace is None:
+                workspace = "default"
+
+            data = get_layergroup_xml(name, layers, styles, workspace, title, abstract)
+            headers = {"content-type": "text/xml; charset=utf-8"}
+
+            if overwrite:
+                url = "{}/rest/workspaces/{}/layergroups/{}".format(self.service_url, workspace, name)
+                r = self._requests("put", url, data=data.encode('utf-8'), headers=headers)
+            else:
+                url = "{}/rest/workspaces/{}/layergroups".format(self.service_url, workspace)
+                r = self._requests("post", url, data=data.encode('utf-8'), headers=headers)
+
+            if r.status_code in [200, 201]:
+                self._update_catalog("add", "layergroup", name, workspace)
+                return r.status_code
+            else:
+                raise GeoserverException(r.status_code, r.content)
+
+        except Exception as e:
+            raise Exception(e)
+
     def create_layergroup(
         self,
         name: str = "geopostgis-manager-layergroup",
@@ -1207,67 +1491,34 @@ class Geoserver:
 
             headers = {"content-type": "text/xml; charset=utf-8"}
 
-            database_connection = """
-                    <dataStore>
-                    <name>{}</name>
-                    <description>{}</description>
-                    <connectionParameters>
-                    <entry key="Expose primary keys">{}</entry>
-                    <entry key="host">{}</entry>
-                    <entry key="port">{}</entry>
-                    <entry key="user">{}</entry>
-                    <entry key="passwd">{}</entry>
-                    <entry key="dbtype">postgis</entry>
-                    <entry key="schema">{}</entry>
-                    <entry key="database">{}</entry>
-                    <entry key="Evictor run periodicity">{}</entry>
-                    <entry key="Max open prepared statements">{}</entry>
-                    <entry key="encode functions">{}</entry>
-                    <entry key="Primary key metadata table">{}</entry>
-                    <entry key="Batch insert size">{}</entry>
-                    <entry key="preparedStatements">{}</entry>
-                    <entry key="Estimated extends">{}</entry>
-                    <entry key="fetch size">{}</entry>
-                    <entry key="validate connections">{}</entry>
-                    <entry key="Support on the fly geometry simplification">{}</entry>
-                    <entry key="Connection timeout">{}</entry>
-                    <entry key="create database">{}</entry>
-                    <entry key="min connections">{}</entry>
-                    <entry key="max connections">{}</entry>
-                    <entry key="Evictor tests per run">{}</entry>
-                    <entry key="Test while idle">{}</entry>
-                    <entry key="Max connection idle time">{}</entry>
-                    <entry key="Loose bbox">{}</entry>
-                    </connectionParameters>
-                    </dataStore>
-                    """.format(
-                store_name,
-                description,
-                expose_primary_keys,
-                host,
-                port,
-                pg_user,
-                pg_password,
-                schema,
-                db,
-                evictor_run_periodicity,
-                max_open_prepared_statements,
-                encode_functions,
-                primary_key_metadata_table,
-                batch_insert_size,
-                preparedstatements,
-                estimated_extends,
-                fetch_size,
-                validate_connections,
-                support_on_the_fly_geometry_simplification,
-                connection_timeout,
-                create_database,
-                min_connections,
-                max_connections,
-                evictor_tests_per_run,
-                test_while_idle,
-                max_connection_idle_time,
-                loose_bbox,
+            database_connection = get_featurestore_xml(
+                store_name=store_name,
+                description=description,
+                expose_primary_keys=expose_primary_keys,
+                host=host,
+                port=port,
+                pg_user=pg_user,
+                pg_password=pg_password,
+                schema=schema,
+                db=db,
+                evictor_run_periodicity=evictor_run_periodicity,
+                max_open_prepared_statements=max_open_prepared_statements,
+                encode_functions=encode_functions,
+                primary_key_metadata_table=primary_key_metadata_table,
+                batch_insert_size=batch_insert_size,
+                preparedstatements=preparedstatements,
+                estimated_extends=estimated_extends,
+                fetch_size=fetch_size,
+                validate_connections=validate_connections,
+                support_on_the_fly_geometry_simplification=support_on_the_fly_geometry_simplification,
+                connection_timeout=connection_timeout,
+                create_database=create_database,
+                min_connections=min_connections,
+                max_connections=max_connections,
+                evictor_tests_per_run=evictor_tests_per_run,
+                test_while_idle=test_while_idle,
+                max_connection_idle_time=max_connection_idle_time,
+                loose_bbox=loose_bbox,
             )
 
             if overwrite:
@@ -1290,6 +1541,7 @@ class Geoserver:
                 )
 
             if r.status_code in [200, 201]:
+                self._update_catalog("add", "datastore", store_name, workspace)
                 return "Featurestore created/updated successfully"
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -1352,11 +1604,12 @@ class Geoserver:
                 url = "{}/rest/workspaces/{}/datastores".format(
                     self.service_url, workspace
                 )
-                r = requests.post(
-                    url, data, auth=(self.username, self.password), proxies=self.proxies, headers=headers
+                r = self._requests(
+                    "post", url, data=data, headers=headers
                 )
 
             if r.status_code in [200, 201]:
+                self._update_catalog("add", "datastore", name, workspace)
                 return "Data store created/updated successfully"
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -1364,6 +1617,69 @@ class Geoserver:
         except Exception as e:
             raise Exception(e)
 
+    def create_pregeneralized_datastore(
+        self,
+        store_name: str,
+        config_url: str,
+        workspace: Optional[str] = None,
+        overwrite: bool = False,
+        description: Optional[str] = None,
+    ):
+        """
+        Create a pre-generalized datastore (Geoserver pre-generalized features extension).
+
+        Parameters
+        ----------
+        store_name : str
+        config_url : str
+            URL of the generalization info XML (e.g. file:/data/geninfo.xml), readable by Geoserver.
+        workspace : str, optional default value = "default".
+        overwrite : bool
+        description : str, optional
+
+        Notes
+        -----
+        The datastores of the generalization info are found by its name ('workspace:datastore').
+        After creating the datastore, you need to publish it by using publish_featurestore function.
+        """
+        try:
+            if workspace is None:
+                workspace = "default"
+
+            data = """
+                    <dataStore>
+                    <name>{}</name>
+                    <description>{}</description>
+                    <type>Generalizing data store</type>
+                    <connectionParameters>
+                    <entry key="RepositoryClassName">org.geoserver.data.gen.DSFinderRepository</entry>
+                    <entry key="GeneralizationInfosProviderClassName">org.geotools.data.gen.info.GeneralizationInfosProviderImpl</entry>
+                    <entry key="GeneralizationInfosProviderParam">{}</entry>
+                    </connectionParameters>
+                    </dataStore>
+                    """.format(store_name, description, config_url)
+            headers = {"content-type": "text/xml; charset=utf-8"}
+
+            if overwrite:
+                url = "{}/rest/workspaces/{}/datastores/{}".format(
+                    self.service_url, workspace, store_name
+                )
+                r = self._requests("put", url, data=data.encode('utf-8'), headers=headers)
+            else:
+                url = "{}/rest/workspaces/{}/datastores".format(
+                    self.service_url, workspace
+                )
+                r = self._requests("post", url, data=data.encode('utf-8'), headers=headers)
+
+            if r.status_code in [200, 201]:
+                self._update_catalog("add", "datastore", store_name, workspace)
+                return "Pre-generalized datastore created/updated successfully"
+            else:
+                raise GeoserverException(r.status_code, r.content)
+
+        except Exception as e:
+            raise Exception(e)
+
     def create_shp_datastore(
         self,
         path: str,
@@ -1414,13 +1730,14 @@ class Geoserver:
             )
 
             with open(path, "rb") as f:
-                r = requests.put(
+                r = self._requests(
+                    "put",
                     url,
                     data=f.read(),
-                    auth=(self.username, self.password), proxies=self.proxies,
                     headers=headers,
                 )
             if r.status_code in [200, 201]:
+                self._update_catalog("add", "datastore", store_name, workspace)
                 return "The shapefile datastore created successfully!"
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -1439,7 +1756,10 @@ class Geoserver:
         srid: Optional[int] = 4326,
         declared_srid: Optional[int] = 4326,
         recalculate: Optional[str] = "nativebbox,latlonbbox",
-        proj_policy: Optional[str] = "REPROJECT_TO_DECLARED"
+        proj_policy: Optional[str] = "REPROJECT_TO_DECLARED",
+        native_bbox: Optional[tuple] = None,
+        latlon_bbox: Optional[tuple] = None,
+        attributes: Optional[list] = None,
     ):
         """
 
@@ -1452,6 +1772,12 @@ class Geoserver:
         abstract: str, optional
         srid: int, optional
         declared_srid: int, optional
+        native_bbox: tuple, optional
+            (minx, miny, maxx, maxy) in the native CRS (srid).
+        latlon_bbox: tuple, optional
+            (minx, miny, maxx, maxy) in EPSG:4326.
+        attributes: list, optional
+            Attributes of the table: dict(name, binding, nillable).
 
         Returns
         -------
@@ -1463,6 +1789,9 @@ class Geoserver:
 
         The request, by default, recalculate the bounding boxes (nativebbox,latlonbbox) and specifying the Projection Policy as "REPROJECT_TO_DECLARED"
 
+        If the bounding boxes are provided (native_bbox and latlon_bbox) they are sent in the request and not recalculated,
+        so Geoserver does not scan the table. The attributes (if provided) are sent too, so the table is not introspected.
+
         Geoserver FeatureTypes: https://docs.geoserver.org/stable/en/user/rest/api/featuretypes.html
         recalculate:
             None: Do not calculate any fields, regardless of the projection, projection policy, etc. This might be useful to avoid slow recalculation when operating against large datasets.
@@ -1481,18 +1810,8 @@ class Geoserver:
                 title = pg_table
             if abstract is None:
                 abstract = pg_table
-            if srid == declared_srid:
-                layer_xml = (
-                "<featureType><name>{}</name><title>{}</title><abstract>{}</abstract><nativeCRS>EPSG:{}</nativeCRS><srs>EPSG:{}</srs><recalculate>{}</recalculate></featureType>".format(
-                    pg_table, title, abstract, srid, declared_srid, recalculate
-                    )
-                )
-            else:
-                layer_xml = (
-                "<featureType><name>{}</name><title>{}</title><abstract>{}</abstract><nativeCRS>EPSG:{}</nativeCRS><srs>EPSG:{}</srs><recalculate>{}</recalculate><projectionPolicy>{}</projectionPolicy></featureType>".format(
-                    pg_table, title, abstract, srid, declared_srid, recalculate, proj_policy
-                    )
-                )
+
+            layer_xml = get_featuretype_xml(pg_table, title, abstract, srid, declared_srid, recalculate, proj_policy, native_bbox, latlon_bbox, attributes)
 
             url = "{}/rest/workspaces/{}/datastores/{}/featuretypes/".format(
                 self.service_url, workspace, store_name
@@ -1500,13 +1819,14 @@ class Geoserver:
 
             headers = {"content-type": "text/xml; charset=utf-8"}
 
-            r = requests.post(
+            r = self._requests(
+                "post",
                 url,
                 data=layer_xml.encode('utf-8'),
-                auth=(self.username, self.password), proxies=self.proxies,
                 headers=headers,
             )
             if r.status_code == 201:
+                self._update_catalog("add", "layer", pg_table, workspace)
                 return r.status_code
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -1554,10 +1874,10 @@ class Geoserver:
             )
             headers = {"content-type": "text/xml; charset=utf-8"}
 
-            r = requests.put(
+            r = self._requests(
+                "put",
                 url,
                 data=layer_xml.encode('utf-8'),
-                auth=(self.username, self.password), proxies=self.proxies,
                 headers=headers,
             )
             if r.status_code == 200:
@@ -1626,14 +1946,15 @@ class Geoserver:
 
             headers = {"content-type": "text/xml; charset=utf-8"}
 
-            r = requests.post(
+            r = self._requests(
+                "post",
                 url,
                 data=layer_xml.encode('utf-8'),
-                auth=(self.username, self.password), proxies=self.proxies,
                 headers=headers,
             )
 
             if r.status_code == 201:
+                self._update_catalog("add", "layer", name, workspace)
                 return r.status_code
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -1654,7 +1975,7 @@ class Geoserver:
             url = "{}/rest/workspaces/{}/datastores/{}/featuretypes.json".format(
                 self.service_url, workspace, store_name
             )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 r_dict = r.json()
                 features = [i["name"] for i in r_dict["featureTypes"]["featureType"]]
@@ -1681,7 +2002,7 @@ class Geoserver:
             url = "{}/rest/workspaces/{}/datastores/{}/featuretypes/{}.json".format(
                 self.service_url, workspace, store_name, feature_type_name
             )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 r_dict = r.json()
                 attribute = [
@@ -1707,7 +2028,7 @@ class Geoserver:
             url = "{}/rest/workspaces/{}/datastores/{}".format(
                 self.service_url, workspace, store_name
             )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 r_dict = r.json()
                 return r_dict["dataStore"]
@@ -1735,11 +2056,12 @@ class Geoserver:
             )
             if workspace is None:
                 url = "{}/datastores/{}".format(self.service_url, featurestore_name)
-            r = requests.delete(
-                url, auth=(self.username, self.password), proxies=self.proxies, params=payload
+            r = self._requests(
+                "delete", url, params=payload
             )
 
             if r.status_code == 200:
+                self._update_catalog("remove", "datastore", featurestore_name, workspace)
                 return "Status code: {}, delete featurestore".format(r.status_code)
             else:
                 raise GeoserverException(r.status_code, r.content)
@@ -1780,7 +2102,7 @@ class Geoserver:
                 url = "{}/rest/workspaces/{}/styles.json".format(
                     self.service_url, workspace
                 )
-            r = requests.get(url, auth=(self.username, self.password), proxies=self.proxies)
+            r = self._requests("get", url)
             if r.status_code == 200:
                 return r.json()
             else:
@@ -1839,13 +2161,14 @@ class Geoserver:
             r = self._requests(method="post", url=url, data=style_xml, headers=headers)
             if r.status_code == 201:
                 with open(path, "rb") as f:
-                    r_sld = requests.put(
+                    r_sld = self._requests(
+                        "put",
                         url + "/" + name,
                         data=f.read(),
-                        auth=(self.username, self.password), proxies=self.proxies,
                         headers=header_sld,
                     )
                 if r_sld.status_code == 200:
+                    self._update_catalog("add", "style", name, workspace)
                     return r_sld.status_code
                 else:
                     raise GeoserverException(r_sld.status_code, r_sld.content)
@@ -1856,6 +2179,43 @@ class Geoserver:
         except Exception as e:
             raise Exception(e)
 
+    def create_sld_style(
+        self,
+        name: str,
+        sld: str,
+        workspace: Optional[str] = None,
+        overwrite: bool = False,
+    ):
+        """
+        Create (or update) a style from a SLD (1.0.0) document.
+
+        Parameters
+        ----------
+        name : str
+        sld : str
+        workspace : str, optional
+        overwrite : bool
+        """
+        try:
+            url = "{}/rest/workspaces/{}/styles".format(self.service_url, workspace)
+            if workspace is None:
+                url = "{}/rest/styles".format(self.service_url)
+
+            headers = {"content-type": "application/vnd.ogc.sld+xml"}
+            if overwrite:
+                r = self._requests("put", url + "/" + name, data=sld.encode('utf-8'), headers=headers)
+            else:
+                r = self._requests("post", url, params={"name": name}, data=sld.encode('utf-8'), headers=headers)
+
+            if r.status_code in [200, 201]:
+                self._update_catalog("add", "style", name, workspace)
+                return r.status_code
+            else:
+                raise GeoserverException(r.status_code, r.content)
+
+        except Exception as e:
+            raise Exception(e)
+
     def publish_style(
         self,
         layer_name: str,
@@ -1919,6 +2279,7 @@ class Geoserver:
             r = self._requests("delete", url, params=payload)
 
             if r.status_code == 200:
+                self._update_catalog("remove", "style", style_name, workspace)
                 return "Status code: {}, delete style".format(r.status_code)
             else:
                 raise GeoserverException(r.status_code, r.content)
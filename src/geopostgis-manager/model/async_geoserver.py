@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+## Coding: UTF-8
+## Author: mjanez@tragsa.es
+## Institution: -
+## Project: -
+# inbuilt libraries
+import asyncio
+import json
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+
+# custom functions
+from model.Geoserver import GeoserverException, get_featurestore_xml, get_featuretype_xml, get_layergroup_xml
+
+# third-party libraries
+import aiohttp
+
+
+def read_file(path: str):
+    with open(path, "rb") as f:
+        return f.read()
+
+class GeoserverResponse:
+    """
+    Response of an AsyncGeoserver request (body read before the connection is released).
+
+    Attributes:
+    status_code: int. HTTP status code.
+    content: bytes. Response body.
+    headers: dict. Response headers.
+    """
+    def __init__(self, status_code: int, content: bytes, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.content)
+
+class AsyncGeoserver:
+    """
+    Asynchronous (asyncio) Geoserver object, with the methods of Geoserver used by the loaders.
+
+    Attributes:
+    service_url: str. The URL for the GeoServer instance.
+    username: str. Login name for session.
+    password: str. Password for session.
+    proxies: dict. HTTP/HTTPS proxies of the session (SOCKS proxies are not supported).
+    max_requests: int. Maximum number of requests in flight to each host.
+
+    Notes:
+    The session is opened in the running event loop: async with AsyncGeoserver(...) as geo.
+    """
+    def __init__(
+        self,
+        service_url: str = "http://localhost:8080/geoserver",  # default deployment url during installation
+        username: str = "admin",  # default username during geoserver installation
+        password: str = "geoserver",  # default password during geoserver installation
+        proxies = None,
+        max_requests: int = 10,  # requests in flight to each host
+    ):
+        self.service_url = service_url
+        self.username = username
+        self.password = password
+        self.proxies = proxies or {}
+        self.max_requests = max(max_requests or 1, 1)
+        self.catalog = None  # GeoserverCatalog updated on each create (optional)
+        self.session = None
+        self._semaphores = {}
+        self.requests: int = 0
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """
+        Open the session: keep-alive connections limited by host, authentication set once.
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.max_requests)
+            self.session = aiohttp.ClientSession(connector=connector, auth=aiohttp.BasicAuth(self.username, self.password), trust_env=True)
+
+    async def close(self):
+        """
+        Close the session and its connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_semaphore(self, url: str):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.max_requests)
+
+        return semaphore
+
+    async def _requests(self, method: str, url: str, **kwargs) -> GeoserverResponse:
+        proxy = self.proxies.get(urlsplit(url).scheme)
+        async with self._get_semaphore(url):
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                async with self.session.request(method.upper(), url, proxy=proxy, **kwargs) as r:
+                    return GeoserverResponse(r.status, await r.read(), r.headers)
+            finally:
+                self.in_flight -= 1
+
+    def _update_catalog(self, action: str, kind: str, name: str, workspace: Optional[str] = None):
+        if self.catalog is not None:
+            getattr(self.catalog, action)(kind, name, workspace)
+
+    def get_stats(self):
+        """
+        Returns the requests sent and the maximum number of requests in flight.
+
+        Returns
+        -------
+        dict: {'requests', 'max_in_flight'}
+        """
+        return dict(requests=self.requests, max_in_flight=self.max_in_flight)
+
+    #--Workspaces--#
+    async def get_workspace(self, workspace: str):
+        """
+        get name  workspace if exist
+        """
+        url = "{}/rest/workspaces/{}.json".format(self.service_url, workspace)
+        r = await self._requests("get", url, params={"recurse": "true"})
+        if r.status_code == 200:
+            return r.json()
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    async def create_workspace(self, workspace: str):
+        """
+        Create a new workspace in geoserver.
+        """
+        url = "{}/rest/workspaces".format(self.service_url)
+        data = "<workspace><name>{}</name></workspace>".format(workspace)
+        r = await self._requests("post", url, data=data.encode('utf-8'), headers={"content-type": "text/xml; charset=utf-8"})
+        if r.status_code == 201:
+            self._update_catalog("add", "workspace", workspace)
+            return "{} Workspace {} created!".format(r.status_code, workspace)
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    #--Datastores--#
+    async def get_datastore(self, store_name: str, workspace: Optional[str] = None):
+        """
+        Return the data store in a given workspace.
+        """
+        if workspace is None:
+            workspace = "default"
+
+        url = "{}/rest/workspaces/{}/datastores/{}.json".format(self.service_url, workspace, store_name)
+        r = await self._requests("get", url)
+        if r.status_code == 200:
+            return r.json()
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    async def create_featurestore(self, store_name: str, workspace: Optional[str] = None, overwrite: bool = False, **kwargs):
+        """
+        Create PostGIS store for connecting postgres with geoserver.
+
+        Parameters
+        ----------
+        store_name : str
+        workspace : str, optional
+        overwrite : bool
+        kwargs: Connection parameters of the datastore (see Geoserver.create_featurestore).
+        """
+        data = get_featurestore_xml(store_name, **kwargs)
+        headers = {"content-type": "text/xml; charset=utf-8"}
+        if overwrite:
+            url = "{}/rest/workspaces/{}/datastores/{}".format(self.service_url, workspace, store_name)
+            r = await self._requests("put", url, data=data.encode('utf-8'), headers=headers)
+        else:
+            url = "{}/rest/workspaces/{}/datastores".format(self.service_url, workspace)
+            r = await self._requests("post", url, data=data.encode('utf-8'), headers=headers)
+
+        if r.status_code in [200, 201]:
+            self._update_catalog("add", "datastore", store_name, workspace)
+            return "Featurestore created/updated successfully"
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    #--Layers--#
+    async def get_layer(self, layer_name: str, workspace: Optional[str] = None):
+        """
+        Returns the layer by layer name.
+        """
+        url = "{}/rest/layers/{}".format(self.service_url, layer_name)
+        if workspace is not None:
+            url = "{}/rest/workspaces/{}/layers/{}".format(self.service_url, workspace, layer_name)
+
+        r = await self._requests("get", url, headers={"Accept": "application/json"})
+        if r.status_code == 200:
+            return r.json()
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    async def publish_featurestore(
+        self,
+        store_name: str,
+        pg_table: str,
+        workspace: Optional[str] = None,
+        title: Optional[str] = None,
+        abstract: Optional[str] = None,
+        srid: Optional[int] = 4326,
+        declared_srid: Optional[int] = 4326,
+        recalculate: Optional[str] = "nativebbox,latlonbbox",
+        proj_policy: Optional[str] = "REPROJECT_TO_DECLARED",
+        native_bbox: Optional[tuple] = None,
+        latlon_bbox: Optional[tuple] = None,
+        attributes: Optional[list] = None,
+    ):
+        """
+        Publish a PostGIS table as a FeatureType (see Geoserver.publish_featurestore).
+        """
+        if workspace is None:
+            workspace = "default"
+        layer_xml = get_featuretype_xml(pg_table, title or pg_table, abstract or pg_table, srid, declared_srid, recalculate, proj_policy, native_bbox, latlon_bbox, attributes)
+
+        url = "{}/rest/workspaces/{}/datastores/{}/featuretypes/".format(self.service_url, workspace, store_name)
+        r = await self._requests("post", url, data=layer_xml.encode('utf-8'), headers={"content-type": "text/xml; charset=utf-8"})
+        if r.status_code == 201:
+            self._update_catalog("add", "layer", pg_table, workspace)
+            return r.status_code
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    #--Layergroups--#
+    async def get_layergroup(self, layer_name: str, workspace: Optional[str] = None):
+        """
+        Returns the layer group by layer group name.
+        """
+        url = "{}/rest/layergroups/{}".format(self.service_url, layer_name)
+        if workspace is not None:
+            url = "{}/rest/workspaces/{}/layergroups/{}".format(self.service_url, workspace, layer_name)
+
+        r = await self._requests("get", url, headers={"Accept": "application/json"})
+        if r.status_code == 200:
+            return r.json()
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    async def publish_layergroup(
+        self,
+        name: str,
+        layers: list,
+        styles: list,
+        workspace: Optional[str] = None,
+        title: Optional[str] = None,
+        abstract: Optional[str] = None,
+        overwrite: bool = False,
+    ):
+        """
+        Create (or update) a single layer group of a workspace with a style by layer (see Geoserver.publish_layergroup).
+        """
+        if workspace is None:
+            workspace = "default"
+        data = get_layergroup_xml(name, layers, styles, workspace, title, abstract)
+        headers = {"content-type": "text/xml; charset=utf-8"}
+        if overwrite:
+            url = "{}/rest/workspaces/{}/layergroups/{}".format(self.service_url, workspace, name)
+            r = await self._requests("put", url, data=data.encode('utf-8'), headers=headers)
+        else:
+            url = "{}/rest/workspaces/{}/layergroups".format(self.service_url, workspace)
+            r = await self._requests("post", url, data=data.encode('utf-8'), headers=headers)
+
+        if r.status_code in [200, 201]:
+            self._update_catalog("add", "layergroup", name, workspace)
+            return r.status_code
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    #--Coveragestores--#
+    async def create_coveragestore(
+        self,
+        path,
+        layer_name: Optional[str] = None,
+        file_type: str = "GeoTIFF",
+        content_type: str = "image/tiff",
+        workspace: Optional[str] = None,
+        title: Optional[str] = None,
+        abstract: Optional[str] = None,
+        srid: Optional[int] = 4326,
+        declared_srid: Optional[int] = 4326,
+    ):
+        """
+        Creates the coveragestore; Data will uploaded to the server (see Geoserver.create_coveragestore).
+        """
+        if path is None:
+            raise Exception("You must provide the full path to the raster")
+
+        if layer_name is None:
+            layer_name = os.path.basename(path).split(".")[0]
+        if workspace is None:
+            workspace = "default"
+
+        url = "{0}/rest/workspaces/{1}/coveragestores/{2}/file.{3}?coverageName={2}".format(
+            self.service_url, workspace, layer_name, file_type.lower()
+        )
+        headers = {"content-type": content_type, "Accept": "application/json; charset=utf-8"}
+
+        # The file is read in a thread, not blocking the event loop
+        data = await asyncio.get_running_loop().run_in_executor(None, read_file, path)
+        r = await self._requests("put", url, data=data, headers=headers)
+        if r.status_code == 201:
+            self._update_catalog("add", "coveragestore", layer_name, workspace)
+            self._update_catalog("add", "layer", layer_name, workspace)
+            return r.json()
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    #--Styles--#
+    async def upload_style(
+        self,
+        path: str,
+        name: Optional[str] = None,
+        workspace: Optional[str] = None,
+        sld_version: str = "1.0.0",
+    ):
+        """
+        Upload a SLD file as a style (see Geoserver.upload_style).
+        """
+        if name is None:
+            name = os.path.basename(path).split(".")[0]
+
+        url = "{}/rest/workspaces/{}/styles".format(self.service_url, workspace)
+        if workspace is None:
+            url = "{}/rest/styles".format(self.service_url)
+
+        sld_content_type = "application/vnd.ogc.sld+xml"
+        if sld_version == "1.1.0" or sld_version == "1.1":
+            sld_content_type = "application/vnd.ogc.se+xml"
+
+        style_xml = "<style><name>{}</name><filename>{}</filename></style>".format(name, name + ".sld")
+        r = await self._requests("post", url, data=style_xml.encode('utf-8'), headers={"content-type": "text/xml; charset=utf-8"})
+        if r.status_code != 201:
+            raise GeoserverException(r.status_code, r.content)
+
+        data = await asyncio.get_running_loop().run_in_executor(None, read_file, path)
+        r_sld = await self._requests("put", url + "/" + name, data=data, headers={"content-type": sld_content_type})
+        if r_sld.status_code == 200:
+            self._update_catalog("add", "style", name, workspace)
+            return r_sld.status_code
+        else:
+            raise GeoserverException(r_sld.status_code, r_sld.content)
+
+    async def get_style(self, style_name: str, workspace: Optional[str] = None):
+        """
+        Returns the style by style name.
+        """
+        url = "{}/rest/styles/{}.json".format(self.service_url, style_name)
+        if workspace is not None:
+            url = "{}/rest/workspaces/{}/styles/{}.json".format(self.service_url, workspace, style_name)
+
+        r = await self._requests("get", url)
+        if r.status_code == 200:
+            return r.json()
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    async def create_sld_style(self, name: str, sld: str, workspace: Optional[str] = None, overwrite: bool = False):
+        """
+        Create (or update) a style from a SLD (1.0.0) document (see Geoserver.create_sld_style).
+        """
+        url = "{}/rest/workspaces/{}/styles".format(self.service_url, workspace)
+        if workspace is None:
+            url = "{}/rest/styles".format(self.service_url)
+
+        headers = {"content-type": "application/vnd.ogc.sld+xml"}
+        if overwrite:
+            r = await self._requests("put", url + "/" + name, data=sld.encode('utf-8'), headers=headers)
+        else:
+            r = await self._requests("post", url, params={"name": name}, data=sld.encode('utf-8'), headers=headers)
+
+        if r.status_code in [200, 201]:
+            self._update_catalog("add", "style", name, workspace)
+            return r.status_code
+        else:
+            raise GeoserverException(r.status_code, r.content)
+
+    async def publish_style(self, layer_name: str, style_name: str, workspace: str):
+        """
+        Set the default style of a layer.
+        """
+        url = "{}/rest/layers/{}:{}".format(self.service_url, workspace, layer_name)
+        style_xml = "<layer><defaultStyle><name>{}</name></defaultStyle></layer>".format(style_name)
+        r = await self._requests("put", url, data=style_xml.encode('utf-8'), headers={"content-type": "text/xml; charset=utf-8"})
+        if r.status_code == 200:
+            return r.status_code
+        else:
+            raise GeoserverException(r.status_code, r.content)
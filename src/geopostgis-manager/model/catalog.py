@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+## Coding: UTF-8
+## Author: mjanez@tragsa.es
+## Institution: -
+## Project: -
+# inbuilt libraries
+import logging
+import threading
+from typing import Optional
+
+
+log_module = f"[{__name__}]"
+
+# Catalog resources: REST list endpoint (relative to the workspace, None: global) and keys of its JSON response
+CATALOG_RESOURCES = {
+    'workspace': ("rest/workspaces.json", 'workspaces', 'workspace'),
+    'datastore': ("rest/workspaces/{workspace}/datastores.json", 'dataStores', 'dataStore'),
+    'coveragestore': ("rest/workspaces/{workspace}/coveragestores.json", 'coverageStores', 'coverageStore'),
+    'layer': ("rest/workspaces/{workspace}/layers.json", 'layers', 'layer'),
+    'style': ("rest/workspaces/{workspace}/styles.json", 'styles', 'style'),
+    'layergroup': ("rest/workspaces/{workspace}/layergroups.json", 'layerGroups', 'layerGroup'),
+}
+
+# Global styles (not in a workspace)
+GLOBAL_STYLES_ENDPOINT = "rest/styles.json"
+
+# Catalogs revalidated with ETags by Geoserver service URL, kept between the publishing passes of the process
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog_names(data, outer: str, inner: str):
+    """
+    Returns the names of a Geoserver REST list response, e.g. {'layers': {'layer': [{'name': ..., 'href': ...}]}}.
+
+    Geoserver returns an empty string instead of the inner object if the list is empty, and an object instead
+    of a list if it has a single element.
+
+    Parameters
+    ----------
+    - data: JSON response (dict).
+    - outer: Key of the list (e.g. 'layers').
+    - inner: Key of the elements (e.g. 'layer').
+
+    Return
+    ----------
+    Set of names (without the workspace prefix)
+    """
+    items = (data or {}).get(outer) or {}
+    items = items.get(inner, []) if isinstance(items, dict) else []
+    if isinstance(items, dict):
+        items = [items]
+
+    return {item['name'].split(':')[-1] for item in items if item.get('name')}
+
+class GeoserverCatalog:
+    def __init__(self, geo, etag: Optional[bool] = False):
+        """
+        Constructor of the GeoserverCatalog class: in-memory cache of the names of the workspaces, datastores,
+        coverage stores, layers, styles and layer groups of a Geoserver instance.
+
+        Parameters
+        ----------
+        geo: Geoserver connection object.
+        etag: bool, optional. Revalidate the cached lists with conditional requests (If-None-Match) in refresh(). Default: False
+
+        Notes
+        ----------
+        Each list is loaded with one request to its REST list endpoint (by workspace) the first time it is needed,
+        and the existence checks are set lookups. The Geoserver object updates the catalog on each create/delete.
+        """
+        self.geo = geo
+        self.etag = etag
+        self._entries = {}
+        self._etags = {}
+        self._lock = threading.RLock()
+        self.requests: int = 0
+        self.hits: int = 0
+        self.revalidated: int = 0
+
+    def _get_url(self, kind: str, workspace: Optional[str] = None):
+        path = CATALOG_RESOURCES[kind][0]
+        if kind == 'style' and workspace is None:
+            path = GLOBAL_STYLES_ENDPOINT
+
+        return "{}/{}".format(self.geo.service_url, path.format(workspace=workspace))
+
+    def _fetch(self, kind: str, workspace: Optional[str] = None):
+        """
+        Load (or revalidate) a list of the catalog with its REST list endpoint.
+
+        Return
+        ----------
+        Set of names
+        """
+        key = (kind, workspace)
+        url = self._get_url(kind, workspace)
+        headers = {"Accept": "application/json"}
+        if self.etag and key in self._entries and self._etags.get(key):
+            headers["If-None-Match"] = self._etags[key]
+
+        r = self.geo._requests("get", url, headers=headers)
+        self.requests += 1
+
+        if r.status_code == 304:
+            self.revalidated += 1
+            return self._entries[key]
+        elif r.status_code == 404:
+            # Workspace not found, its lists are empty
+            names = set()
+        elif r.status_code == 200:
+            names = get_catalog_names(r.json(), *CATALOG_RESOURCES[kind][1:])
+        else:
+            raise Exception(f"Status code: {r.status_code}, could not list the Geoserver {kind}s: {r.content}")
+
+        self._entries[key] = names
+        if r.headers.get("ETag"):
+            self._etags[key] = r.headers["ETag"]
+
+        return names
+
+    def get_names(self, kind: str, workspace: Optional[str] = None):
+        """
+        Returns the cached names of a resource type (loaded with its list endpoint if needed).
+
+        Parameters
+        ----------
+        - kind: Resource type: 'workspace', 'datastore', 'coveragestore', 'layer', 'style' or 'layergroup'.
+        - workspace: Geoserver workspace (None for workspaces and global styles).
+
+        Return
+        ----------
+        Set of names
+        """
+        if kind == 'workspace':
+            workspace = None
+        with self._lock:
+            names = self._entries.get((kind, workspace))
+            if names is None:
+                names = self._fetch(kind, workspace)
+            else:
+                self.hits += 1
+
+            return names
+
+    def prefetch(self, workspaces: Optional[list] = None):
+        """
+        Bulk load the catalog lists of the workspaces (all the workspaces if not defined) and the global styles.
+
+        Parameters
+        ----------
+        - workspaces: List of Geoserver workspaces.
+        """
+        with self._lock:
+            existing = self._fetch('workspace')
+            self._fetch('style')
+            for workspace in (workspaces if workspaces is not None else sorted(existing)):
+                for kind in ('datastore', 'coveragestore', 'layer', 'style', 'layergroup'):
+                    if workspace in existing:
+                        self._fetch(kind, workspace)
+                    else:
+                        self._entries[(kind, workspace)] = set()
+
+        logging.info(f"{log_module}:Geoserver catalog loaded with {self.requests} requests: {self.summary()}")
+
+    def refresh(self):
+        """
+        Reload the cached lists, with conditional requests if ETag revalidation is enabled (unchanged lists are not transferred).
+        """
+        with self._lock:
+            for kind, workspace in list(self._entries):
+                self._fetch(kind, workspace)
+
+    def has(self, kind: str, name: str, workspace: Optional[str] = None):
+        """
+        Returns True if a resource exists in the catalog.
+
+        Parameters
+        ----------
+        - kind: Resource type: 'workspace', 'datastore', 'coveragestore', 'layer', 'style' or 'layergroup'.
+        - name: Resource name.
+        - workspace: Geoserver workspace (None for workspaces and global styles).
+        """
+        return name in self.get_names(kind, workspace)
+
+    def add(self, kind: str, name: str, workspace: Optional[str] = None):
+        """
+        Add a created resource to the catalog (only to the lists already loaded).
+        """
+        if kind == 'workspace':
+            workspace = None
+        with self._lock:
+            names = self._entries.get((kind, workspace))
+            if names is not None:
+                names.add(name)
+            # A new workspace has empty lists
+            if kind == 'workspace':
+                for resource in ('datastore', 'coveragestore', 'layer', 'style', 'layergroup'):
+                    self._entries.setdefault((resource, name), set())
+
+    def remove(self, kind: str, name: str, workspace: Optional[str] = None):
+        """
+        Remove a deleted resource from the catalog. A deleted workspace or store is reloaded when needed (recursive delete).
+        """
+        if kind == 'workspace':
+            workspace = None
+        with self._lock:
+            names = self._entries.get((kind, workspace))
+            if names is not None:
+                names.discard(name)
+            if kind == 'workspace':
+                for key in [key for key in self._entries if key[1] == name]:
+                    del self._entries[key]
+                    self._etags.pop(key, None)
+            elif kind in ('datastore', 'coveragestore'):
+                self._entries.pop(('layer', workspace), None)
+                self._etags.pop(('layer', workspace), None)
+
+    def summary(self):
+        """
+        Returns the number of cached names of each resource type.
+
+        Return
+        ----------
+        Summary str
+        """
+        counts = {}
+        with self._lock:
+            for (kind, _), names in self._entries.items():
+                counts[kind] = counts.get(kind, 0) + len(names)
+
+        return ", ".join(f"{kind}s: {count}" for kind, count in counts.items())
+
+    def log_stats(self):
+        """
+        Log the requests sent and the lookups served by the catalog.
+        """
+        logging.info(f"{log_module}:Geoserver catalog: {self.requests} list requests | {self.hits} cached lookups | {self.revalidated} revalidated (ETag) | {self.summary()}")
+
+def get_catalog(geo, workspaces: Optional[list] = None, etag: Optional[bool] = False):
+    """
+    Returns the catalog of a Geoserver instance for a publishing pass.
+
+    Without ETag revalidation the catalog is bulk loaded (prefetch) on each pass. With ETag revalidation it is loaded
+    once by process and refreshed before the next passes with conditional requests, so the unchanged lists are not
+    transferred again.
+
+    Parameters
+    ----------
+    - geo: Geoserver connection object of the pass.
+    - workspaces: List of Geoserver workspaces.
+    - etag: Revalidate the cached lists with ETags.
+
+    Return
+    ----------
+    GeoserverCatalog
+    """
+    if not etag:
+        catalog = GeoserverCatalog(geo)
+        catalog.prefetch(workspaces)
+        return catalog
+
+    with _catalogs_lock:
+        catalog = _catalogs.pop(geo.service_url, None)
+        if catalog is None:
+            catalog = GeoserverCatalog(geo, etag=True)
+            catalog.prefetch(workspaces)
+        else:
+            catalog.geo = geo
+            catalog.refresh()
+            missing = [workspace for workspace in workspaces or [] if ('layer', workspace) not in catalog._entries]
+            if missing:
+                catalog.prefetch(missing)
+            logging.info(f"{log_module}:Geoserver catalog refreshed: {catalog.revalidated} lists revalidated (ETag) | {catalog.summary()}")
+
+        # Cached only if loaded, a failed load or refresh starts over on the next pass
+        _catalogs[geo.service_url] = catalog
+
+    return catalog
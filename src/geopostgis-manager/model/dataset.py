@@ -12,6 +12,9 @@ import re
 from datetime import datetime
 
 
+# Attributes updated by a load (e.g. in a worker process) and merged back into the Dataset object
+LOAD_RESULT_FIELDS = ('status', 'status_info', 'file_srid', 'geometry_type', 'clustering_correlation', 'row_count', 'index_build_time', 'index_method', 'overviews', 'bytes_saved')
+
 class Dataset:
     """
     Dataset object.
@@ -34,6 +37,20 @@ class Dataset:
     declared_srid -- Output Geoserver declared spatial reference identifier (SRID). int
     ogc_layer -- Output Standarised Geoserver Layer name. str
     ogc_workspace -- Ouput Geoserver Layer workspace. str
+    clustering_correlation -- Correlation between the physical and the spatial order of the table rows. float
+    geometry_type -- Geometry type of the DB table. str
+    row_count -- Number of features loaded into the DB table. int
+    index_build_time -- Seconds elapsed by the geometry index build. float
+    index_method -- Method of the geometry index ('gist', 'spgist' or 'brin'). str
+    search_attributes -- Fields used by the search filters, indexed in the DB table. list
+    fingerprint -- Fingerprint of the dataset files by stage ('db', 'geoserver'). dict
+    load_mode -- Load mode of the DB table ('replace', 'staging' or 'delta'). str
+    unchanged -- Stages skipped because the dataset is unchanged since the last run. list
+    precision -- Size of the grid of the stored coordinates. float
+    bytes_saved -- Bytes saved by the coordinates precision and the narrowed attribute types. int
+    overviews -- Overview tables of the DB table: {'table', 'tolerance', 'vertices'} by level. list
+    bbox -- Bounding boxes of the DB table: {'native', 'latlon', 'srid'}, published with its FeatureType. dict
+    attributes -- Attributes of the DB table: {'name', 'binding', 'nillable'}, published with its FeatureType. list
     """
     def __init__(self, name, identifier, schema):
         self.identifier = identifier
@@ -54,6 +71,20 @@ class Dataset:
         self.declared_srid = None
         self.ogc_workspace = None
         self.ogc_layer = None
+        self.clustering_correlation = None
+        self.geometry_type = None
+        self.row_count = None
+        self.index_build_time = None
+        self.index_method = None
+        self.search_attributes = []
+        self.fingerprint = {}
+        self.load_mode = None
+        self.unchanged = []
+        self.overviews = []
+        self.precision = None
+        self.bytes_saved = None
+        self.bbox = None
+        self.attributes = None
 
     def set_name(self, name):
         self.name = name
@@ -132,6 +163,49 @@ class Dataset:
     def set_ogc_layer(self, ogc_layer):
         self.ogc_layer = ogc_layer
 
+    def set_clustering_correlation(self, clustering_correlation):
+        self.clustering_correlation = float(clustering_correlation) if clustering_correlation is not None else None
+
+    def set_geometry_type(self, geometry_type):
+        self.geometry_type = geometry_type
+
+    def set_row_count(self, row_count):
+        self.row_count = row_count
+
+    def set_index_build_time(self, index_build_time):
+        self.index_build_time = round(index_build_time, 3) if index_build_time is not None else None
+
+    def set_index_method(self, index_method):
+        self.index_method = index_method
+
+    def set_search_attributes(self, search_attributes):
+        self.search_attributes = search_attributes
+
+    def set_fingerprint(self, stage, fingerprint):
+        self.fingerprint[stage] = fingerprint
+
+    def set_load_mode(self, load_mode):
+        self.load_mode = load_mode
+
+    def set_unchanged(self, stage):
+        if stage not in self.unchanged:
+            self.unchanged.append(stage)
+
+    def set_overviews(self, overviews):
+        self.overviews = overviews
+
+    def set_precision(self, precision):
+        self.precision = float(precision) if precision is not None else None
+
+    def set_bytes_saved(self, bytes_saved):
+        self.bytes_saved = bytes_saved
+
+    def set_bbox(self, bbox):
+        self.bbox = bbox
+
+    def set_attributes(self, attributes):
+        self.attributes = attributes
+
     def set_table_name(self, identifier):
         # the name of a Postgis dataset, must be between 2 and 63 characters long and contain only lowercase
         # alphanumeric characters, - and _, e.g. 'warandpeace'
@@ -150,6 +224,20 @@ class Dataset:
 
         self.table = table_name
 
+    def load_result(self):
+        """
+        Returns the lightweight load result of the dataset.
+        """
+        return {field: getattr(self, field) for field in LOAD_RESULT_FIELDS}
+
+    def merge_load_result(self, load_result):
+        """
+        Update the dataset with a load result (load_result()), e.g. returned by a worker process.
+        """
+        for field in LOAD_RESULT_FIELDS:
+            if field in load_result:
+                setattr(self, field, load_result[field])
+
     def dataset_dict(self):
         return {'identifier': self.identifier,
                 'name': self.name,
@@ -166,6 +254,14 @@ class Dataset:
                 'db_database': self.dbname,
                 'db_schema': self.schema,
                 'db_table': self.table,
+                'db_geometry_type': self.geometry_type,
+                'db_clustering_correlation': self.clustering_correlation,
+                'db_row_count': self.row_count,
+                'db_index_build_time': self.index_build_time,
+                'db_index_method': self.index_method,
+                'db_bytes_saved': self.bytes_saved,
+                'db_overviews': ",".join(overview['table'] for overview in self.overviews),
+                'unchanged': ",".join(self.unchanged),
                 'ogc_srid': self.declared_srid,
                 'ogc_workspace': self.ogc_workspace,
                 'ogc_layer': self.ogc_layer        
@@ -10,6 +10,8 @@ import sys
 from pprint import pprint
 import logging
 import os
+import threading
+import time
 
 # third-party libraries
 import psycopg2
@@ -20,16 +22,119 @@ import sqlalchemy
 
 log_module = f"[{__name__}]"
 
+# Default size of the connection pool of each database and seconds waited for a free connection
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 300
+
+# Engines (and its connection pool) shared by process and database, with the checkout stats of the pool
+_engines = {}
+_pool_stats = {}
+_engines_lock = threading.Lock()
+
 def get_connection(db_params, db_type=None):
   if db_params.endpoint is not None:
     logging.info(f"{log_module}:Connect to: {db_params.endpoint} | DB type: {db_type}")
   conn = psycopg2.connect(host=db_params.host, port=db_params.port, user=db_params.username, password=db_params.password, dbname=db_params.dbname)
   return(conn)
 
+def get_engine_key(db_params):
+    # Pools can not be shared between processes, a forked worker creates its own engine
+    return (os.getpid(), db_params.host, str(db_params.port), db_params.dbname, db_params.username)
+
+def get_pool_size(db_params):
+    """
+    Returns the maximum number of connections of the pool of a database.
+
+    Parameters
+    ----------
+    - db_params: Database connection details.
+
+    Return
+    ----------
+    Pool size int
+    """
+    return getattr(db_params, 'pool_size', None) or DEFAULT_POOL_SIZE
+
 def create_engine(db_params):
-    engine = sqlalchemy.create_engine('postgresql://' + db_params.username + ':' + db_params.password + '@'+ db_params.host + ':' + db_params.port + '/' + db_params.dbname)
+    """
+    Returns the SQLAlchemy engine of a database. The engine (and its connection pool) is created once by process
+    and shared by the loaders (get_pooled_connection) and the GeoDataFrame writers.
+
+    Parameters
+    ----------
+    - db_params: Database connection details. db_params.pool_size: Maximum number of connections of the pool.
+      db_params.pool_timeout: Seconds waited for a free connection before a checkout fails.
+
+    Return
+    ----------
+    SQLAlchemy engine
+    """
+    key = get_engine_key(db_params)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            pool_size = get_pool_size(db_params)
+            # The pool is bounded (no overflow), checkouts wait for a free connection instead of exceed max_connections.
+            # An exhausted pool raises a TimeoutError after pool_timeout instead of blocking forever
+            engine = sqlalchemy.create_engine(
+                'postgresql://' + db_params.username + ':' + db_params.password + '@'+ db_params.host + ':' + str(db_params.port) + '/' + db_params.dbname,
+                pool_size=pool_size,
+                max_overflow=0,
+                pool_timeout=getattr(db_params, 'pool_timeout', None) or DEFAULT_POOL_TIMEOUT,
+                pool_pre_ping=True
+                )
+            _engines[key] = engine
+            _pool_stats[key] = dict(checkouts=0, wait_time=0.0, max_wait_time=0.0)
+            logging.info(f"{log_module}:Connection pool to: {db_params.endpoint} | Size: {pool_size}")
     return engine
 
+def get_pooled_connection(db_params):
+    """
+    Returns a DBAPI (psycopg2) connection from the pool of the database. conn.close() returns the connection to the pool.
+
+    Parameters
+    ----------
+    - db_params: Database connection details.
+
+    Return
+    ----------
+    DB connection object
+    """
+    engine = create_engine(db_params)
+    start = time.perf_counter()
+    conn = engine.raw_connection()
+    wait_time = time.perf_counter() - start
+
+    stats = _pool_stats[get_engine_key(db_params)]
+    with _engines_lock:
+        stats['checkouts'] += 1
+        stats['wait_time'] += wait_time
+        stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+    return conn
+
+def get_pool_stats(db_params):
+    """
+    Returns the usage and checkout wait stats of the connection pool of a database.
+
+    Parameters
+    ----------
+    - db_params: Database connection details.
+
+    Return
+    ----------
+    dict: size, checked_out, checkouts, wait_time (total seconds), avg_wait_time, max_wait_time
+    """
+    key = get_engine_key(db_params)
+    engine = _engines.get(key)
+    if engine is None:
+        return None
+
+    stats = dict(_pool_stats[key])
+    stats['size'] = engine.pool.size()
+    stats['checked_out'] = engine.pool.checkedout()
+    stats['avg_wait_time'] = stats['wait_time'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    return stats
+
 def get_query(conn, query):
     rv = True
     cur = conn.cursor()
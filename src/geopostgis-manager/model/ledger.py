@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+## Coding: UTF-8
+## Author: mjanez@tragsa.es
+## Institution: -
+## Project: -
+# inbuilt libraries
+import glob
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+log_module = f"[{__name__}]"
+
+# Read size of the files hashed
+HASH_CHUNK_SIZE = 1024 * 1024
+
+LEDGER_DDL = (
+    """CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        hash TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS datasets (
+        bundle_id TEXT NOT NULL,
+        identifier TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        srid INTEGER,
+        row_count INTEGER,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (bundle_id, identifier, stage)
+    )""",
+)
+
+def get_dataset_files(file_path: str):
+    """
+    Returns the component files of a dataset, all the files with the same base name (e.g. .shp, .shx, .dbf, .prj, .cpg or .tif, .tfw).
+
+    Parameters
+    ----------
+    - file_path: Path of the dataset file.
+
+    Return
+    ----------
+    Sorted list of paths
+    """
+    base = os.path.splitext(file_path)[0]
+
+    return sorted(path for path in glob.glob(glob.escape(base) + ".*") if os.path.isfile(path))
+
+def hash_file(path: str):
+    """
+    Returns the BLAKE2b hash of a file content.
+
+    Parameters
+    ----------
+    - path: Path of the file.
+
+    Return
+    ----------
+    Hexadecimal hash str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+class Ledger:
+    def __init__(self, path: str):
+        """
+        Constructor of the Ledger class: SQLite file with the fingerprints of the datasets loaded by each stage ('db', 'geoserver').
+
+        Parameters
+        ----------
+        path: str. Path of the SQLite file.
+
+        Notes
+        ----------
+        The content hash of each file is stored with its size and mtime, so a file is only read again if it changes.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            for ddl in LEDGER_DDL:
+                self.conn.execute(ddl)
+
+    def get_file_hash(self, path: str):
+        """
+        Returns the content hash of a file, reused from the ledger if its size and mtime are unchanged.
+
+        Parameters
+        ----------
+        - path: Path of the file.
+
+        Return
+        ----------
+        Hexadecimal hash str
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        file_hash = hash_file(path)
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns, file_hash))
+
+        return file_hash
+
+    def get_fingerprint(self, paths: list, params: Optional[dict] = None):
+        """
+        Returns the fingerprint of a dataset: hash of the content hashes of its files and the load parameters.
+
+        Parameters
+        ----------
+        - paths: List of paths of the dataset files.
+        - params: dict of parameters that change the stored result (e.g. SRID).
+
+        Return
+        ----------
+        Hexadecimal fingerprint str or None if there are no files
+        """
+        if not paths:
+            return None
+
+        digest = hashlib.blake2b(digest_size=16)
+        for path in sorted(paths):
+            digest.update(os.path.basename(path).lower().encode('utf-8'))
+            digest.update(self.get_file_hash(path).encode('utf-8'))
+        for key, value in sorted((params or {}).items()):
+            digest.update(f"{key}={value}".encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def get_entry(self, bundle_id: str, identifier: str, stage: str):
+        """
+        Returns the ledger entry of a dataset stage.
+
+        Return
+        ----------
+        dict: {'fingerprint', 'srid', 'row_count', 'updated_at'} or None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT fingerprint, srid, row_count, updated_at FROM datasets WHERE bundle_id = ? AND identifier = ? AND stage = ?",
+                (bundle_id, identifier, stage)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(fingerprint=row[0], srid=row[1], row_count=row[2], updated_at=row[3])
+
+    def set_entry(self, bundle_id: str, identifier: str, stage: str, fingerprint: str, srid: Optional[int] = None, row_count: Optional[int] = None):
+        """
+        Store the ledger entry of a dataset stage.
+        """
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO datasets (bundle_id, identifier, stage, fingerprint, srid, row_count, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (bundle_id, identifier, stage, fingerprint, srid, row_count, datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def close(self):
+        self.conn.close()
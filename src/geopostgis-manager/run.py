@@ -7,6 +7,7 @@
 import logging
 from datetime import datetime   
 import os
+import argparse as ap
 
 # custom functions
 from config.config import config_get_parameters
@@ -20,7 +21,7 @@ from controller.dataset_loader import GeoserverLoader
 HERE = os.path.abspath(os.path.dirname(__file__))
 log_module = "[run.main]"
 
-def generate_datasets_object(bundle, bundle_doc, db_type=None, log_folder=None):
+def generate_datasets_object(bundle, bundle_doc, db_type=None, log_folder=None, force=False):
     """
     Launch ingesting process dependes on type of db
 
@@ -30,6 +31,7 @@ def generate_datasets_object(bundle, bundle_doc, db_type=None, log_folder=None):
     - bundle_doc: Dict contains all info about datasets of the bundle_id from config.yml
     - db_type: Type of DB of server
     - log_folder: Logging file folder
+    - force: Load all the datasets even if they are unchanged in the ledger
 
     Return
     ----------
@@ -70,6 +72,8 @@ def generate_datasets_object(bundle, bundle_doc, db_type=None, log_folder=None):
             password = bundle.db_password,
             dbname = bundle.db_dbname,
             active = bundle.db_active,
+            pool_size = getattr(bundle, 'db_pool_size', None),
+            pool_timeout = getattr(bundle, 'db_pool_timeout', None),
         ),
         geoserver_params = dict(
             endpoint = bundle.geo_endpoint,
@@ -80,14 +84,49 @@ def generate_datasets_object(bundle, bundle_doc, db_type=None, log_folder=None):
             workspace = bundle.geo_workspace,
             geo_srid = bundle.geo_srid,
             active = bundle.geo_active,
+            overview_mode = getattr(bundle, 'geo_overview_mode', None),
+            overview_config = getattr(bundle, 'geo_overview_config', None),
+            pool_size = getattr(bundle, 'geo_pool_size', None),
+            catalog = getattr(bundle, 'geo_catalog', True),
+            catalog_etag = getattr(bundle, 'geo_catalog_etag', False),
+            max_requests = getattr(bundle, 'geo_max_requests', None),
+            precompute_bbox = getattr(bundle, 'geo_precompute_bbox', True),
+            async_requests = getattr(bundle, 'geo_async', False),
+        ),
+        ingest_params = dict(
+            load_method = getattr(bundle, 'db_load_method', None),
+            batch_size = getattr(bundle, 'db_batch_size', None),
+            force_2d = getattr(bundle, 'db_force_2d', False),
+            load_mode = getattr(bundle, 'db_load_mode', None),
+            staging_logged = getattr(bundle, 'db_staging_logged', True),
+            delta_key = getattr(bundle, 'db_delta_key', None),
+            spatial_sort = getattr(bundle, 'db_spatial_sort', None),
+            clustering_check = getattr(bundle, 'db_clustering_check', False),
+            reproject = getattr(bundle, 'db_reproject', None),
+            primary_key = getattr(bundle, 'db_primary_key', True),
+            index_method = getattr(bundle, 'db_index_method', None),
+            index_benchmark = getattr(bundle, 'db_index_benchmark', False),
+            index_memory = getattr(bundle, 'db_index_memory', None),
+            index_concurrency = getattr(bundle, 'db_index_concurrency', None),
+            pipeline_depth = getattr(bundle, 'db_pipeline_depth', None),
+            partition_by = getattr(bundle, 'db_partition_by', None),
+            partition_grid_size = getattr(bundle, 'db_partition_grid_size', None),
+            precision = getattr(bundle, 'db_precision', None),
+            narrow_types = getattr(bundle, 'db_narrow_types', False),
+            subdivide_vertices = getattr(bundle, 'db_subdivide_vertices', None),
+            overview_tolerances = getattr(bundle, 'db_overview_tolerances', None),
         ),
         datasets_doc = bundle_doc,
         datasets_table = datasets_table,
         datasets_mode = datasets_mode,
         parallel = default_config.parallelization,
+        parallel_backend = getattr(default_config, 'parallel_backend', None) or "threads",
+        workers = getattr(default_config, 'workers', None),
         proxies = proxies,
         load_to_db = default_config.load_to_db,
-        load_to_geoserver = default_config.load_to_geoserver
+        load_to_geoserver = default_config.load_to_geoserver,
+        ledger_file = get_ledger_file(log_folder),
+        force = force
     )
     
     # Create a list with all Dataset objects to be loaded into the database
@@ -105,6 +144,23 @@ def generate_datasets_object(bundle, bundle_doc, db_type=None, log_folder=None):
 
     return obj_datasets
 
+def get_ledger_file(log_folder):
+    """
+    Returns the path of the ledger (SQLite file) with the fingerprints of the loaded datasets
+
+    Parameters
+    ----------
+    - log_folder: Logging file folder. Relative paths of default.ledger_file are joined to it
+    Return
+    ----------
+    Path of the ledger file or None if it is not configured
+    """
+    ledger_file = getattr(default_config, 'ledger_file', None)
+    if not ledger_file:
+        return None
+
+    return os.path.join(log_folder, ledger_file)
+
 def ingest_db(obj_datasets):
     """
     Launch ingesting process dependes on type of db
@@ -168,6 +224,11 @@ if __name__ == '__main__':
     with open(os.path.join(HERE, "__version__.py")) as f:
         exec(f.read(), about)
 
+    # Arguments
+    parser = ap.ArgumentParser(description="Load the datasets of the geopostgis bundles into PostGIS and Geoserver.")
+    parser.add_argument("--force", action="store_true", help="Load all the datasets even if they are unchanged since the last run (ledger).")
+    args = parser.parse_args()
+
     # Retrieve parameters and init log
     harvester_start = datetime.now()
     geopostgis_bundles, datasets_doc, default_config  = config_get_parameters()
@@ -184,7 +245,7 @@ if __name__ == '__main__':
         bundle_doc = next((x for x in datasets_doc if x.bundle_id == bundle.bundle_id), None)
 
         # Generate Datasets object
-        obj_datasets = generate_datasets_object(bundle=bundle, db_type=bundle.db_type.lower(), log_folder=log_folder, bundle_doc=bundle_doc)
+        obj_datasets = generate_datasets_object(bundle=bundle, db_type=bundle.db_type.lower(), log_folder=log_folder, bundle_doc=bundle_doc, force=args.force)
 
         # Ingest to DB
         if bundle.db_active == True:
@@ -207,6 +268,8 @@ if __name__ == '__main__':
         obj_datasets.output_info.set_output_info(obj_datasets.datasets)
         elapsedtime = str(datetime.now() - harvester_start).split(".")[0]
         logging.info(
-            f"{log_module}:geopostgis-bundle: '{bundle.bundle_id}'\nResume: new DB datasets: {obj_datasets.output_info.db_records} - new Geoserver datasets: {obj_datasets.output_info.geo_records} - errors: {obj_datasets.output_info.error_records} - Total datasets in doc: {obj_datasets.output_info.total_records} | Total time elapsed: {elapsedtime}"
+            f"{log_module}:geopostgis-bundle: '{bundle.bundle_id}'\nResume: new DB datasets: {obj_datasets.output_info.db_records} - new Geoserver datasets: {obj_datasets.output_info.geo_records} - errors: {obj_datasets.output_info.error_records} - unchanged: {obj_datasets.output_info.unchanged_records} - Total datasets in doc: {obj_datasets.output_info.total_records} | Total time elapsed: {elapsedtime}"
         )
+        if obj_datasets.output_info.makespan:
+            logging.info(f"{log_module}:Makespan: {obj_datasets.output_info.makespan_summary()}")
         logging.info(f"{log_module}:Datasets logfile:'{obj_datasets.output_info.zip_file}'")
\ No newline at end of file
@@ -0,0 +1,48 @@
+import asyncio
+
+from aiohttp import web
+
+from model.async_geoserver import AsyncGeoserver
+
+
+async def run_requests(handler, max_requests, paths):
+    app = web.Application()
+    app.router.add_route('*', '/geoserver/{path:.*}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        async with AsyncGeoserver(f"http://127.0.0.1:{port}/geoserver", max_requests=max_requests) as geo:
+            responses = await asyncio.gather(*(geo._requests(method, f"{geo.service_url}/{path}") for method, path in paths))
+            return geo, responses
+    finally:
+        await runner.cleanup()
+
+
+def test_requests_in_flight(monkeypatch):
+    for var in ('HTTP_PROXY', 'http_proxy', 'ALL_PROXY', 'all_proxy'):
+        monkeypatch.delenv(var, raising=False)
+    server = dict(in_flight=0, max_in_flight=0)
+
+    async def handler(request):
+        server['in_flight'] += 1
+        server['max_in_flight'] = max(server['max_in_flight'], server['in_flight'])
+        await asyncio.sleep(0.02)
+        server['in_flight'] -= 1
+        if request.match_info['path'].startswith('rest/workspaces/missing'):
+            return web.Response(status=404, text='No such workspace: missing')
+        return web.Response(status=201 if request.method == 'POST' else 200, text=f"{request.method} {request.match_info['path']}")
+
+    paths = [('get', f"rest/layers/layer_{i}.json") for i in range(10)] + [('post', 'rest/workspaces'), ('get', 'rest/workspaces/missing.json')]
+    geo, responses = asyncio.run(run_requests(handler, 3, paths))
+
+    # Up to max_requests requests in flight (client and server side)
+    assert geo.get_stats() == dict(requests=12, max_in_flight=3)
+    assert server['max_in_flight'] <= 3
+    # Status codes and bodies of each request
+    assert [r.status_code for r in responses] == [200] * 10 + [201, 404]
+    assert responses[0].content == b'GET rest/layers/layer_0.json'
+    assert responses[-1].content == b'No such workspace: missing'
+    assert geo.in_flight == 0
@@ -0,0 +1,73 @@
+from model import catalog as catalog_module
+from model.catalog import get_catalog, get_catalog_names
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, etag=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {"ETag": etag} if etag else {}
+        self.content = b""
+
+    def json(self):
+        return self.data
+
+
+class FakeGeoserver:
+    """Geoserver with a workspace and a layer, returning ETags and 304 for the unchanged lists."""
+    service_url = "http://geoserver"
+
+    def __init__(self):
+        self.requests = []
+
+    def _requests(self, method, url, headers=None):
+        self.requests.append((url, (headers or {}).get("If-None-Match")))
+        if (headers or {}).get("If-None-Match") == url:
+            return FakeResponse(304)
+        if url.endswith("rest/workspaces.json"):
+            return FakeResponse(200, {'workspaces': {'workspace': [{'name': 'workspace'}]}}, etag=url)
+        if url.endswith("workspace/layers.json"):
+            return FakeResponse(200, {'layers': {'layer': {'name': 'workspace:layer'}}}, etag=url)
+        return FakeResponse(200, {}, etag=url)
+
+
+def test_get_catalog_names_list():
+    data = {'layers': {'layer': [{'name': 'workspace:a', 'href': ''}, {'name': 'b', 'href': ''}]}}
+    assert get_catalog_names(data, 'layers', 'layer') == {'a', 'b'}
+
+
+def test_get_catalog_names_single():
+    # A single element is returned as an object
+    assert get_catalog_names({'layers': {'layer': {'name': 'workspace:a'}}}, 'layers', 'layer') == {'a'}
+
+
+def test_get_catalog_names_empty():
+    # An empty list is returned as an empty string
+    assert get_catalog_names({'layers': ''}, 'layers', 'layer') == set()
+    assert get_catalog_names(None, 'layers', 'layer') == set()
+
+
+def test_get_catalog_refreshes_with_etag(monkeypatch):
+    monkeypatch.setattr(catalog_module, '_catalogs', {})
+    geo = FakeGeoserver()
+    catalog = get_catalog(geo, ['workspace'], etag=True)
+    assert catalog.has('layer', 'layer', 'workspace')
+    loaded = len(geo.requests)
+
+    # Next pass: the same catalog is revalidated with conditional requests
+    next_geo = FakeGeoserver()
+    assert get_catalog(next_geo, ['workspace'], etag=True) is catalog
+    assert catalog.geo is next_geo
+    assert len(next_geo.requests) == loaded
+    assert all(etag is not None for _, etag in next_geo.requests)
+    assert catalog.revalidated == loaded
+    assert catalog.has('layer', 'layer', 'workspace')
+
+
+def test_get_catalog_without_etag(monkeypatch):
+    monkeypatch.setattr(catalog_module, '_catalogs', {})
+    geo = FakeGeoserver()
+    catalog = get_catalog(geo, ['workspace'])
+
+    assert get_catalog(geo, ['workspace']) is not catalog
+    assert all(etag is None for _, etag in geo.requests)
@@ -0,0 +1,75 @@
+import numpy as np
+import shapely
+from pyproj import CRS
+from shapely.geometry import LineString, MultiLineString, Point, Polygon
+
+from controller.geometrymanager import get_crs_srid, hilbert_sort_index, normalize_geometries, snap_to_grid
+
+
+def test_get_crs_srid_epsg():
+    assert get_crs_srid(CRS.from_epsg(25830)) == 25830
+
+
+def test_get_crs_srid_esri():
+    # ESRI .prj without EPSG code
+    assert get_crs_srid(CRS.from_user_input("ESRI:54009").to_wkt()) == 54009
+
+
+def test_get_crs_srid_unknown():
+    assert get_crs_srid(None) == 0
+
+
+def test_normalize_geometries():
+    geoms = [Point(0, 0, 1), Polygon([(0, 0), (1, 0), (1, 1)]), MultiLineString([[(0, 0), (1, 1)]]), Point(), None]
+    normalized, timings = normalize_geometries(geoms, force_2d=True)
+
+    assert list(shapely.get_type_id(normalized)) == [4, 6, 5, -1, -1]
+    assert not shapely.has_z(normalized).any()
+    assert set(timings) == {'empty', 'force_2d', 'force_multi'}
+
+
+def test_normalize_geometries_keep_single():
+    normalized, _ = normalize_geometries([Point(0, 0, 1)], force_multi=False)
+
+    assert normalized[0].geom_type == 'Point' and normalized[0].has_z
+
+
+def test_hilbert_sort_index():
+    # Quadrants of the first order Hilbert curve: lower left, upper left, upper right, lower right
+    geoms = [Point(1, 0), Point(1, 1), Point(0, 1), Point(0, 0), None]
+
+    assert list(hilbert_sort_index(geoms, level=1)) == [3, 2, 1, 0, 4]
+
+
+def test_hilbert_sort_index_locality():
+    # Consecutive rows of the sorted grid are neighbour cells
+    x, y = np.meshgrid(np.arange(8), np.arange(8))
+    geoms = shapely.points(x.ravel(), y.ravel())
+    coords = shapely.get_coordinates(geoms[hilbert_sort_index(geoms, level=3)])
+
+    assert (np.abs(np.diff(coords, axis=0)).sum(axis=1) == 1).all()
+
+
+def test_snap_to_grid():
+    geoms = [LineString([(0, 0), (0.4, 0), (1, 0)]), Polygon([(0, 0), (0.1, 0), (0.1, 0.1)]), None]
+    snapped, removed = snap_to_grid(geoms, 1)
+
+    # The repeated vertex is removed and the collapsed polygon is dropped
+    assert snapped[0].equals(LineString([(0, 0), (1, 0)]))
+    assert snapped[1].is_empty
+    assert snapped[2] is None
+    assert removed == 5 * 2 * 8
+
+
+def test_snap_to_grid_3d():
+    snapped, removed = snap_to_grid([LineString([(0, 0, 1), (0.4, 0, 1), (1, 0, 1)])], 1)
+
+    assert shapely.has_z(snapped[0])
+    assert removed == 3 * 8
+
+
+def test_snap_to_grid_keeps_vertices():
+    snapped, removed = snap_to_grid([Point(0.26, 0.74)], 0.5)
+
+    assert snapped[0].equals(Point(0.5, 0.5))
+    assert removed == 0
@@ -0,0 +1,89 @@
+import threading
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from model.Geoserver import Geoserver, get_featuretype_xml
+
+
+ATTRIBUTES = [dict(name='name', binding='java.lang.String', nillable=True), dict(name='geom', binding='org.locationtech.jts.geom.MultiPolygon', nillable=False)]
+
+
+def test_featuretype_xml_precomputed_layout():
+    root = ET.fromstring(get_featuretype_xml('table', 'Title', 'Abstract', 25830, 25830, native_bbox=(0, 1, 2, 3), latlon_bbox=(-1, 40, 1, 41), attributes=ATTRIBUTES))
+
+    assert root.findtext('name') == 'table'
+    assert root.findtext('nativeBoundingBox/maxy') == '3'
+    assert root.findtext('latLonBoundingBox/crs') == 'EPSG:4326'
+    assert [a.findtext('name') for a in root.findall('attributes/attribute')] == ['name', 'geom']
+    assert [a.findtext('nillable') for a in root.findall('attributes/attribute')] == ['true', 'false']
+    # Bounding boxes are not recalculated and the CRS is not reprojected
+    assert root.find('recalculate') is None
+    assert root.find('projectionPolicy') is None
+
+
+def test_featuretype_xml_without_layout():
+    root = ET.fromstring(get_featuretype_xml('table', 'Title', 'Abstract', 25830, 3857, attributes=ATTRIBUTES))
+
+    assert root.findtext('recalculate') == 'nativebbox,latlonbbox'
+    assert root.find('attributes') is None
+    assert root.findtext('nativeCRS') == 'EPSG:25830'
+    assert root.findtext('srs') == 'EPSG:3857'
+    assert root.findtext('projectionPolicy') == 'REPROJECT_TO_DECLARED'
+
+
+def test_featuretype_xml_without_attributes():
+    root = ET.fromstring(get_featuretype_xml('table', 'Title', 'Abstract', 25830, 25830, native_bbox=(0, 1, 2, 3), latlon_bbox=(-1, 40, 1, 41)))
+
+    assert root.find('nativeBoundingBox') is not None
+    assert root.find('attributes') is None
+
+
+class RestHandler(BaseHTTPRequestHandler):
+    """Keep-alive REST endpoint: answers any method with its name."""
+    protocol_version = 'HTTP/1.1'
+
+    def respond(self):
+        body = self.command.encode()
+        self.send_response(200 if self.command != 'PATCH' else 405)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_PATCH = respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def geo():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    geo = Geoserver(f"http://127.0.0.1:{server.server_address[1]}/geoserver")
+    geo.session.trust_env = False
+    yield geo
+    geo.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_any_method(geo):
+    for method in ('get', 'post', 'put', 'delete', 'patch'):
+        r = geo._requests(method, f"{geo.service_url}/rest/about/version.json")
+        assert r.text == method.upper()
+    assert geo._requests('patch', geo.service_url).status_code == 405
+    assert geo._requests('head', geo.service_url).status_code == 200
+
+
+def test_connection_stats_reused(geo):
+    assert geo.get_connection_stats() == dict(requests=0, connections=0, reused=0)
+
+    for _ in range(3):
+        geo._requests('get', f"{geo.service_url}/rest/about/version.json")
+
+    # One kept-alive connection for the three requests
+    assert geo.get_connection_stats() == dict(requests=3, connections=1, reused=2)
@@ -0,0 +1,243 @@
+import asyncio
+import threading
+import time
+import types
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from controller.geoservermanager import check_geoserver_datastore, check_geoserver_generalized_datastore, check_geoserver_workspace, create_geoserver_layer, create_geoserver_layer_async, create_geoserver_overviews, create_geoserver_overviews_async, get_layer_request, get_overview_ranges, get_overview_scale, publish_geoserver_datasets
+from model.dataset import Dataset
+
+
+def get_dataset():
+    dataset = Dataset('name', 'identifier', 'public')
+    dataset.set_table_name('table')
+    dataset.set_carto_type('vector')
+    dataset.set_geometry_type('MULTIPOLYGON')
+    dataset.set_overviews([dict(table='ovr1_table', tolerance=10), dict(table='ovr2_table', tolerance=100)])
+    return dataset
+
+
+class FakeGeoserver:
+    """Empty Geoserver: records the published layers, styles and layer groups."""
+    def __init__(self):
+        self.catalog = None
+        self.calls = []
+
+    def get_layer(self, layer_name, workspace=None):
+        raise Exception('404')
+
+    get_style = get_layergroup = get_layer
+
+    def publish_featurestore(self, **kwargs):
+        self.calls.append(('layer', kwargs))
+
+    def create_coveragestore(self, **kwargs):
+        self.calls.append(('coverage', kwargs))
+
+    def create_sld_style(self, **kwargs):
+        self.calls.append(('style', kwargs))
+
+    def publish_layergroup(self, **kwargs):
+        self.calls.append(('layergroup', kwargs))
+
+
+class FakeAsyncGeoserver(FakeGeoserver):
+    async def get_layer(self, layer_name, workspace=None):
+        raise Exception('404')
+
+    get_style = get_layergroup = get_layer
+
+    async def publish_featurestore(self, **kwargs):
+        FakeGeoserver.publish_featurestore(self, **kwargs)
+
+    async def create_coveragestore(self, **kwargs):
+        FakeGeoserver.create_coveragestore(self, **kwargs)
+
+    async def create_sld_style(self, **kwargs):
+        FakeGeoserver.create_sld_style(self, **kwargs)
+
+    async def publish_layergroup(self, **kwargs):
+        FakeGeoserver.publish_layergroup(self, **kwargs)
+
+
+@pytest.mark.parametrize("srid, scale", [
+    (25830, 10 / 0.00028),
+    (2227, 10 * 0.3048006096 / 0.00028),     # US survey feet
+    (4326, 10 * 111319.49079 / 0.00028),     # degrees along the equator
+])
+def test_get_overview_scale_units(srid, scale):
+    assert get_overview_scale(10, srid) == pytest.approx(scale)
+
+
+def test_get_overview_scale_unknown_srid():
+    with pytest.raises(ValueError):
+        get_overview_scale(10, 0)
+
+
+def test_get_overview_ranges():
+    ranges = get_overview_ranges(get_dataset(), 25830)
+
+    assert [table for table, _, _ in ranges] == ['table', 'ovr1_table', 'ovr2_table']
+    assert ranges[0][1] is None and ranges[-1][2] is None
+    # Consecutive ranges share its limits
+    assert ranges[0][2] == ranges[1][1] == pytest.approx(10 / 0.00028)
+    assert ranges[1][2] == ranges[2][1] == pytest.approx(100 / 0.00028)
+
+
+def assert_overview_layergroup(calls):
+    layers = [kwargs['pg_table'] for kind, kwargs in calls if kind == 'layer']
+    styles = {kwargs['name']: kwargs['sld'] for kind, kwargs in calls if kind == 'style'}
+    layergroups = [kwargs for kind, kwargs in calls if kind == 'layergroup']
+
+    assert sorted(layers) == ['ovr1_table', 'ovr2_table']
+    assert len(layergroups) == 1
+    assert layergroups[0]['name'] == 'table_overviews'
+    assert layergroups[0]['layers'] == ['table', 'ovr1_table', 'ovr2_table']
+    assert layergroups[0]['styles'] == ['table_scale', 'ovr1_table_scale', 'ovr2_table_scale']
+
+    # Each style is limited to the scale range of its table
+    assert 'MinScaleDenominator' not in styles['table_scale'] and 'MaxScaleDenominator' in styles['table_scale']
+    assert 'MinScaleDenominator' in styles['ovr1_table_scale'] and 'MaxScaleDenominator' in styles['ovr1_table_scale']
+    assert 'MinScaleDenominator' in styles['ovr2_table_scale'] and 'MaxScaleDenominator' not in styles['ovr2_table_scale']
+    assert all('PolygonSymbolizer' in sld for sld in styles.values())
+
+
+def test_create_geoserver_overviews():
+    geo = FakeGeoserver()
+    create_geoserver_overviews(geo, 'workspace', 'datastore', get_dataset(), 25830, 25830)
+
+    assert_overview_layergroup(geo.calls)
+
+
+def test_create_geoserver_overviews_async():
+    geo = FakeAsyncGeoserver()
+    asyncio.run(create_geoserver_overviews_async(geo, 'workspace', 'datastore', get_dataset(), 25830, 25830))
+
+    assert_overview_layergroup(geo.calls)
+
+
+def test_create_geoserver_overviews_unknown_srid():
+    geo = FakeGeoserver()
+    dataset = create_geoserver_overviews(geo, 'workspace', 'datastore', get_dataset(), 0, 25830)
+
+    assert geo.calls == []
+    assert dataset.status != 'error'
+
+
+def test_create_geoserver_layer_sync_async():
+    geo, async_geo = FakeGeoserver(), FakeAsyncGeoserver()
+    dataset = create_geoserver_layer(geo, 'workspace', 'datastore', get_dataset(), 'postgis', 25830, 3857)
+    async_dataset = asyncio.run(create_geoserver_layer_async(async_geo, 'workspace', 'datastore', get_dataset(), 'postgis', 25830, 3857))
+
+    # Both clients send the same request and set the same status
+    assert geo.calls == async_geo.calls
+    assert geo.calls[0][1]['pg_table'] == 'table' and geo.calls[0][1]['declared_srid'] == 3857
+    assert dataset.status == async_dataset.status == 'geoserver_uploaded'
+    assert dataset.declared_srid == async_dataset.declared_srid == 3857
+
+
+def test_create_geoserver_layer_error():
+    geo = FakeGeoserver()
+    geo.publish_featurestore = lambda **kwargs: (_ for _ in ()).throw(Exception('500'))
+    dataset = create_geoserver_layer(geo, 'workspace', 'datastore', get_dataset(), 'postgis', 25830, 25830)
+
+    assert dataset.status == 'error'
+    assert 'Error when trying to publish' in dataset.status_info
+
+
+@pytest.mark.parametrize("db_type", ['sql-server', 'oracle'])
+def test_create_geoserver_layer_unsupported_db_type(db_type):
+    geo, async_geo = FakeGeoserver(), FakeAsyncGeoserver()
+    dataset = create_geoserver_layer(geo, 'workspace', 'datastore', get_dataset(), db_type, 25830, 25830)
+    async_dataset = asyncio.run(create_geoserver_layer_async(async_geo, 'workspace', 'datastore', get_dataset(), db_type, 25830, 25830))
+
+    assert geo.calls == async_geo.calls == []
+    assert dataset.status == async_dataset.status == 'error'
+    assert db_type in dataset.status_info and dataset.status_info == async_dataset.status_info
+
+
+def test_get_layer_request_raster():
+    dataset = get_dataset()
+    dataset.set_carto_type('raster')
+    dataset.set_file_format('tiff')
+    request = get_layer_request('workspace', 'datastore', dataset, 'postgis', 25830, 25830)
+
+    assert request['method'] == 'create_coveragestore'
+    assert request['kwargs']['layer_name'] == 'table'
+    assert request['declared_srid'] is None
+
+
+class FakeConcurrentGeoserver:
+    """Empty Geoserver shared by the publishing threads: records the resources created and the concurrent creations."""
+    def __init__(self, failing):
+        self.catalog = None
+        self.failing = failing
+        self.created = []
+        self.published = []
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def get_workspace(self, **kwargs):
+        if ('workspace', kwargs['workspace']) not in self.created:
+            raise Exception('404')
+
+    def get_datastore(self, **kwargs):
+        if ('datastore', kwargs['store_name']) not in self.created:
+            raise Exception('404')
+
+    def create(self, kind, name):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        self.created.append((kind, name))
+
+    def create_workspace(self, workspace):
+        self.create('workspace', workspace)
+
+    def create_featurestore(self, store_name, **kwargs):
+        self.create('datastore', store_name)
+
+    def create_pregeneralized_datastore(self, store_name, **kwargs):
+        self.create('pregeneralized', store_name)
+
+    def publish_featurestore(self, pg_table, **kwargs):
+        if pg_table in self.failing:
+            raise Exception('500 Internal Server Error')
+        with self.lock:
+            self.published.append(pg_table)
+
+
+def test_publish_geoserver_datasets(tmp_path):
+    datasets = []
+    for i in range(8):
+        dataset = get_dataset()
+        dataset.set_table_name(f"table_{i}")
+        datasets.append(dataset)
+    geo = FakeConcurrentGeoserver(failing={'table_3'})
+    db_params = types.SimpleNamespace(dbname='db', host='localhost', username='user', password='password')
+
+    def publish(geo, dataset):
+        check_geoserver_workspace(geo, 'workspace', 'datastore')
+        check_geoserver_datastore(geo, 'workspace', 'datastore', 'postgis', db_params)
+        check_geoserver_generalized_datastore(geo, 'workspace', 'datastore', [dataset], str(tmp_path / 'generalization.xml'))
+        geo.publish_featurestore(pg_table=dataset.table)
+        dataset.set_status('geoserver_uploaded')
+
+    publish_geoserver_datasets(geo, datasets, publish, 4)
+
+    # The error of a dataset is set in its status, the other ones are published
+    assert [d.status for d in datasets] == ['geoserver_uploaded'] * 3 + ['error'] + ['geoserver_uploaded'] * 4
+    assert 'table_3' in datasets[3].status_info and '500' in datasets[3].status_info
+    assert sorted(geo.published) == sorted(f"table_{i}" for i in range(8) if i != 3)
+    # The shared resources are created once and one at a time
+    assert geo.created.count(('workspace', 'workspace')) == 1
+    assert geo.created.count(('datastore', 'datastore')) == 1
+    assert geo.max_in_flight == 1
+    # The generalization info XML written by all the threads keeps the overview tables of every dataset
+    root = ET.parse(tmp_path / 'generalization.xml').getroot()
+    assert sorted(info.get('featureName') for info in root.findall('GeneralizationInfo')) == sorted(f"table_{i}" for i in range(8))
@@ -0,0 +1,43 @@
+import os
+
+from model.ledger import Ledger, get_dataset_files
+
+
+def test_get_dataset_files(tmp_path):
+    for name in ("a.shp", "a.dbf", "a.prj", "ab.shp"):
+        (tmp_path / name).write_bytes(b"data")
+
+    assert [os.path.basename(path) for path in get_dataset_files(str(tmp_path / "a.shp"))] == ["a.dbf", "a.prj", "a.shp"]
+
+
+def test_ledger_fingerprint(tmp_path):
+    path = tmp_path / "a.shp"
+    path.write_bytes(b"data")
+    ledger = Ledger(str(tmp_path / "ledger.sqlite"))
+
+    fingerprint = ledger.get_fingerprint([str(path)], dict(srid=3857))
+    assert fingerprint == ledger.get_fingerprint([str(path)], dict(srid=3857))
+    assert fingerprint != ledger.get_fingerprint([str(path)], dict(srid=4326))
+    assert ledger.get_fingerprint([]) is None
+
+    # A changed file (size and mtime) is hashed again
+    path.write_bytes(b"changed data")
+    os.utime(path, ns=(0, 0))
+    assert fingerprint != ledger.get_fingerprint([str(path)], dict(srid=3857))
+    ledger.close()
+
+
+def test_ledger_entries(tmp_path):
+    ledger_path = str(tmp_path / "ledger.sqlite")
+    ledger = Ledger(ledger_path)
+    assert ledger.get_entry('bundle', 'dataset', 'db') is None
+
+    ledger.set_entry('bundle', 'dataset', 'db', 'fingerprint', 25830, 10)
+    ledger.close()
+
+    # Entries persist across runs
+    ledger = Ledger(ledger_path)
+    entry = ledger.get_entry('bundle', 'dataset', 'db')
+    assert (entry['fingerprint'], entry['srid'], entry['row_count']) == ('fingerprint', 25830, 10)
+    assert ledger.get_entry('bundle', 'dataset', 'geoserver') is None
+    ledger.close()
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from controller.pipeline import Pipeline
+
+
+def test_pipeline_stages():
+    results = []
+    pipeline = Pipeline('test', [('read', range(10)), ('double', lambda x: x * 2), ('write', results.append)], queue_size=2)
+
+    assert pipeline.run() == 10
+    assert results == [x * 2 for x in range(10)]
+    assert [stage.items for stage in pipeline.stages] == [10, 10, 10]
+    assert set(pipeline.occupancy()) == {'read', 'double', 'write'}
+
+
+def test_pipeline_stage_workers():
+    results = []
+    lock = threading.Lock()
+
+    def write(x):
+        with lock:
+            results.append(x)
+
+    pipeline = Pipeline('test', [('read', range(20)), ('square', lambda x: x * x, 3), ('write', write)])
+
+    assert pipeline.run() == 20
+    # The items of a stage with several workers are not ordered
+    assert sorted(results) == [x * x for x in range(20)]
+
+
+def test_pipeline_bounded_queues():
+    read = []
+
+    def source():
+        for i in range(100):
+            read.append(i)
+            yield i
+
+    release = threading.Event()
+    pipeline = Pipeline('test', [('read', source()), ('write', lambda x: release.wait(5))], queue_size=2)
+    thread = threading.Thread(target=pipeline.run)
+    thread.start()
+
+    # The source blocks while the queue is full: item in the stage + queue + item waiting to be put
+    thread.join(0.3)
+    assert len(read) <= 4
+    release.set()
+    thread.join()
+    assert len(read) == 100
+
+
+def test_pipeline_error():
+    def fail(x):
+        if x == 3:
+            raise ValueError('stage error')
+        return x
+
+    pipeline = Pipeline('test', [('read', range(1000)), ('fail', fail), ('write', lambda x: None)])
+
+    with pytest.raises(ValueError, match='stage error'):
+        pipeline.run()
@@ -0,0 +1,716 @@
+import csv
+import io
+import threading
+import time
+import types
+
+import fiona
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from pyproj import CRS
+
+from controller import postgismanager
+from controller.geometrymanager import hilbert_sort_index
+from controller.postgismanager import cast_dtypes, get_clustering_correlation, get_feature_hashes, get_index_settings, get_narrow_types, get_renamed_index, get_schema_dtypes, get_schema_geometry_type, get_table_ddl, get_tables_layout, get_widened_type, read_shp_batches, select_index_method, BRIN_MIN_ROWS, SPGIST_MIN_ROWS
+from model.dataset import Dataset
+
+
+@pytest.fixture
+def shp_path(tmp_path):
+    # Integer field with NULL values and string field without values only in some batches
+    path = str(tmp_path / "nulls.shp")
+    schema = {'geometry': '3D Polygon', 'properties': {'code': 'int:10', 'name': 'str:20'}}
+    with fiona.open(path, 'w', driver='ESRI Shapefile', schema=schema, crs='EPSG:25830') as dst:
+        for i in range(6):
+            dst.write({
+                'geometry': {'type': 'Polygon', 'coordinates': [[(i, 0, 1), (i + 1, 0, 1), (i + 1, 1, 1), (i, 0, 1)]]},
+                'properties': {'code': None if i >= 3 else i, 'name': None if i < 3 else 'name'},
+            })
+
+    return path
+
+
+def read_batches(path, batch_size):
+    with fiona.open(path) as src:
+        dtypes = get_schema_dtypes(src.schema)
+
+    return [cast_dtypes(gdf, dtypes) for gdf in read_shp_batches(path, batch_size)]
+
+
+def test_schema_dtypes_first_batch_regression(shp_path):
+    first, second = read_batches(shp_path, 3)
+
+    # The table created with the first batch (no NULL integers) accepts the second batch
+    assert first.dtypes.to_dict() == second.dtypes.to_dict()
+    assert '"code" bigint' in get_table_ddl(second.rename_geometry('geom'), 'public', 't', 25830)
+
+
+def test_feature_hashes_independent_of_batches(shp_path):
+    whole, _ = get_feature_hashes(read_batches(shp_path, 6)[0].rename_geometry('geom'))
+
+    hashes, counts = [], None
+    for gdf in read_batches(shp_path, 3):
+        batch_hashes, counts = get_feature_hashes(gdf.rename_geometry('geom'), counts=counts)
+        hashes.append(batch_hashes)
+
+    np.testing.assert_array_equal(whole, np.concatenate(hashes))
+
+
+def test_schema_geometry_type():
+    assert get_schema_geometry_type({'geometry': '3D Polygon'}) == 'MULTIPOLYGONZ'
+    assert get_schema_geometry_type({'geometry': '3D Polygon'}, force_2d=True) == 'MULTIPOLYGON'
+    assert get_schema_geometry_type({'geometry': 'Point'}, force_multi=False) == 'POINT'
+    assert get_schema_geometry_type({'geometry': 'Unknown'}) is None
+
+
+def test_table_ddl_geometry_type(shp_path):
+    # A batch without geometries keeps the geometry type of the file
+    gdf = gpd.read_file(shp_path, rows=slice(0, 0)).rename_geometry('geom')
+    assert 'geometry(MULTIPOLYGONZ, 25830)' in get_table_ddl(gdf, 'public', 't', 25830, geometry_type='MULTIPOLYGONZ')
+
+
+class FakeCopyCursor:
+    def __init__(self, copies):
+        self.copies = copies
+
+    def execute(self, query, params=None):
+        pass
+
+    def copy_expert(self, query, buffer):
+        self.copies.append((query, buffer.read()))
+
+
+class FakeCopyEngine:
+    def __init__(self):
+        self.copies = []
+
+    def raw_connection(self):
+        return types.SimpleNamespace(cursor=lambda: FakeCopyCursor(self.copies), commit=lambda: None, rollback=lambda: None, close=lambda: None)
+
+
+def test_copy_to_postgis_csv_buffer():
+    gdf = gpd.GeoDataFrame({
+        'code': pd.array([1, None, 3, 4], dtype='Int64'),
+        'flag': pd.array([True, None, False, True], dtype='boolean'),
+        'name': pd.array(['a', None, '', 'b\nc'], dtype=object),
+        'geom': [shapely.Point(0, 0), None, shapely.Point(1, 1), shapely.Point(2, 2)],
+    }, geometry='geom', crs='EPSG:25830')
+    engine = FakeCopyEngine()
+    assert postgismanager.copy_to_postgis(gdf, engine, 'public', 't') == 4
+
+    (query, data), = engine.copies
+    assert query == 'COPY public."t" ("code", "flag", "name", "geom") FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'
+    rows = list(csv.reader(io.StringIO(data)))
+    assert [row[:3] for row in rows] == [['1', 'True', 'a'], ['\\N', '\\N', '\\N'], ['3', 'False', ''], ['4', 'True', 'b\nc']]
+    # NULL geometry and EWKB with the SRID
+    assert rows[1][3] == '\\N'
+    geom = shapely.from_wkb(rows[3][3])
+    assert geom.equals(shapely.Point(2, 2)) and shapely.get_srid(geom) == 25830
+
+
+def test_copy_to_postgis_literal_null_string():
+    gdf = gpd.GeoDataFrame({'name': ['\\N', None], 'geom': [shapely.Point(0, 0), shapely.Point(1, 1)]}, geometry='geom', crs='EPSG:25830')
+    engine = FakeCopyEngine()
+    postgismanager.copy_to_postgis(gdf, engine, 'public', 't')
+
+    # The text value '\N' is not the NULL string of the COPY
+    (query, data), = engine.copies
+    assert query.endswith("NULL '\\N0')")
+    assert [row[0] for row in csv.reader(io.StringIO(data))] == ['\\N', '\\N0']
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query):
+        pass
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, name=None):
+        return FakeCursor(list(self.rows))
+
+
+def test_clustering_correlation_hilbert_order():
+    # Rows stored along the Hilbert curve of the load (4 rows by block)
+    x, y = np.meshgrid(np.arange(8), np.arange(8))
+    geoms = shapely.points(x.ravel(), y.ravel())
+    bounds = shapely.bounds(geoms[hilbert_sort_index(geoms)])
+    rows = [(i // 4, *bbox) for i, bbox in enumerate(bounds)]
+
+    correlation, count = get_clustering_correlation(FakeConnection(rows), 'public', 't', chunk_size=10)
+    assert count == 64
+    assert correlation > 0.99
+
+    # Rows stored in the reverse order
+    rows = [((63 - i) // 4, *bbox) for i, bbox in enumerate(bounds)]
+    correlation, _ = get_clustering_correlation(FakeConnection(rows), 'public', 't')
+    assert correlation < -0.99
+
+
+def test_clustering_correlation_empty():
+    assert get_clustering_correlation(FakeConnection([]), 'public', 't') == (None, 0)
+
+
+class FakeSridCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        if isinstance(self.rows, Exception):
+            raise self.rows
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+class FakePooledConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+
+    def cursor(self):
+        return FakeSridCursor(self.rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def get_dataset():
+    dataset = Dataset('name', 'identifier', 'public')
+    dataset.set_table_name('table')
+    return dataset
+
+
+def test_get_srid(monkeypatch):
+    conn = FakePooledConnection([(25830,)])
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+
+    dataset = postgismanager.get_srid(get_dataset(), None)
+    assert dataset.file_srid == 25830
+    assert conn.closed
+
+
+def test_update_srid_closes_connection_on_error(monkeypatch):
+    conn = FakePooledConnection(Exception('UpdateGeometrySRID failed'))
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+
+    dataset = postgismanager.update_srid(get_dataset(), None, 3857)
+    assert dataset.status == 'error'
+    assert conn.closed
+
+
+@pytest.mark.parametrize('reproject', ['pyproj', 'postgis'])
+def test_shp_to_postgis_reproject_esri_crs(tmp_path, monkeypatch, reproject):
+    # ESRI .prj without EPSG code: reprojected while loading, PostGIS can not transform it
+    path = str(tmp_path / "esri.shp")
+    schema = {'geometry': 'Point', 'properties': {'code': 'int:10'}}
+    with fiona.open(path, 'w', driver='ESRI Shapefile', schema=schema, crs_wkt=CRS.from_user_input("ESRI:54009").to_wkt()) as dst:
+        dst.write({'geometry': {'type': 'Point', 'coordinates': (100000.0, 4000000.0)}, 'properties': {'code': 1}})
+
+    written = []
+    monkeypatch.setattr(postgismanager, 'write_gdf', lambda gdf, *args, **kwargs: written.append(gdf))
+    dataset = get_dataset()
+    dataset.set_file_path(path)
+
+    dataset = postgismanager.shp_to_postgis(dataset, None, 'copy', target_srid=3857, reproject=reproject)
+    assert dataset.status == 'db_uploaded'
+    assert dataset.file_srid == 3857
+    assert written[0].crs.to_epsg() == 3857
+
+
+def test_get_index_settings():
+    assert get_index_settings(None, 4) == (None, None)
+    # 2048MB shared by 4 builds: 512MB each, 15 participants of 32MB capped to 8 workers
+    assert get_index_settings(2048, 4) == (512, 8)
+    assert get_index_settings(256, 2) == (128, 3)
+    assert get_index_settings(16, 0) == (16, 0)
+
+
+@pytest.mark.parametrize('geometry_type, row_count, correlation, override, method', [
+    ('MULTIPOLYGON', 10**7, 1.0, None, 'gist'),
+    ('MULTIPOINT', 1000, None, None, 'gist'),
+    ('MULTIPOINT', SPGIST_MIN_ROWS, None, None, 'spgist'),
+    ('MULTIPOINTZ', BRIN_MIN_ROWS, 0.95, None, 'brin'),
+    ('MULTIPOINT', BRIN_MIN_ROWS, -0.95, None, 'brin'),
+    ('MULTIPOINT', BRIN_MIN_ROWS, 0.5, None, 'spgist'),
+    ('MULTIPOINT', BRIN_MIN_ROWS, None, None, 'spgist'),
+    (None, None, None, 'BRIN', 'brin'),
+    ('MULTIPOINT', 1000, None, 'hash', 'gist'),
+])
+def test_select_index_method(geometry_type, row_count, correlation, override, method):
+    assert select_index_method(geometry_type, row_count, correlation, override) == method
+
+
+class FakePool:
+    """Bounded pool of fake connections: a checkout fails if no connection is returned in time (deadlock)."""
+    def __init__(self, size, partitions):
+        self.semaphore = threading.BoundedSemaphore(size)
+        self.partitions = partitions
+        self.lock = threading.Lock()
+        self.checked_out = 0
+        self.max_checked_out = 0
+
+    def get_pooled_connection(self, db_params):
+        if not self.semaphore.acquire(timeout=2):
+            raise TimeoutError('pool exhausted')
+        with self.lock:
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+        return FakePoolConnection(self)
+
+
+class FakePoolConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.connection = types.SimpleNamespace(autocommit=False)
+        self.result = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.result = [(partition,) for partition in self.pool.partitions] if 'pg_inherits' in query else [(None,)]
+        time.sleep(0.01)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        with self.pool.lock:
+            self.pool.checked_out -= 1
+        self.pool.semaphore.release()
+
+
+def test_create_partition_indexes_bounded_by_pool(monkeypatch):
+    # A single connection: the builds only run if the outer connection is released before them
+    pool = FakePool(1, [f"table_p_{i}" for i in range(6)])
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', pool.get_pooled_connection)
+    db_params = types.SimpleNamespace(pool_size=1)
+
+    dataset = postgismanager.create_partition_indexes(get_dataset(), db_params, cluster=False, workers=4)
+    assert dataset.status != 'error'
+    assert pool.max_checked_out == 1
+    assert pool.checked_out == 0
+
+
+class FakeDeltaCursor:
+    """Cursor of a delta load: the fields of the delta and dataset tables and the stats of the delta values."""
+    def __init__(self, delta_types, live_types, stats):
+        self.delta_types = delta_types
+        self.live_types = live_types
+        self.stats = stats
+        self.queries = []
+        self.result = None
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if 'pg_attribute' in query:
+            self.result = list((self.delta_types if 'delta' in params[0] else self.live_types).items())
+        elif 'bool_and' in query:
+            self.result = [self.stats]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.mark.parametrize("live_type, delta_type, narrow_type, widened_type", [
+    ('smallint', 'bigint', None, 'bigint'),
+    ('smallint', 'bigint', 'integer', 'integer'),
+    ('integer', 'double precision', 'smallint', 'integer'),
+    ('integer', 'double precision', 'real', 'double precision'),
+    ('real', 'double precision', 'real', 'real'),
+    ('boolean', 'text', 'boolean', 'boolean'),
+    ('boolean', 'text', None, 'text'),
+])
+def test_get_widened_type(live_type, delta_type, narrow_type, widened_type):
+    assert get_widened_type(live_type, delta_type, narrow_type) == widened_type
+
+
+def test_get_narrow_types():
+    columns = [('small', 'bigint'), ('large', 'bigint'), ('integral', 'double precision'), ('single', 'double precision'), ('flag', 'text'), ('name', 'text')]
+    stats = (0, 100, True, False, 0, 2**40, True, False, -1e6, 1e6, True, True, 0.1, 0.5, False, True, None, None, True, False, None, None, False, False)
+    cur = FakeDeltaCursor({}, {}, stats)
+
+    assert get_narrow_types(cur, 'public', 'table', columns) == dict(small='smallint', large=None, integral='integer', single='real', flag='boolean', name=None)
+
+
+def test_apply_delta_widens_narrowed_columns(monkeypatch):
+    # 'count' was narrowed to smallint by the first load, the delta has values up to 100000
+    delta_types = {'count': 'bigint', 'flag': 'text', 'feature_hash': 'text', 'geom': 'geometry(MultiPolygon,25830)'}
+    live_types = {'count': 'smallint', 'flag': 'boolean', 'feature_hash': 'text', 'geom': 'geometry(MultiPolygon,25830)'}
+    cur = FakeDeltaCursor(delta_types, live_types, (0, 100000, True, False, None, None, True, False))
+    conn = FakePooledConnection([])
+    conn.cursor = lambda: cur
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+
+    dataset, replaced = postgismanager.apply_delta(get_dataset(), None, 'table_delta')
+    assert dataset.status != 'error' and not replaced
+
+    alter = next(query for query in cur.queries if query.startswith('ALTER TABLE'))
+    assert 'ALTER COLUMN "count" TYPE integer' in alter and '"flag"' not in alter
+    insert = next(query for query in cur.queries if query.startswith('INSERT'))
+    assert 's."count"::integer' in insert and 's."flag"::boolean' in insert
+    assert conn.closed
+
+
+@pytest.mark.parametrize("swap_status, replaced", [(None, True), ('error', False)])
+def test_apply_delta_replaces_table_with_new_fields(monkeypatch, swap_status, replaced):
+    # The file has a new field 'name': the delta table replaces the dataset table, prepared by the caller
+    delta_types = {'count': 'bigint', 'name': 'text', 'feature_hash': 'text', 'geom': 'geometry(MultiPolygon,25830)'}
+    live_types = {'count': 'smallint', 'feature_hash': 'text', 'geom': 'geometry(MultiPolygon,25830)'}
+    cur = FakeDeltaCursor(delta_types, live_types, None)
+    conn = FakePooledConnection([])
+    conn.cursor = lambda: cur
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+    swaps = []
+    def swap_staging_table(dataset, db_params, staging_table):
+        swaps.append(staging_table)
+        if swap_status:
+            dataset.set_status(swap_status)
+        return dataset
+    monkeypatch.setattr(postgismanager, 'swap_staging_table', swap_staging_table)
+    monkeypatch.setattr(postgismanager, 'create_index', lambda *args, **kwargs: pytest.fail("The index is created by the caller"))
+
+    dataset, result = postgismanager.apply_delta(get_dataset(), None, 'table_delta')
+    assert result is replaced
+    assert swaps == ['table_delta']
+    assert not [query for query in cur.queries if not query.lstrip().startswith('SELECT')]
+    assert conn.closed
+
+
+class FakePrepareCursor:
+    """Cursor of a table preparation: the fields of the table and whether it has a primary key."""
+    def __init__(self, columns, has_pk=False):
+        self.columns = columns
+        self.has_pk = has_pk
+        self.queries = []
+        self.result = None
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if 'information_schema.columns' in query:
+            self.result = [(column,) for column in self.columns]
+        elif 'pg_index' in query:
+            self.result = [(1,)] if self.has_pk else []
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+def prepare_table(monkeypatch, columns, has_pk=False, **kwargs):
+    cur = FakePrepareCursor(columns, has_pk)
+    conn = FakePooledConnection([])
+    conn.cursor = lambda: cur
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+
+    dataset = postgismanager.prepare_table(get_dataset(), None, **kwargs)
+    assert dataset.status != 'error'
+    assert conn.closed
+
+    return [query for query in cur.queries if not query.startswith('SELECT')]
+
+
+@pytest.mark.parametrize("columns, pk_column", [
+    (['name', 'geom'], 'gid'),
+    (['gid', 'geom'], 'fid'),
+    (['gid', 'fid', 'geom'], 'ogc_fid'),
+    (['gid', 'fid', 'ogc_fid', 'gid_1', 'geom'], 'gid_2'),
+])
+def test_prepare_table_primary_key_column(monkeypatch, columns, pk_column):
+    statements = prepare_table(monkeypatch, columns, search_attributes=[], analyze=False)
+    assert statements == [f'ALTER TABLE public."table" ADD COLUMN "{pk_column}" bigint GENERATED ALWAYS AS IDENTITY, ADD CONSTRAINT "pk_table" PRIMARY KEY ("{pk_column}")']
+
+
+def test_prepare_table_partitioned_primary_key(monkeypatch):
+    # Partitioned tables: sequence default and composite primary key with the partition key
+    statements = prepare_table(monkeypatch, ['gid', 'partition_key', 'geom'], search_attributes=[], analyze=False)
+    assert statements == [
+        'CREATE SEQUENCE IF NOT EXISTS public."table_fid_seq"',
+        'ALTER TABLE public."table" ADD COLUMN "fid" bigint NOT NULL DEFAULT nextval(\'public."table_fid_seq"\'), ADD CONSTRAINT "pk_table" PRIMARY KEY ("fid", "partition_key")',
+        'ALTER SEQUENCE public."table_fid_seq" OWNED BY public."table"."fid"',
+    ]
+
+
+def test_prepare_table_search_attributes(monkeypatch):
+    # Existing primary key, unknown search attribute skipped
+    statements = prepare_table(monkeypatch, ['gid', 'name', 'geom'], has_pk=True, search_attributes=[' Name ', 'missing'])
+    assert statements == [
+        'CREATE INDEX IF NOT EXISTS "aidx_table_name" ON public."table" ("name")',
+        'ANALYZE public."table"',
+    ]
+
+
+class FakeSubdivideCursor:
+    """Cursor of a table subdivision: primary key, oversized features, bbox query counts (before and after) and fields."""
+    def __init__(self, keys, counts, error=None):
+        self.keys = keys
+        self.counts = counts
+        self.error = error
+        self.queries = []
+        self.result = None
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if self.error and query.lstrip().startswith('WITH'):
+            raise self.error
+        if 'indisprimary' in query:
+            self.result = [(key,) for key in self.keys]
+        elif 'ST_NPoints' in query and query.lstrip().startswith('SELECT'):
+            self.result = [(2, 0.0, 0.0, 100.0, 100.0, 25830)]
+        elif 'ST_MakeEnvelope' in query:
+            self.result = [self.counts.pop(0)]
+        elif 'pg_attribute' in query:
+            self.result = [('gid',), ('name',), ('partition_key',), ('geom',)]
+        elif query.lstrip().startswith('WITH'):
+            self.rowcount = 7
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def subdivide_table(monkeypatch, cur):
+    conn = FakePooledConnection([])
+    conn.cursor = lambda: cur
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+    dataset = get_dataset()
+    dataset.set_geometry_type('MULTIPOLYGON')
+
+    dataset = postgismanager.subdivide_table(dataset, None, 256, queries=2)
+    assert conn.closed
+
+    return dataset
+
+
+def test_subdivide_table(monkeypatch):
+    # Two windows: 10 -> 4 bbox rows with 5 -> 4 hits each
+    cur = FakeSubdivideCursor(['gid', 'partition_key'], [(10, 5), (10, 5), (4, 4), (4, 4)])
+    dataset = subdivide_table(monkeypatch, cur)
+    assert dataset.status != 'error'
+
+    # The pieces keep the other fields and the primary key of the original feature
+    alter = next(query for query, _ in cur.queries if query.startswith('ALTER TABLE'))
+    assert alter == 'ALTER TABLE public."table" ADD COLUMN IF NOT EXISTS "parent_fid" bigint'
+    query, params = next((query, params) for query, params in cur.queries if query.startswith('WITH'))
+    assert 'DELETE FROM public."table" WHERE ST_NPoints(geom) > %s RETURNING *' in query
+    assert 'INSERT INTO public."table" ("name", "partition_key", "parent_fid", geom)' in query
+    assert 'SELECT "name", "partition_key", COALESCE("parent_fid", "gid"), ST_Multi(ST_Subdivide(geom, %s)) FROM oversized' in query
+    assert params == (256, 256)
+    assert "2 features with more than 256 vertices into 7 pieces" in dataset.status_info
+    assert "Index selectivity: 50.0% -> 100.0% (bbox rows 20 -> 8)" in dataset.status_info
+
+
+def test_subdivide_table_without_primary_key(monkeypatch):
+    cur = FakeSubdivideCursor([], [])
+    dataset = subdivide_table(monkeypatch, cur)
+    assert dataset.status != 'error'
+    assert len(cur.queries) == 1
+
+
+def test_subdivide_table_error(monkeypatch):
+    cur = FakeSubdivideCursor(['gid'], [(10, 5), (10, 5)], error=RuntimeError('out of memory'))
+    dataset = subdivide_table(monkeypatch, cur)
+    assert dataset.status == 'error'
+
+
+class FakeSwapCursor:
+    """Cursor of a staging table swap: the relkind, partitions, indexes (by table) and sequences of the renamed table."""
+    def __init__(self, log, relkind, partitions, indexes, sequences):
+        self.log = log
+        self.relkind = relkind
+        self.partitions = partitions
+        self.indexes = indexes
+        self.sequences = sequences
+        self.result = None
+
+    def execute(self, query, params=None):
+        self.log.append(query)
+        if 'relkind FROM pg_class' in query:
+            self.result = [(self.relkind,)]
+        elif 'pg_inherits' in query:
+            self.result = [(partition,) for partition in self.partitions]
+        elif 'pg_indexes' in query:
+            self.result = [(index,) for index in self.indexes.get(params[1], [])]
+        elif 'pg_depend' in query:
+            self.result = [(sequence,) for sequence in self.sequences]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def swap_staging_table(monkeypatch, relkind, partitions, indexes, sequences):
+    log = []
+    conn = FakePooledConnection([])
+    conn.cursor = lambda: FakeSwapCursor(log, relkind, partitions, indexes, sequences)
+    conn.commit = lambda: log.append('COMMIT')
+    conn.rollback = lambda: log.append('ROLLBACK')
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+
+    dataset = postgismanager.swap_staging_table(get_dataset(), None, 'stg_table')
+    assert dataset.status != 'error'
+    assert conn.closed
+
+    return [query for query in log if not query.startswith('SELECT')]
+
+
+def test_get_renamed_index():
+    assert get_renamed_index('gidx_stg_table', 'stg_table', 'table') == 'gidx_table'
+    assert get_renamed_index('pk_stg_table', 'stg_table', 'table') == 'pk_table'
+    assert get_renamed_index('aidx_stg_table_name', 'stg_table', 'table') == 'aidx_table_name'
+    # Names containing the table name without its prefix
+    assert get_renamed_index('gidx_stg_table_new', 'stg_table', 'table') is None
+    assert get_renamed_index('idx_stg_table', 'stg_table', 'table') is None
+    # Truncated names (63 chars)
+    long_table = 'a' * 70
+    assert get_renamed_index(f"gidx_stg_{long_table}"[:63], f"stg_{long_table}"[:63], long_table[:63]) == f"gidx_{long_table}"[:63]
+
+
+def test_swap_staging_table(monkeypatch):
+    indexes = {'table': ['gidx_stg_table', 'pk_stg_table', 'aidx_stg_table_name', 'custom_stg_table_idx']}
+    statements = swap_staging_table(monkeypatch, 'r', [], indexes, ['stg_table_gid_seq', 'other_seq'])
+
+    # SET LOGGED is committed before the swap, the DROP and RENAME share one transaction
+    assert statements == [
+        'ALTER TABLE public."stg_table" SET LOGGED',
+        'COMMIT',
+        'DROP TABLE IF EXISTS public."table"',
+        'ALTER TABLE public."stg_table" RENAME TO "table"',
+        'ALTER INDEX public."gidx_stg_table" RENAME TO "gidx_table"',
+        'ALTER INDEX public."pk_stg_table" RENAME TO "pk_table"',
+        'ALTER INDEX public."aidx_stg_table_name" RENAME TO "aidx_table_name"',
+        'ALTER SEQUENCE public."stg_table_gid_seq" RENAME TO "table_gid_seq"',
+        'COMMIT',
+    ]
+
+
+def test_swap_staging_table_partitions(monkeypatch):
+    partition = postgismanager.get_partition_table('stg_table', 'a')
+    key_hash = partition[-12:]
+    indexes = {'table': ['gidx_stg_table'], f"table_p_{key_hash}": [f"gidx_{partition}"]}
+    statements = swap_staging_table(monkeypatch, 'p', [partition, 'stg_table_default'], indexes, [])
+
+    # Partitioned tables have no storage: no SET LOGGED, the partitions keep the hash of their key
+    assert statements == [
+        'DROP TABLE IF EXISTS public."table"',
+        'ALTER TABLE public."stg_table" RENAME TO "table"',
+        f'ALTER TABLE public."{partition}" RENAME TO "table_p_{key_hash}"',
+        'ALTER INDEX public."gidx_stg_table" RENAME TO "gidx_table"',
+        f'ALTER INDEX public."gidx_{partition}" RENAME TO "gidx_table_p_{key_hash}"',
+        'COMMIT',
+    ]
+    assert f"table_p_{key_hash}" == postgismanager.get_partition_table('table', 'a')
+
+
+class FakeCatalogCursor:
+    """Cursor of the catalog lookup: the rows of the existing tables."""
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_get_tables_info(monkeypatch):
+    datasets = [get_dataset(), Dataset('other', 'other', 'data'), Dataset('missing', 'missing', 'public')]
+    datasets[1].set_table_name('other')
+    rows = [('public', 'table', 'MULTIPOLYGON', 25830), ('public', 'ovr1_table', 'MULTIPOLYGON', 25830), ('data', 'other', None, None)]
+    cur = FakeCatalogCursor(rows)
+    conn = FakePooledConnection([])
+    conn.cursor = lambda: cur
+    monkeypatch.setattr(postgismanager, 'get_pooled_connection', lambda db_params: conn)
+
+    tables_info = postgismanager.get_tables_info(datasets, types.SimpleNamespace(dbname='db'), overview_levels=2)
+
+    # One unnest query of the dataset and overview tables (datasets without table are not looked up)
+    (query, params), = cur.queries
+    assert 'unnest(%s::text[], %s::text[])' in query
+    assert params == ('geom', ['data', 'data', 'data', 'public', 'public', 'public'], ['other', 'ovr1_other', 'ovr2_other', 'ovr1_table', 'ovr2_table', 'table'])
+    # Tables without geometry column default to SRID 0
+    assert tables_info == {
+        ('public', 'table'): dict(geometry_type='MULTIPOLYGON', srid=25830),
+        ('public', 'ovr1_table'): dict(geometry_type='MULTIPOLYGON', srid=25830),
+        ('data', 'other'): dict(geometry_type=None, srid=0),
+    }
+    assert conn.closed
+
+
+class FakeLayoutCursor:
+    """Cursor of the tables layout: the attributes query returns the rows not filtered in SQL (internal fields)."""
+    def __init__(self, attributes, extents):
+        self.attributes = attributes
+        self.extents = extents
+        self.queries = []
+        self.result = None
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        self.result = self.attributes if 'pg_attribute' in query else self.extents
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def test_get_tables_layout_attributes():
+    attributes = [('public', 'table', 'name', 'varchar', True), ('public', 'table', 'feature_hash', 'text', True),
+                  ('public', 'table', 'partition_key', 'text', True), ('public', 'table', 'parent_fid', 'int8', True),
+                  ('public', 'table', 'geom', 'geometry', True)]
+    cur = FakeLayoutCursor(attributes, [('public', 'table', 0, 0, 1, 1)])
+    tables_info = {('public', 'table'): dict(geometry_type='MULTIPOLYGON', srid=25830)}
+
+    get_tables_layout(cur, tables_info)
+    info = tables_info[('public', 'table')]
+
+    # The primary key (identity) is excluded by the query, the internal fields of the loader are skipped
+    assert "attidentity = ''" in cur.queries[0] and 'indisprimary' in cur.queries[0]
+    assert [attribute['name'] for attribute in info['attributes']] == ['name', 'geom']
+    assert info['bbox']['native'] == (0.0, 0.0, 1.0, 1.0)
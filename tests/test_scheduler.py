@@ -0,0 +1,41 @@
+import struct
+
+from controller.scheduler import BYTES_PER_SECOND, get_shx_feature_count, lpt_schedule
+from model.dataset import Dataset
+
+
+def write_dataset(tmp_path, identifier, size):
+    path = tmp_path / f"{identifier}.tif"
+    path.write_bytes(b"\0" * size)
+    dataset = Dataset(identifier, identifier, 'public')
+    dataset.set_file_path(str(path))
+    return dataset
+
+
+def test_lpt_schedule(tmp_path):
+    sizes = {'a': 3, 'b': 5, 'c': 2, 'd': 4}
+    datasets = [write_dataset(tmp_path, identifier, size * BYTES_PER_SECOND) for identifier, size in sizes.items()]
+
+    ordered, costs, makespan = lpt_schedule(datasets, workers=2)
+
+    # Longest first: b(5) d(4) a(3) c(2) -> workers [5 + 2, 4 + 3]
+    assert [d.identifier for d in ordered] == ['b', 'd', 'a', 'c']
+    assert costs['b'] == 5
+    assert makespan == 7
+
+
+def test_lpt_schedule_missing_files():
+    dataset = Dataset('missing', 'missing', 'public')
+
+    ordered, costs, makespan = lpt_schedule([dataset], workers=0)
+    assert ordered == [dataset] and costs == {'missing': 0.0} and makespan == 0.0
+
+
+def test_shx_feature_count(tmp_path):
+    # 100 bytes header + 3 records of 8 bytes, length in 16-bit words
+    header = bytearray(100)
+    header[24:28] = struct.pack('>i', (100 + 3 * 8) // 2)
+    (tmp_path / "a.shx").write_bytes(bytes(header) + b"\0" * 24)
+
+    assert get_shx_feature_count(str(tmp_path / "a.shp")) == 3
+    assert get_shx_feature_count(str(tmp_path / "b.shp")) is None